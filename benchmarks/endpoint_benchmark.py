@@ -0,0 +1,66 @@
+"""Microbenchmark of the per-call cost of MLModelgRPCEndpoint.__call__()."""
+import argparse
+import timeit
+from google.protobuf.json_format import MessageToDict
+from ml_model_abc import MLModel
+
+import model_service_pb2
+from model_service_pb2 import iris_model_input
+from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.ml_model_grpc_endpoint import MLModelgRPCEndpoint
+
+
+class ConstantIrisModel(MLModel):
+    """Model that uses the iris_model protocol buffers and does no work, so that only the endpoint is measured."""
+
+    display_name = "Constant Iris Model"
+    qualified_name = "iris_model"
+    description = "Model that always predicts the same species."
+    major_version = 1
+    minor_version = 0
+    input_schema = None
+    output_schema = None
+
+    def __init__(self):
+        pass
+
+    def predict(self, data):
+        return {"species": "setosa"}
+
+
+def uncached_call(model, request):
+    """Make a prediction the way the endpoint did before its state was resolved once at initialization."""
+    data = MessageToDict(request, preserving_proto_field_name=True)
+    prediction = model.predict(data=data)
+    output_protobuf = getattr(model_service_pb2, "{}_output".format(model.qualified_name))
+    return output_protobuf(**prediction)
+
+
+def main(number, repeat):
+    model_manager = ModelManager()
+    model_manager.load_models(configuration=[{
+        "module_name": "benchmarks.endpoint_benchmark",
+        "class_name": "ConstantIrisModel"
+    }])
+    endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+    model = model_manager.get_model("iris_model")
+    request = iris_model_input(sepal_length=5.1, sepal_width=3.5, petal_length=1.4, petal_width=0.2)
+
+    results = {
+        "uncached": min(timeit.repeat(lambda: uncached_call(model, request), number=number, repeat=repeat)),
+        "endpoint": min(timeit.repeat(lambda: endpoint(request, None), number=number, repeat=repeat))
+    }
+
+    for name, seconds in results.items():
+        print("{:<10} {:>8.2f} us/call".format(name, seconds / number * 1e6))
+    print("savings    {:>8.2f} us/call".format((results["uncached"] - results["endpoint"]) / number * 1e6))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure the per-call cost of the MLModelgRPCEndpoint class.')
+    parser.add_argument('--number', type=int, default=10000, help='Number of calls in each measurement.')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of measurements, the fastest one is reported.')
+
+    args = parser.parse_args()
+
+    main(number=args.number, repeat=args.repeat)
@@ -0,0 +1,205 @@
+"""Microbenchmark suite of the serving hot path that compares the results against stored baselines."""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+from model_service_pb2 import iris_model_input, iris_model_output
+from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.ml_model_grpc_endpoint import MLModelgRPCEndpoint
+
+# the file that the baselines are stored in, next to this module
+BASELINES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# the benchmark that the others are compared relative to, so that the baselines can be checked on a faster or slower
+# machine than the one they were measured on
+REFERENCE_BENCHMARK = "reference"
+
+_request = iris_model_input(sepal_length=5.1, sepal_width=3.5, petal_length=1.4, petal_width=0.2)
+_response = iris_model_output(species="setosa")
+
+
+def _load_models(class_name, module_name="benchmarks.endpoint_benchmark"):
+    ModelManager().load_models(configuration=[{"module_name": module_name, "class_name": class_name}])
+
+
+def reference():
+    """Run a fixed amount of pure Python code, it measures the speed of the machine and not of the service."""
+    return lambda: sum(value * value for value in range(100))
+
+
+def endpoint_call_mock():
+    """Call the endpoint of a model that does no work, so that only the endpoint is measured."""
+    _load_models("ConstantIrisModel")
+    endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+    return lambda: endpoint(_request, None)
+
+
+def endpoint_call_iris():
+    """Call the endpoint of the iris model from the configuration of the service."""
+    _load_models("IrisModel", module_name="iris_model.iris_predict")
+    endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+    return lambda: endpoint(_request, None)
+
+
+def model_manager_get_model():
+    """Look up a model object in the ModelManager."""
+    _load_models("ConstantIrisModel")
+    return lambda: ModelManager.get_model("iris_model")
+
+
+def model_manager_get_models():
+    """Get the list of models from the ModelManager."""
+    _load_models("ConstantIrisModel")
+    return ModelManager.get_models
+
+
+def proto_encode():
+    """Serialize an input protocol buffer."""
+    return _request.SerializeToString
+
+
+def proto_decode():
+    """Parse an input protocol buffer."""
+    data = _request.SerializeToString()
+    return lambda: iris_model_input.FromString(data)
+
+
+def proto_encode_response():
+    """Serialize an output protocol buffer."""
+    return _response.SerializeToString
+
+
+# the benchmarks of the suite, each one is a function that sets up the benchmark and returns the function to measure
+BENCHMARKS = (reference, endpoint_call_mock, endpoint_call_iris, model_manager_get_model, model_manager_get_models,
+              proto_encode, proto_decode, proto_encode_response)
+
+
+def run(repeat, min_time=0.2):
+    """Run the benchmarks and return the cost of one call of each one in microseconds, and the skipped benchmarks.
+
+    The number of calls in each measurement is chosen so that a measurement takes at least min_time seconds, and the
+    fastest of the repeated measurements is used because it is the least affected by other processes on the machine.
+    Benchmarks that cannot be set up, for example because the iris model package is not installed, are left out of the
+    results and their names are returned in the list of skipped benchmarks.
+
+    :returns: A dictionary of the results by name, and a list of the names of the skipped benchmarks.
+    :rtype: tuple
+
+    """
+    results = {}
+    skipped = []
+    for benchmark in BENCHMARKS:
+        try:
+            function = benchmark()
+        except ImportError as e:
+            print("skipping {}: {}".format(benchmark.__name__, e))
+            skipped.append(benchmark.__name__)
+            continue
+        timer = timeit.Timer(function)
+        number = _calibrate(timer, min_time)
+        results[benchmark.__name__] = min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+    return results, skipped
+
+
+def _calibrate(timer, min_time):
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            return number
+        number *= 2
+
+
+def compare(results, baselines, threshold):
+    """Compare results with baselines, returns the benchmarks that are slower than the threshold allows.
+
+    The baselines are scaled by the ratio of the reference benchmark's result to its baseline, so a machine that is
+    twice as slow as the one the baselines were measured on is allowed to take twice as long. The baselines are not
+    scaled when the reference benchmark does not have a result or a baseline.
+
+    :param threshold: The fraction that a result can be slower than its baseline, 0.25 allows it to be 25% slower.
+    :type threshold: float
+    :returns: The names of the benchmarks that are slower than their baselines, and the names of the benchmarks that
+        don't have a baseline.
+    :rtype: tuple
+
+    """
+    scale = 1.0
+    if REFERENCE_BENCHMARK in results and REFERENCE_BENCHMARK in baselines:
+        scale = results[REFERENCE_BENCHMARK] / baselines[REFERENCE_BENCHMARK]
+    print("the baselines are scaled by {:.3f}, the speed of this machine relative to the baselines".format(scale))
+
+    regressions = []
+    missing = []
+    for name, microseconds in results.items():
+        baseline = baselines.get(name)
+        if baseline is not None:
+            baseline *= scale
+        if baseline is None:
+            status = "no baseline"
+            missing.append(name)
+        elif microseconds > baseline * (1.0 + threshold):
+            status = "REGRESSION"
+            regressions.append(name)
+        else:
+            status = "ok"
+        print("{:<28} {:>9.3f} us/call  baseline {:>9} us/call  {}".format(
+            name, microseconds, "{:.3f}".format(baseline) if baseline is not None else "-", status))
+    return regressions, missing
+
+
+def main(repeat, min_time, save, check, threshold, baselines_file):
+    results, skipped = run(repeat, min_time)
+
+    baselines = {}
+    if os.path.exists(baselines_file):
+        with open(baselines_file) as f:
+            baselines = json.load(f)
+
+    if save:
+        # the baselines of the skipped benchmarks are kept, scaled by the change of the reference benchmark so that they
+        # stay relative to its new result
+        scale = 1.0
+        if REFERENCE_BENCHMARK in baselines:
+            scale = results[REFERENCE_BENCHMARK] / baselines[REFERENCE_BENCHMARK]
+        baselines = dict({name: value * scale for name, value in baselines.items() if name in skipped}, **results)
+        with open(baselines_file, "w") as f:
+            json.dump({name: round(value, 3) for name, value in sorted(baselines.items())}, f, indent=2)
+            f.write("\n")
+        print("saved the baselines to {}".format(baselines_file))
+
+    regressions, missing = compare(results, baselines, threshold)
+
+    if check:
+        failed = False
+        if len(regressions) > 0:
+            print("{} benchmarks are more than {:.0%} slower than their baselines: {}".format(
+                len(regressions), threshold, ", ".join(regressions)))
+            failed = True
+        if len(missing) > 0:
+            print("{} benchmarks don't have a baseline, run \"make benchmark-baseline\": {}".format(
+                len(missing), ", ".join(missing)))
+            failed = True
+        if len(skipped) > 0:
+            print("{} benchmarks were skipped: {}".format(len(skipped), ", ".join(skipped)))
+            failed = True
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the microbenchmark suite of the serving hot path.')
+    parser.add_argument('--repeat', type=int, default=7, help='Number of measurements, the fastest one is used.')
+    parser.add_argument('--min_time', type=float, default=0.2, help='Minimum number of seconds of each measurement.')
+    parser.add_argument('--save', action='store_true', help='Save the results as the new baselines.')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with an error when a benchmark is slower than its baseline by more than the '
+                             'threshold.')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Fraction that a benchmark can be slower than its baseline.')
+    parser.add_argument('--baselines_file', default=BASELINES_FILE, help='File that the baselines are stored in.')
+
+    args = parser.parse_args()
+
+    sys.exit(main(args.repeat, args.min_time, args.save, args.check, args.threshold, args.baselines_file))
@@ -0,0 +1,193 @@
+"""Admission control that limits the number of requests that a model handles at the same time."""
+import heapq
+import itertools
+import threading
+import grpc
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted, the servicer ends the call with the status code of the exception."""
+
+    def __init__(self, code, details):
+        """Create the exception.
+
+        :param code: The status code that the call ends with.
+        :type code: grpc.StatusCode
+        :param details: The message sent to the client.
+        :type details: str
+
+        """
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+
+class _Waiter(object):
+    """A request that is waiting in the queue of an admission controller."""
+
+    __slots__ = ("priority", "sequence", "event", "admitted", "shed")
+
+    def __init__(self, priority, sequence):
+        self.priority = priority
+        self.sequence = sequence
+        self.event = threading.Event()
+        self.admitted = False
+        self.shed = False
+
+    def __lt__(self, other):
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class AdmissionController(object):
+    """Admits a bounded number of requests to run at the same time and queues a bounded number of the others.
+
+    A request that arrives when the queue is full is rejected with RESOURCE_EXHAUSTED right away, unless it has a
+    higher priority than a request in the queue, in which case the request with the lowest priority is rejected
+    instead. The queued requests are admitted in priority order, a lower number is a higher priority, and a request
+    that is still in the queue when its deadline passes is rejected with DEADLINE_EXCEEDED without running.
+
+    """
+
+    def __init__(self, max_concurrency, max_queue_size=0):
+        """Create an admission controller.
+
+        :param max_concurrency: The maximum number of requests that run at the same time.
+        :type max_concurrency: int
+        :param max_queue_size: The maximum number of requests that wait to run.
+        :type max_queue_size: int
+
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be greater than zero.")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must not be negative.")
+
+        self._max_concurrency = max_concurrency
+        self._max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._running = 0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def acquire(self, timeout=None, priority=0):
+        """Wait until the request is admitted, release() must be called when it finishes.
+
+        :param timeout: The number of seconds the request can wait in the queue, usually the time remaining until its
+            deadline, None waits without a limit. The sync server gives the calls without a deadline a time remaining
+            that is too large to wait for, so the timeouts above threading.TIMEOUT_MAX also wait without a limit.
+        :type timeout: float
+        :param priority: The priority of the request, a lower number is a higher priority.
+        :type priority: int
+        :raises AdmissionRejected: If the request is not admitted.
+
+        """
+        if timeout is not None and not timeout < threading.TIMEOUT_MAX:
+            timeout = None
+
+        with self._lock:
+            if self._running < self._max_concurrency and len(self._waiters) == 0:
+                self._running += 1
+                self.admitted += 1
+                return
+
+            if len(self._waiters) >= self._max_queue_size:
+                # shedding the queued request with the lowest priority if the new request is more important
+                lowest = max(self._waiters) if len(self._waiters) > 0 else None
+                if lowest is None or priority >= lowest.priority:
+                    self.rejected += 1
+                    raise AdmissionRejected(grpc.StatusCode.RESOURCE_EXHAUSTED, "The model is overloaded.")
+                self._waiters.remove(lowest)
+                heapq.heapify(self._waiters)
+                lowest.shed = True
+                lowest.event.set()
+                self.rejected += 1
+
+            waiter = _Waiter(priority, next(self._sequence))
+            heapq.heappush(self._waiters, waiter)
+
+        try:
+            waiter.event.wait(timeout)
+        except BaseException:
+            # the waiter must not stay in the queue or keep a slot that it was given when the wait is interrupted
+            with self._lock:
+                if waiter.admitted:
+                    self._release()
+                elif not waiter.shed:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+            raise
+
+        with self._lock:
+            if waiter.admitted:
+                return
+            if waiter.shed:
+                raise AdmissionRejected(grpc.StatusCode.RESOURCE_EXHAUSTED, "The model is overloaded.")
+            # the deadline of the request passed while it was waiting
+            self._waiters.remove(waiter)
+            heapq.heapify(self._waiters)
+            self.expired += 1
+        raise AdmissionRejected(grpc.StatusCode.DEADLINE_EXCEEDED,
+                                "The deadline passed before the model could handle the request.")
+
+    def release(self):
+        """Release the slot of a request that finished, the slot is handed to the next request in the queue."""
+        with self._lock:
+            self._release()
+
+    def _release(self):
+        # the lock must be held
+        if len(self._waiters) > 0:
+            waiter = heapq.heappop(self._waiters)
+            waiter.admitted = True
+            self.admitted += 1
+            waiter.event.set()
+        else:
+            self._running -= 1
+
+    def stats(self):
+        """Return the counters of the admission controller."""
+        return {"running": self._running, "queued": len(self._waiters), "admitted": self.admitted,
+                "rejected": self.rejected, "expired": self.expired}
+
+
+class AdmissionInterceptor(grpc.ServerInterceptor):
+    """Server interceptor that ends the calls that raise AdmissionRejected with the status code of the exception."""
+
+    def intercept_service(self, continuation, handler_call_details):
+        """Wrap the behavior of the handler of a call."""
+        handler = continuation(handler_call_details)
+        if handler is None:
+            return None
+
+        if handler.unary_unary is not None:
+            return grpc.unary_unary_rpc_method_handler(
+                _unary_behavior(handler.unary_unary), request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer)
+        if handler.stream_stream is not None:
+            return grpc.stream_stream_rpc_method_handler(
+                _stream_behavior(handler.stream_stream), request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer)
+        return handler
+
+
+def _unary_behavior(behavior):
+    def unary_behavior(request, context):
+        try:
+            return behavior(request, context)
+        except AdmissionRejected as e:
+            context.abort(e.code, e.details)
+    return unary_behavior
+
+
+def _stream_behavior(behavior):
+    def stream_behavior(request_iterator, context):
+        try:
+            for response in behavior(request_iterator, context):
+                yield response
+        except AdmissionRejected as e:
+            context.abort(e.code, e.details)
+    return stream_behavior
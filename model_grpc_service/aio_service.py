@@ -0,0 +1,168 @@
+"""asyncio gRPC service that hosts MLModel classes."""
+import asyncio
+import logging
+from concurrent import futures
+from grpc import aio
+
+import model_service_pb2_grpc
+
+from model_grpc_service import __name__
+from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.admission_control import AdmissionRejected
+from model_grpc_service.health import AsyncHealthServicer, add_health_servicer_to_server, set_service_status, \
+    SERVING, NOT_SERVING
+
+logger = logging.getLogger(__name__)
+
+# this object is put into the queue of a stream when all of the messages in the stream have been read
+_END_OF_STREAM = object()
+
+
+class AsyncModelgRPCServiceServicer(model_service_pb2_grpc.ModelgRPCServiceServicer):
+    """Provides the methods of a ModelgRPCServiceServicer as coroutines for an asyncio gRPC server.
+
+    The predictions are made in an executor so that the event loop is never blocked by a model.
+
+    """
+
+    def __init__(self, servicer, executor):
+        """Initialize an instance of the service.
+
+        :param servicer: The servicer that hosts the models.
+        :type servicer: model_grpc_service.service.ModelgRPCServiceServicer
+        :param executor: The executor that the predictions will be made in.
+        :type executor: concurrent.futures.Executor
+
+        """
+        self._servicer = servicer
+        self._executor = executor
+
+        for model in self._servicer.model_manager.get_models():
+            endpoint = getattr(self._servicer, "{}_predict".format(model["qualified_name"]))
+            setattr(self, "{}_predict".format(model["qualified_name"]),
+                    self._unary_handler(endpoint))
+            setattr(self, "{}_batch_predict".format(model["qualified_name"]),
+                    self._unary_handler(endpoint.batch_predict))
+            setattr(self, "{}_stream_predict".format(model["qualified_name"]),
+                    self._stream_handler(endpoint))
+            if endpoint.tensor_input_enabled:
+                setattr(self, "{}_tensor_predict".format(model["qualified_name"]),
+                        self._unary_handler(endpoint.tensor_predict))
+
+        for pipeline_name in self._servicer.pipeline_names:
+            setattr(self, "{}_predict".format(pipeline_name),
+                    self._unary_handler(getattr(self._servicer, "{}_predict".format(pipeline_name))))
+
+    async def get_models(self, request, context):
+        """Return list of models hosted in this service."""
+        return self._servicer.get_models(request, context)
+
+    def _unary_handler(self, handler):
+        async def unary_handler(request, context):
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(self._executor, handler, request, context)
+            except AdmissionRejected as e:
+                await context.abort(e.code, e.details)
+        return unary_handler
+
+    def _stream_handler(self, endpoint):
+        async def stream_handler(request_iterator, context):
+            loop = asyncio.get_running_loop()
+            request_metrics = endpoint.request_metrics["stream_predict"]
+            start_time = request_metrics.start()
+            failed = True
+
+            # reading the stream in a separate task so that messages can be collected while predictions are being made
+            requests = asyncio.Queue()
+            reader = loop.create_task(AsyncModelgRPCServiceServicer._read_stream(request_iterator, requests))
+
+            try:
+                end_of_stream = False
+                while not end_of_stream:
+                    # waiting for the next message, then taking the messages that are already waiting
+                    batch = [await requests.get()]
+                    while len(batch) < endpoint.stream_max_batch_size and batch[-1] is not _END_OF_STREAM \
+                            and not isinstance(batch[-1], Exception):
+                        try:
+                            batch.append(requests.get_nowait())
+                        except asyncio.QueueEmpty:
+                            break
+
+                    if batch[-1] is _END_OF_STREAM:
+                        end_of_stream = True
+                        batch.pop()
+                    elif isinstance(batch[-1], Exception):
+                        raise batch[-1]
+
+                    if len(batch) > 0:
+                        responses = await loop.run_in_executor(self._executor, endpoint.predict_protobufs, batch,
+                                                               context)
+                        for response in responses:
+                            yield response
+                failed = False
+            except AdmissionRejected as e:
+                await context.abort(e.code, e.details)
+            finally:
+                reader.cancel()
+                request_metrics.finish(start_time, failed=failed)
+        return stream_handler
+
+    @staticmethod
+    async def _read_stream(request_iterator, requests):
+        try:
+            async for request in request_iterator:
+                await requests.put(request)
+            await requests.put(_END_OF_STREAM)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # the exception is raised again by the task that is making predictions
+            await requests.put(e)
+
+
+def _log_loading_failure(future):
+    # the models that failed to load are loaded again when they are first used, this only reports the failure
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Failed to load the models in the background.", exc_info=future.exception())
+
+
+async def serve_async(servicer, configuration, options=None):
+    """Start the model service on an asyncio gRPC server and wait for it to terminate.
+
+    :param servicer: The servicer that hosts the models.
+    :type servicer: model_grpc_service.service.ModelgRPCServiceServicer
+    :param configuration: The configuration of the service.
+    :type configuration: model_grpc_service.config.Config
+    :param options: Options for the gRPC server.
+    :type options: list
+
+    """
+    executor = futures.ThreadPoolExecutor(max_workers=configuration.max_workers)
+    server = aio.server(options=options, maximum_concurrent_rpcs=configuration.maximum_concurrent_rpcs)
+    model_service_pb2_grpc.add_ModelgRPCServiceServicer_to_server(AsyncModelgRPCServiceServicer(servicer, executor),
+                                                                  server)
+    health_servicer = AsyncHealthServicer()
+    add_health_servicer_to_server(health_servicer, server, servicer.model_names)
+    server.add_insecure_port(configuration.service_port)
+    await server.start()
+    logger.info("Started asyncio gRPC server on: {}".format(configuration.service_port))
+
+    # creating the lazily loaded models in the background now that the port is bound
+    loop = asyncio.get_running_loop()
+    if configuration.model_loading == "lazy":
+        loader = loop.run_in_executor(executor, ModelManager.load_pending_models, configuration.model_loading_workers)
+        loader.add_done_callback(_log_loading_failure)
+
+    # the service reports that it is serving once all of the models are warmed up, the warm up runs in the executor
+    # and the statuses are set in the event loop
+    await loop.run_in_executor(executor, servicer.warm_up,
+                               lambda service, status: loop.call_soon_threadsafe(health_servicer.set, service, status))
+    set_service_status(health_servicer, SERVING)
+
+    try:
+        await server.wait_for_termination()
+    finally:
+        set_service_status(health_servicer, NOT_SERVING)
+        await server.stop(0)
+        executor.shutdown(wait=False)
@@ -0,0 +1,301 @@
+"""Command that scores a JSONL or CSV file with a model from the configuration, without going through gRPC.
+
+Run it with: python -m model_grpc_service.bulk_scoring --model iris_model --input rows.jsonl --output scores.jsonl
+
+"""
+import argparse
+import collections
+import csv
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from google.protobuf.descriptor import FieldDescriptor
+
+import model_service_pb2
+from model_grpc_service.model_manager import ModelManager
+
+# the logger is named after the package like the loggers of the other modules, this module does not replace its
+# __name__ because the functions sent to the worker processes are pickled by module and name, and because it is run as
+# a script
+logger = logging.getLogger("model_grpc_service")
+
+# functions that convert the values of a CSV file into the types of the fields of a model's input protocol buffer
+_csv_converters = {
+    FieldDescriptor.TYPE_FLOAT: float,
+    FieldDescriptor.TYPE_DOUBLE: float,
+    FieldDescriptor.TYPE_BOOL: lambda value: value.strip().lower() in ("true", "1", "yes"),
+    FieldDescriptor.TYPE_STRING: str
+}
+
+
+class _InvalidRow(object):
+    """A row of the input file that could not be read, it is written to the output with its error."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def read_rows(path, input_format, input_protobuf=None):
+    """Read the rows of a JSONL or CSV file one at a time.
+
+    A row that cannot be parsed, that is not an object, or whose values cannot be converted into the types of the
+    fields, is returned as an object with an "error" attribute instead of a dictionary, so that it fails on its own.
+
+    :param path: The path of the file.
+    :type path: str
+    :param input_format: "jsonl" or "csv".
+    :type input_format: str
+    :param input_protobuf: The input protocol buffer of the model, the values of a CSV file are converted into the types
+        of its fields, and the integers of a JSONL file are converted into floats in its float fields.
+    :type input_protobuf: type
+
+    """
+    if input_format == "jsonl":
+        # converting the integers in the float fields into floats, like the protocol buffers of the service do
+        float_fields = []
+        if input_protobuf is not None:
+            float_fields = [field.name for field in input_protobuf.DESCRIPTOR.fields
+                            if field.type in (FieldDescriptor.TYPE_FLOAT, FieldDescriptor.TYPE_DOUBLE)]
+        with open(path) as f:
+            for line in f:
+                if line.strip() != "":
+                    try:
+                        row = json.loads(line)
+                    except ValueError as e:
+                        yield _InvalidRow("The row is not valid JSON: {}".format(e))
+                        continue
+                    if not isinstance(row, dict):
+                        yield _InvalidRow("The row is not a JSON object.")
+                        continue
+                    for name in float_fields:
+                        if isinstance(row.get(name), int):
+                            row[name] = float(row[name])
+                    yield row
+    elif input_format == "csv":
+        converters = {}
+        if input_protobuf is not None:
+            converters = {field.name: _csv_converters.get(field.type, int)
+                          for field in input_protobuf.DESCRIPTOR.fields}
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    row = {name: converters[name](value) if name in converters else value
+                           for name, value in row.items()}
+                except (ValueError, TypeError) as e:
+                    row = _InvalidRow("The row has a value that cannot be converted: {}".format(e))
+                yield row
+    else:
+        raise ValueError("'{}' is not a valid input format.".format(input_format))
+
+
+def _load_model(configuration):
+    ModelManager().load_models(configuration=configuration)
+
+
+def score_batch(qualified_name, rows):
+    """Make a prediction for each row with a model in the ModelManager.
+
+    The batch is predicted in one call if the model has a predict_batch() method. If that call fails or does not return
+    one prediction for each row, or if the model does not have the method, the rows are predicted one at a time so that
+    a row that fails does not fail the rest of the batch. The rows that could not be read are not predicted and get
+    their error.
+
+    :returns: A list with a dictionary for each row that has the key "prediction" or the key "error".
+    :rtype: list
+
+    """
+    model = ModelManager.get_model(qualified_name)
+    results = [{"error": row.error} if isinstance(row, _InvalidRow) else None for row in rows]
+    indexes = [index for index, result in enumerate(results) if result is None]
+    for index, result in zip(indexes, _predict_rows(model, [rows[index] for index in indexes])):
+        results[index] = result
+    return results
+
+
+def _predict_rows(model, rows):
+    if len(rows) == 0:
+        return []
+    if getattr(model, "predict_batch", None) is not None:
+        try:
+            predictions = model.predict_batch(data=rows)
+            # the predictions can't be matched to the rows when there isn't one prediction for each row
+            if len(predictions) != len(rows):
+                raise ValueError("The model returned {} predictions for {} rows.".format(len(predictions), len(rows)))
+            return [{"prediction": prediction} for prediction in predictions]
+        except Exception as e:
+            logger.warning("Predicting a batch of {} rows failed, predicting them one at a time: {}".format(
+                len(rows), e))
+
+    results = []
+    for row in rows:
+        try:
+            results.append({"prediction": model.predict(data=row)})
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
+class _SerialExecutor(object):
+    """Runs the batches in the calling process, used when there are no worker processes."""
+
+    def submit(self, function, *args):
+        return _CompletedFuture(function(*args))
+
+    def shutdown(self):
+        pass
+
+
+class _CompletedFuture(object):
+
+    def __init__(self, result):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+
+def _read_checkpoint(checkpoint_path):
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path) as f:
+        return json.load(f)
+
+
+def _write_checkpoint(checkpoint_path, rows, output_size):
+    # writing the checkpoint under a temporary name and renaming it, so that an interruption never leaves a checkpoint
+    # that is partly written
+    temporary_path = checkpoint_path + ".tmp"
+    with open(temporary_path, "w") as f:
+        json.dump({"rows": rows, "output_size": output_size}, f)
+    os.replace(temporary_path, checkpoint_path)
+
+
+def score_file(qualified_name, configuration, input_path, output_path, input_format="jsonl", batch_size=256,
+               workers=None, checkpoint_every=10, resume=False, report_interval=10.0):
+    """Score the rows of a file with a model and write the results to a JSONL file in the order of the rows.
+
+    The rows are read as a stream and grouped into batches that are scored in a pool of worker processes, each worker
+    loads the model from its configuration with the ModelManager. At most two batches for each worker are read ahead
+    of the results that are written, so the memory that is used does not depend on the size of the file. Each line of
+    the output has the index of the row and either the prediction or the error that the row failed with.
+
+    Every checkpoint_every batches the output file is flushed to disk and the number of rows that were written is saved
+    in a checkpoint file next to it. When resume is True and the checkpoint exists, the output file is truncated to the
+    size it had at the checkpoint and the scoring continues from the next row, when the output file does not exist the
+    scoring starts from the first row. The checkpoint is removed when all of
+    the rows are scored.
+
+    :param qualified_name: The qualified name of the model.
+    :type qualified_name: str
+    :param configuration: The configuration of the model, an entry of Config.models.
+    :type configuration: dict
+    :param workers: The number of worker processes, None starts one for each CPU and 0 scores the rows in this process.
+    :type workers: int
+    :returns: The number of rows that were scored by this call.
+    :rtype: int
+
+    """
+    checkpoint_path = output_path + ".checkpoint"
+    checkpoint = _read_checkpoint(checkpoint_path) if resume else None
+    if checkpoint is not None and not os.path.exists(output_path):
+        logger.warning("The output file '{}' of the checkpoint does not exist, scoring from the first row.".format(
+            output_path))
+        checkpoint = None
+    skip_rows = 0
+    if checkpoint is not None:
+        skip_rows = checkpoint["rows"]
+        with open(output_path, "r+b") as f:
+            f.truncate(checkpoint["output_size"])
+        logger.info("Resuming from row {} of '{}'.".format(skip_rows, input_path))
+
+    input_protobuf = getattr(model_service_pb2, "{}_input".format(qualified_name), None)
+    rows = itertools.islice(read_rows(input_path, input_format, input_protobuf), skip_rows, None)
+    batches = iter(lambda: list(itertools.islice(rows, batch_size)), [])
+
+    workers = os.cpu_count() if workers is None else workers
+    if workers == 0:
+        _load_model([configuration])
+        executor = _SerialExecutor()
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_load_model, initargs=([configuration],))
+    max_pending = max(2 * workers, 1)
+
+    row_index = skip_rows
+    scored_rows = 0
+    written_batches = 0
+    start_time = last_report_time = time.monotonic()
+    pending = collections.deque()
+    try:
+        with open(output_path, "a" if checkpoint is not None else "w") as output:
+            while True:
+                # keeping the window of batches that are being scored full, then writing the oldest batch so that the
+                # results are written in the order of the rows
+                for batch in itertools.islice(batches, max_pending - len(pending)):
+                    pending.append((len(batch), executor.submit(score_batch, qualified_name, batch)))
+                if len(pending) == 0:
+                    break
+
+                batch_length, future = pending.popleft()
+                for result in future.result():
+                    output.write(json.dumps(dict(row=row_index, **result)) + "\n")
+                    row_index += 1
+                scored_rows += batch_length
+                written_batches += 1
+
+                if written_batches % checkpoint_every == 0:
+                    output.flush()
+                    os.fsync(output.fileno())
+                    _write_checkpoint(checkpoint_path, row_index, output.tell())
+
+                now = time.monotonic()
+                if now - last_report_time >= report_interval:
+                    logger.info("Scored {} rows, {:.1f} rows/sec.".format(row_index, scored_rows / (now - start_time)))
+                    last_report_time = now
+    finally:
+        executor.shutdown()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    elapsed_time = time.monotonic() - start_time
+    logger.info("Scored {} rows in {:.3f} seconds, {:.1f} rows/sec.".format(
+        scored_rows, elapsed_time, scored_rows / elapsed_time if elapsed_time > 0 else 0.0))
+    return scored_rows
+
+
+def main(args):
+    """Score a file with a model from the configuration selected by the APP_SETTINGS environment variable."""
+    from model_grpc_service import config
+    configuration = getattr(config, os.environ.get("APP_SETTINGS", "Config"))
+
+    # importing the model classes without creating the models to find the configuration of the model
+    ModelManager().load_models(configuration=configuration.models, loading_mode="lazy")
+    model_configuration = ModelManager.get_model_configuration(args.model)
+    if model_configuration is None:
+        raise ValueError("'{}' not found in the configuration.".format(args.model))
+
+    input_format = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    score_file(args.model, model_configuration, args.input, args.output, input_format=input_format,
+               batch_size=args.batch_size, workers=args.workers, checkpoint_every=args.checkpoint_every,
+               resume=args.resume)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Score the rows of a JSONL or CSV file with a model.')
+    parser.add_argument('--model', required=True, help='Qualified name of the model.')
+    parser.add_argument('--input', required=True, help='JSONL or CSV file with a row for each input.')
+    parser.add_argument('--output', required=True, help='JSONL file that the results are written to.')
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        help='Format of the input file, by default it is selected by the extension of the file.')
+    parser.add_argument('--batch_size', type=int, default=256, help='Number of rows sent to a worker at a time.')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes, one for each CPU by default, 0 scores in this process.')
+    parser.add_argument('--checkpoint_every', type=int, default=10,
+                        help='Number of batches written between checkpoints.')
+    parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint of the output file.')
+
+    main(parser.parse_args())
@@ -0,0 +1,516 @@
+"""Client of the model service with a pool of channels, client-side batching, hedged requests and deadlines."""
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+import grpc
+from grpc import aio
+from google.protobuf.message import Message
+
+import model_service_pb2
+import model_service_pb2_grpc
+
+# the options of every channel, each channel gets its own subchannels so that the channels of a pool open separate
+# connections instead of sharing the connections of the global subchannel pool, and the calls of a channel are spread
+# over all of the addresses that the target resolves to
+_channel_options = [("grpc.use_local_subchannel_pool", 1), ("grpc.lb_policy_name", "round_robin")]
+
+# the status codes of failed attempts that a hedged request sends another attempt for right away
+_retryable_codes = (grpc.StatusCode.UNAVAILABLE,)
+
+
+class _DeadlineExceeded(grpc.RpcError):
+    """Raised for a batched prediction whose deadline passes before the response of its batch arrives."""
+
+    def code(self):
+        """Return the status code of the call."""
+        return grpc.StatusCode.DEADLINE_EXCEEDED
+
+    def details(self):
+        """Return the details of the error."""
+        return "Deadline Exceeded"
+
+
+def _to_input(qualified_name, data):
+    # creating the input protocol buffer of a model from a dictionary, protocol buffers are used as they are
+    if isinstance(data, Message):
+        return data
+    return getattr(model_service_pb2, "{}_input".format(qualified_name))(**data)
+
+
+class ModelClient(object):
+    """Client of the model service that reuses a pool of channels.
+
+    The calls are sent over the channels of the pool in turn, so that the calls are spread over several connections to
+    the service, and every call has a deadline. When hedging_delay is set, a unary call that has not finished after
+    hedging_delay seconds is sent again over another channel, up to max_attempts times, and the first response is
+    used; predictions have no side effects so they can be sent more than once. When batch_size is set, the single
+    predictions of concurrent callers are grouped and sent in batch RPCs, each prediction keeps its own timeout and
+    metadata.
+
+    """
+
+    def __init__(self, target, channels=4, default_timeout=1.0, hedging_delay=None, max_attempts=2, batch_size=None,
+                 batch_wait_time=0.002, options=None):
+        """Create a client and open its channels.
+
+        :param target: The address of the service, for example "localhost:50051".
+        :type target: str
+        :param channels: The number of channels in the pool.
+        :type channels: int
+        :param default_timeout: The number of seconds that a call can take when no timeout is passed to it.
+        :type default_timeout: float
+        :param hedging_delay: The number of seconds to wait for a response before sending the call again, None turns
+            hedging off.
+        :type hedging_delay: float
+        :param max_attempts: The maximum number of times that a hedged call is sent.
+        :type max_attempts: int
+        :param batch_size: The maximum number of single predictions that are sent in one batch RPC, None sends each
+            prediction in its own RPC.
+        :type batch_size: int
+        :param batch_wait_time: The maximum number of seconds a single prediction waits for other predictions.
+        :type batch_wait_time: float
+        :param options: More options for the channels.
+        :type options: list
+
+        """
+        if channels < 1:
+            raise ValueError("channels must be greater than zero.")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be greater than zero.")
+
+        self._channels = [grpc.insecure_channel(target, options=_channel_options + list(options or []))
+                          for _ in range(channels)]
+        self._stubs = [model_service_pb2_grpc.ModelgRPCServiceStub(channel) for channel in self._channels]
+        self._counter = itertools.count()
+        self._default_timeout = default_timeout
+        self._hedging_delay = hedging_delay
+        self._max_attempts = max_attempts
+        self._batch_size = batch_size
+        self._batch_wait_time = batch_wait_time
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+        # the number of calls that were sent again because the first attempt was slow or failed
+        self.hedged_attempts = 0
+
+    def __enter__(self):
+        """Return the client."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the client."""
+        self.close()
+
+    def wait_for_ready(self, timeout=None):
+        """Wait until all of the channels are connected to the service."""
+        for channel in self._channels:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+
+    def get_models(self, timeout=None):
+        """Return the list of models hosted in the service."""
+        return self._call("get_models", model_service_pb2.empty(), timeout, None)
+
+    def predict(self, qualified_name, data, timeout=None, metadata=None):
+        """Make a prediction with a model.
+
+        :param qualified_name: The qualified name of the model.
+        :type qualified_name: str
+        :param data: The input of the model, a dictionary or the model's input protocol buffer.
+        :param timeout: The number of seconds the call can take, the client's default timeout is used when it is None.
+        :type timeout: float
+        :param metadata: The metadata of the call, for example (("priority", "high"),). When the client batches the
+            predictions, only the predictions with the same metadata are sent in the same batch.
+        :returns: The model's output protocol buffer.
+
+        """
+        request = _to_input(qualified_name, data)
+        timeout = timeout if timeout is not None else self._default_timeout
+        if self._batch_size is not None:
+            return self._get_batcher(qualified_name, metadata).predict(request, timeout)
+        return self._call("{}_predict".format(qualified_name), request, timeout, metadata)
+
+    def predict_batch(self, qualified_name, inputs, timeout=None, metadata=None):
+        """Make predictions for a list of inputs in one batch RPC, returns a list of output protocol buffers."""
+        batch_input = getattr(model_service_pb2, "{}_batch_input".format(qualified_name))(
+            inputs=[_to_input(qualified_name, data) for data in inputs])
+        response = self._call("{}_batch_predict".format(qualified_name), batch_input, timeout, metadata)
+        return list(response.outputs)
+
+    def stream_predict(self, qualified_name, inputs, timeout=None, metadata=None):
+        """Send an iterable of inputs over the stream RPC of a model and return an iterator of the outputs.
+
+        The stream has no deadline unless a timeout is passed, because a stream can be as long as its input.
+
+        """
+        requests = (_to_input(qualified_name, data) for data in inputs)
+        method = getattr(self._next_stub(), "{}_stream_predict".format(qualified_name))
+        return method(requests, timeout=timeout, metadata=metadata)
+
+    def close(self):
+        """Stop the batchers and close the channels."""
+        with self._lock:
+            batchers, self._batchers = list(self._batchers.values()), {}
+        for batcher in batchers:
+            batcher.close()
+        for channel in self._channels:
+            channel.close()
+
+    def _next_stub(self):
+        return self._stubs[next(self._counter) % len(self._stubs)]
+
+    def _get_batcher(self, qualified_name, metadata):
+        key = (qualified_name, tuple(metadata or ()))
+        batcher = self._batchers.get(key)
+        if batcher is None:
+            with self._lock:
+                batcher = self._batchers.get(key)
+                if batcher is None:
+                    batcher = _Batcher(self._next_stub, qualified_name, metadata, self._batch_size,
+                                       self._batch_wait_time)
+                    self._batchers[key] = batcher
+        return batcher
+
+    def _call(self, method_name, request, timeout, metadata):
+        timeout = timeout if timeout is not None else self._default_timeout
+        if self._hedging_delay is None:
+            return getattr(self._next_stub(), method_name)(request, timeout=timeout, metadata=metadata)
+
+        # sending the call again over another channel every hedging_delay seconds until one of the attempts succeeds,
+        # all of the attempts share the deadline of the call
+        deadline = time.monotonic() + timeout
+        finished = threading.Event()
+        attempts = []
+        next_attempt_time = time.monotonic()
+        try:
+            while True:
+                # clearing the event before looking at the attempts, so that an attempt that finishes after they are
+                # checked wakes up the wait below
+                finished.clear()
+                now = time.monotonic()
+                # the first attempt is always made, so that a call whose deadline has passed fails with
+                # DEADLINE_EXCEEDED
+                if len(attempts) == 0 or (len(attempts) < self._max_attempts and now >= next_attempt_time and
+                                          now < deadline):
+                    future = getattr(self._next_stub(), method_name).future(request, timeout=max(deadline - now, 0.0),
+                                                                            metadata=metadata)
+                    future.add_done_callback(lambda f: finished.set())
+                    if len(attempts) > 0:
+                        with self._lock:
+                            self.hedged_attempts += 1
+                    attempts.append(future)
+                    next_attempt_time = now + self._hedging_delay
+
+                for future in attempts:
+                    if future.done() and future.exception() is None:
+                        return future.result()
+
+                can_hedge = len(attempts) < self._max_attempts and now < deadline
+                if all(future.done() for future in attempts):
+                    exception = attempts[-1].exception()
+                    if can_hedge and exception.code() in _retryable_codes:
+                        next_attempt_time = now
+                        continue
+                    raise exception
+
+                finished.wait(max(next_attempt_time - now, 0.0) if can_hedge else None)
+        finally:
+            for future in attempts:
+                future.cancel()
+
+
+class _Batcher(object):
+    """Groups the single predictions of concurrent threads into batch RPCs to one model, with the same metadata.
+
+    A background thread sends a batch when it is full or when its oldest prediction has waited max_wait_time seconds.
+    The batch RPCs are sent without waiting for their responses, so several of them can be in flight at the same time.
+    The deadline of a batch RPC is the earliest deadline of its predictions, a batch that fails fails all of its
+    predictions without sending them again, and each caller stops waiting at its own deadline.
+
+    """
+
+    def __init__(self, next_stub, qualified_name, metadata, max_batch_size, max_wait_time):
+        self._next_stub = next_stub
+        self._method_name = "{}_batch_predict".format(qualified_name)
+        self._batch_input = getattr(model_service_pb2, "{}_batch_input".format(qualified_name))
+        self._metadata = metadata
+        self._max_batch_size = max_batch_size
+        self._max_wait_time = max_wait_time
+        # the predictions that wait to be sent, as (request, deadline, future, arrival time) tuples
+        self._items = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="{}-batcher".format(qualified_name), daemon=True)
+        self._thread.start()
+
+    def predict(self, request, timeout):
+        now = time.monotonic()
+        deadline = now + timeout
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The client is closed.")
+            self._items.append((request, deadline, future, now))
+            self._condition.notify()
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0.0))
+        except TimeoutError:
+            raise _DeadlineExceeded()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            items, self._items = self._items, []
+            self._condition.notify()
+        for _, _, future, _ in items:
+            future.set_exception(RuntimeError("The client is closed."))
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed and len(self._items) == 0:
+                    self._condition.wait()
+                # waiting for the batch to fill up until the oldest prediction has waited max_wait_time seconds
+                flush_time = self._items[0][3] + self._max_wait_time if len(self._items) > 0 else 0.0
+                while not self._closed and len(self._items) < self._max_batch_size:
+                    remaining = flush_time - time.monotonic()
+                    if remaining <= 0.0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+                items = self._items[:self._max_batch_size]
+                self._items = self._items[self._max_batch_size:]
+            self._send(items)
+
+    def _send(self, items):
+        # the predictions whose deadline passed while they waited are not sent, so that they don't shorten the deadline
+        # of the batch
+        now = time.monotonic()
+        items = [item for item in items if item[1] > now and not item[2].done()]
+        if len(items) == 0:
+            return
+        call = getattr(self._next_stub(), self._method_name).future(
+            self._batch_input(inputs=[request for request, _, _, _ in items]),
+            timeout=min(deadline for _, deadline, _, _ in items) - now, metadata=self._metadata)
+        call.add_done_callback(lambda call: self._resolve(call, items))
+
+    @staticmethod
+    def _resolve(call, items):
+        try:
+            outputs = call.result().outputs
+            # the outputs can't be matched to the inputs when the server doesn't return one output for each input
+            if len(outputs) != len(items):
+                raise ValueError("The batch response has {} outputs for {} inputs.".format(len(outputs), len(items)))
+        except Exception as e:
+            for _, _, future, _ in items:
+                future.set_exception(e)
+            return
+        for (_, _, future, _), output in zip(items, outputs):
+            future.set_result(output)
+
+
+class AsyncModelClient(object):
+    """asyncio client of the model service.
+
+    The client has the same pool of channels, batching, hedging and deadlines as ModelClient, it must be created and
+    used in one event loop.
+
+    """
+
+    def __init__(self, target, channels=4, default_timeout=1.0, hedging_delay=None, max_attempts=2, batch_size=None,
+                 batch_wait_time=0.002, options=None):
+        """Create a client and open its channels, the parameters are the same as the ones of ModelClient."""
+        if channels < 1:
+            raise ValueError("channels must be greater than zero.")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be greater than zero.")
+
+        self._channels = [aio.insecure_channel(target, options=_channel_options + list(options or []))
+                          for _ in range(channels)]
+        self._stubs = [model_service_pb2_grpc.ModelgRPCServiceStub(channel) for channel in self._channels]
+        self._counter = itertools.count()
+        self._default_timeout = default_timeout
+        self._hedging_delay = hedging_delay
+        self._max_attempts = max_attempts
+        self._batch_size = batch_size
+        self._batch_wait_time = batch_wait_time
+        self._batchers = {}
+
+        self.hedged_attempts = 0
+
+    async def __aenter__(self):
+        """Return the client."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the client."""
+        await self.close()
+
+    async def wait_for_ready(self):
+        """Wait until all of the channels are connected to the service."""
+        for channel in self._channels:
+            await channel.channel_ready()
+
+    async def get_models(self, timeout=None):
+        """Return the list of models hosted in the service."""
+        return await self._call("get_models", model_service_pb2.empty(), timeout, None)
+
+    async def predict(self, qualified_name, data, timeout=None, metadata=None):
+        """Make a prediction with a model, it has the same parameters as the predict method of ModelClient."""
+        request = _to_input(qualified_name, data)
+        timeout = timeout if timeout is not None else self._default_timeout
+        if self._batch_size is not None:
+            key = (qualified_name, tuple(metadata or ()))
+            batcher = self._batchers.get(key)
+            if batcher is None:
+                batcher = _AsyncBatcher(self._next_stub, qualified_name, metadata, self._batch_size,
+                                        self._batch_wait_time)
+                self._batchers[key] = batcher
+            return await batcher.predict(request, timeout)
+        return await self._call("{}_predict".format(qualified_name), request, timeout, metadata)
+
+    async def predict_batch(self, qualified_name, inputs, timeout=None, metadata=None):
+        """Make predictions for a list of inputs in one batch RPC, returns a list of output protocol buffers."""
+        batch_input = getattr(model_service_pb2, "{}_batch_input".format(qualified_name))(
+            inputs=[_to_input(qualified_name, data) for data in inputs])
+        response = await self._call("{}_batch_predict".format(qualified_name), batch_input, timeout, metadata)
+        return list(response.outputs)
+
+    def stream_predict(self, qualified_name, inputs, timeout=None, metadata=None):
+        """Send an iterable of inputs over the stream RPC of a model.
+
+        The call that is returned is an async iterator of the outputs.
+
+        """
+        requests = (_to_input(qualified_name, data) for data in inputs)
+        method = getattr(self._next_stub(), "{}_stream_predict".format(qualified_name))
+        return method(requests, timeout=timeout, metadata=metadata)
+
+    async def close(self):
+        """Stop the batchers and close the channels."""
+        batchers, self._batchers = list(self._batchers.values()), {}
+        for batcher in batchers:
+            batcher.close()
+        for channel in self._channels:
+            await channel.close()
+
+    def _next_stub(self):
+        return self._stubs[next(self._counter) % len(self._stubs)]
+
+    async def _call(self, method_name, request, timeout, metadata):
+        timeout = timeout if timeout is not None else self._default_timeout
+        if self._hedging_delay is None:
+            return await getattr(self._next_stub(), method_name)(request, timeout=timeout, metadata=metadata)
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        attempts = []
+        next_attempt_time = loop.time()
+        try:
+            while True:
+                now = loop.time()
+                # the first attempt is always made, so that a call whose deadline has passed fails with
+                # DEADLINE_EXCEEDED
+                if len(attempts) == 0 or (len(attempts) < self._max_attempts and now >= next_attempt_time and
+                                          now < deadline):
+                    if len(attempts) > 0:
+                        self.hedged_attempts += 1
+                    attempts.append(asyncio.ensure_future(getattr(self._next_stub(), method_name)(
+                        request, timeout=max(deadline - now, 0.0), metadata=metadata)))
+                    next_attempt_time = now + self._hedging_delay
+
+                for attempt in attempts:
+                    if attempt.done() and attempt.exception() is None:
+                        return attempt.result()
+
+                can_hedge = len(attempts) < self._max_attempts and now < deadline
+                pending = [attempt for attempt in attempts if not attempt.done()]
+                if len(pending) == 0:
+                    exception = attempts[-1].exception()
+                    if can_hedge and isinstance(exception, grpc.RpcError) and exception.code() in _retryable_codes:
+                        next_attempt_time = now
+                        continue
+                    raise exception
+
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED,
+                                   timeout=max(next_attempt_time - now, 0.0) if can_hedge else None)
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+
+class _AsyncBatcher(object):
+    """Groups the single predictions of concurrent coroutines into batch RPCs, like _Batcher does for threads."""
+
+    def __init__(self, next_stub, qualified_name, metadata, max_batch_size, max_wait_time):
+        self._next_stub = next_stub
+        self._method_name = "{}_batch_predict".format(qualified_name)
+        self._batch_input = getattr(model_service_pb2, "{}_batch_input".format(qualified_name))
+        self._metadata = metadata
+        self._max_batch_size = max_batch_size
+        self._max_wait_time = max_wait_time
+        self._items = []
+        self._timer = None
+        self._closed = False
+
+    async def predict(self, request, timeout):
+        if self._closed:
+            raise RuntimeError("The client is closed.")
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        future = loop.create_future()
+        # retrieving the exception of the batch, in case the caller stopped waiting before the batch failed
+        future.add_done_callback(lambda future: future.cancelled() or future.exception())
+        self._items.append((request, deadline, future))
+        if len(self._items) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait_time, self._flush)
+        try:
+            # the future is shielded so that a caller that stops waiting does not cancel the batch
+            return await asyncio.wait_for(asyncio.shield(future), timeout=max(deadline - loop.time(), 0.0))
+        except asyncio.TimeoutError:
+            raise _DeadlineExceeded()
+
+    def close(self):
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        for _, _, future in items:
+            if not future.done():
+                future.set_exception(RuntimeError("The client is closed."))
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._items = self._items, []
+        if len(items) > 0:
+            asyncio.ensure_future(self._send(items))
+
+    async def _send(self, items):
+        now = asyncio.get_event_loop().time()
+        items = [item for item in items if item[1] > now]
+        if len(items) == 0:
+            return
+        try:
+            response = await getattr(self._next_stub(), self._method_name)(
+                self._batch_input(inputs=[request for request, _, _ in items]),
+                timeout=min(deadline for _, deadline, _ in items) - now, metadata=self._metadata)
+            # the outputs can't be matched to the inputs when the server doesn't return one output for each input
+            if len(response.outputs) != len(items):
+                raise ValueError("The batch response has {} outputs for {} inputs.".format(
+                    len(response.outputs), len(items)))
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), output in zip(items, response.outputs):
+            if not future.done():
+                future.set_result(output)
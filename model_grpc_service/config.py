@@ -2,12 +2,112 @@
 
 
 class Config(dict):
-    """Configuration for all environments."""
+    """Configuration for all environments.
+
+    The server_mode option selects the kind of gRPC server that hosts the models:
+        sync: a grpc.server that handles each call in one of max_workers threads.
+        asyncio: a grpc.aio.server that handles all calls in an event loop, the predictions are made in a thread pool
+            with max_workers threads so that the event loop is never blocked.
+
+    The maximum_concurrent_rpcs option limits the number of calls that the server accepts at the same time, the calls
+    that arrive when the limit is reached are rejected with RESOURCE_EXHAUSTED. None accepts calls without a limit.
+
+    The worker_processes option sets the number of processes that serve requests, when it is None one process is
+    started for each CPU. When there is more than one, the models are loaded once in a supervisor process which forks
+    the worker processes, the workers all bind to the service port with SO_REUSEPORT and are restarted if they exit.
+
+    The model_loading option selects how the model objects are created when the service starts: "sequential" creates
+    them one after another, "parallel" creates them at the same time in a pool of model_loading_workers threads, and
+    "lazy" creates each one in the background after the service port is bound, or when it is first used.
+
+    Each entry in the models list can contain these options:
+        batching: groups concurrent single predictions into batches, the value is a dictionary with the keys
+            max_batch_size (int) and max_wait_time (float, seconds).
+        streaming: options for the streaming predict operation, the value is a dictionary with the key
+            max_batch_size (int), the maximum number of messages from a stream that are grouped into one batch.
+        cache: caches the responses of the model by request, the value is a dictionary with the keys enabled (bool),
+            max_size (int, number of responses) and ttl (float, seconds, None means responses never expire). The
+            model class must have a "deterministic" attribute set to True.
+        coalescing: makes identical requests that arrive while a prediction for the same request is in flight wait for
+            that prediction instead of making their own, the value is a dictionary with the key enabled (bool).
+        warm_up: inputs that the model makes predictions with before the service reports that it is serving, and
+            before it replaces the old model when the models are reloaded, the value is a dictionary with the keys
+            inputs (list of dictionaries) and synthetic_inputs (int, the number of inputs that are generated from the
+            fields of the model's input protocol buffer when there are no inputs). The failures of the generated
+            inputs are logged, a failure of the inputs in the configuration keeps the model NOT_SERVING when the
+            service starts and stops a reload.
+        tensor_input: generates a "{qualified_name}_tensor_predict" operation that accepts a batch of inputs packed
+            into one buffer of numbers, the value is a dictionary with the key enabled (bool). All of the input fields
+            of the model must be numbers or integers. The option is read when the protocol buffers are generated.
+        admission: limits the number of requests that the model handles at the same time, the value is a dictionary with
+            the keys max_concurrency (int), max_queue_size (int, the number of requests that wait for the model, the
+            requests that arrive when the queue is full are rejected with RESOURCE_EXHAUSTED), priorities (dict, maps
+            the values of the "priority" request metadata to numbers, a lower number is a higher priority) and
+            default_priority (str, the priority of the requests that don't have one). Requests that wait in the
+            queue past their deadline are rejected with DEADLINE_EXCEEDED.
+        profiling: times the stages of a sample of the predictions, the value is a dictionary with the keys enabled
+            (bool), sample_rate (float, the fraction of the predictions that are timed) and profile_slowest (int, the
+            number of cProfile profiles of the slowest sampled predictions that are kept, 0 turns cProfile off).
+        executor: makes the predictions of the model in its own pool of workers, so that a slow model does not hold
+            the threads that the other models need, the value is a dictionary with the keys type (str, "thread" or
+            "process"), max_workers (int, the number of predictions made at the same time), max_queue_size (int,
+            the number of predictions that wait for a worker, the predictions that arrive when the queue is full are
+            rejected with RESOURCE_EXHAUSTED, max_workers by default, None means the queue is not limited) and
+            buffer_size (int, the size in bytes of the shared memory buffer of each worker process that numeric arrays
+            are passed in). Process pools create their own model objects, so they are not changed when the models are
+            reloaded.
+        artifacts: files that are loaded with model_artifacts.load_artifact() and passed to the model class as
+            keyword arguments when the model object is created, in the service and in the worker processes of a
+            process pool, so that all of the processes share the memory-mapped arrays in them. The value is a
+            dictionary with the keys files (dict, maps the names of the arguments to the paths of the files) and
+            cache_directory (str, the private directory that the memory-mappable copies are stored in, by default
+            the "model_grpc_service/artifacts" directory in $XDG_CACHE_HOME or ~/.cache).
+
+    Each entry in the pipelines list is served by a "{qualified_name}_predict" operation that makes a prediction with
+    several of the models in one call, the models are called in the service process and pass their inputs and outputs
+    to each other as dictionaries. An entry is a dictionary with the keys qualified_name (str) and type (str):
+        pipeline: calls the models in the steps list (list of qualified names) one after another, the output of each
+            model, cut down to the input fields of the next model, is the input of the next one, so the input fields of
+            each step must be output fields of the step before it. The operation takes the input of the first model and
+            returns the output of the last model.
+        ensemble: calls the models in the members list (list of qualified names) at the same time with the same input
+            and combines their outputs field by field, combine (str) is "vote", which takes the most common value, or
+            "mean", which takes the mean of the numbers, rounded for the integer fields, and the most common value of
+            the other fields. The members must have the same input and output fields, the operation takes and returns
+            the ones of the first member. The members after the first one make their predictions in a pool of
+            max_workers (int) threads, by default max_workers of the service times the number of members minus one.
+    The models of a pipeline or ensemble are called directly, without the admission control, execution pool and cache of
+    their own operations, the pipeline or ensemble checks the deadline of the request itself before the models are
+    called.
+    The pipelines are read when the protocol buffers are generated.
+
+    The metrics_port option sets the port that the metrics of the service are served on at /metrics in the Prometheus
+    text format, None turns the metrics server off. When there is more than one worker process, each worker serves its
+    own metrics on metrics_port plus the index of the worker. The metrics_address option sets the address that the
+    metrics server listens on, by default "localhost" so that the metrics and profiles are only served to the same
+    host, "" listens on all addresses.
+
+    When the service process receives SIGHUP, it imports this module again, loads the models in it, and swaps them
+    into the service without a restart.
+
+    """
+
+    server_mode = "sync"
+    max_workers = 10
+    maximum_concurrent_rpcs = None
+    worker_processes = 1
+    model_loading = "sequential"
+    model_loading_workers = None
+    metrics_port = None
+    metrics_address = "localhost"
+    pipelines = []
 
     models = [
         {
             "module_name": "iris_model.iris_predict",
-            "class_name": "IrisModel"
+            "class_name": "IrisModel",
+            "tensor_input": {"enabled": True},
+            "warm_up": {"synthetic_inputs": 16}
         }
     ]
 
@@ -0,0 +1,381 @@
+"""Execution pools that isolate the predictions of a model from the predictions of the other models."""
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import grpc
+
+from model_grpc_service import metrics
+from model_grpc_service.admission_control import AdmissionRejected
+from model_grpc_service.model_manager import import_model_class, create_model
+
+# the logger is named after the package like the loggers of the other modules, this module does not replace its
+# __name__ because the functions sent to the worker processes are pickled by module and name
+logger = logging.getLogger("model_grpc_service")
+
+_queue_depth = metrics.registry.gauge("model_pool_queue_depth",
+                                      "Number of predictions waiting for a worker of the execution pool of a model.",
+                                      ("model",))
+_worker_restarts = metrics.registry.counter("model_pool_worker_restarts_total",
+                                            "Number of worker processes of the execution pool of a model that were "
+                                            "restarted after they stopped.", ("model",))
+
+# the default size in bytes of the shared buffer of each worker process
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+
+# these functions call the methods of a model in the workers of a pool, they are sent to the worker processes by module
+# and name
+def predict(model, data):
+    """Make a prediction with a model, can be passed to ExecutionPool.call()."""
+    return model.predict(data=data)
+
+
+def predict_batch(model, data):
+    """Make predictions for a batch of inputs with a model, can be passed to ExecutionPool.call()."""
+    return model.predict_batch(data=data)
+
+
+def predict_array(model, array):
+    """Make predictions for the rows of an array with a model, can be passed to ExecutionPool.call()."""
+    return model.predict_array(array)
+
+
+def _worker_main(configuration, connection, buffer):
+    # creating the model and making the predictions that the pool sends until the pool closes the connection
+    try:
+        model = create_model(import_model_class(configuration), configuration)
+    except Exception as e:
+        _send_result(connection, "error", e)
+        return
+    connection.send(("ready", None))
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        function, args, array_index, dtype, shape = message
+        if array_index is not None:
+            # the array was copied into the shared buffer by the pool, the model gets a view of the buffer that is
+            # only valid until the next request
+            args = list(args)
+            args[array_index] = np.frombuffer(buffer, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        try:
+            result = function(model, *args)
+        except Exception as e:
+            _send_result(connection, "error", e)
+        else:
+            _send_result(connection, "ok", result)
+
+
+def _send_result(connection, status, value):
+    try:
+        connection.send((status, value))
+    except Exception as e:
+        # the result or the exception could not be pickled
+        connection.send(("error", RuntimeError("The worker could not send the result: {}".format(e))))
+
+
+class _WorkerCrashed(Exception):
+    """Raised when the process of a worker stops while the pool is talking to it."""
+
+    def __init__(self, sent):
+        super().__init__()
+        # False when the worker stopped before the request was sent to it, so the request can be sent to another one
+        self.sent = sent
+
+
+class _WorkerTimedOut(Exception):
+    """Raised when a worker does not return the result of a prediction before the deadline of the prediction."""
+
+
+class _WorkerProcess(object):
+    """A process that holds its own model object and makes predictions for a pool.
+
+    The process gets a buffer of shared memory when it starts, a numeric array that fits in the buffer is copied into it
+    instead of being pickled and sent through the pipe.
+
+    """
+
+    def __init__(self, context, configuration, buffer_size):
+        self.buffer = context.RawArray("b", buffer_size)
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(configuration, child_connection, self.buffer),
+                                       daemon=True)
+        self.process.start()
+        # closing the parent's copy of the child's end of the pipe, so that reading from the pipe fails when the
+        # process stops
+        child_connection.close()
+        self._ready = False
+
+    def wait_until_ready(self):
+        """Wait for the worker to create its model, raises the exception that the worker failed with."""
+        if self._ready:
+            return
+        try:
+            status, value = self.connection.recv()
+        except (EOFError, OSError) as e:
+            raise _WorkerCrashed(sent=False) from e
+        if status == "error":
+            raise value
+        self._ready = True
+
+    def call(self, function, args, timeout=None):
+        self.wait_until_ready()
+        try:
+            message = (function, args, None, None, None)
+            for index, arg in enumerate(args):
+                if isinstance(arg, np.ndarray) and arg.dtype.kind in "biuf" and arg.nbytes <= len(self.buffer):
+                    target = np.frombuffer(self.buffer, dtype=arg.dtype, count=arg.size).reshape(arg.shape)
+                    target[...] = arg
+                    message = (function, args[:index] + (None,) + args[index + 1:], index, arg.dtype.str, arg.shape)
+                    break
+
+            self.connection.send(message)
+        except OSError as e:
+            raise _WorkerCrashed(sent=False) from e
+        try:
+            if timeout is not None and not self.connection.poll(max(timeout, 0.0)):
+                raise _WorkerTimedOut()
+            status, value = self.connection.recv()
+        except (EOFError, OSError) as e:
+            raise _WorkerCrashed(sent=True) from e
+
+        if status == "error":
+            raise value
+        return value
+
+    def stop(self, timeout=5.0):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+class ExecutionPool(object):
+    """Runs the predictions of one model in a dedicated pool of threads or processes.
+
+    Each model with a pool has its own workers, so a slow model can only use up its own workers. When max_queue_size
+    predictions are already waiting for a worker, new predictions are rejected with RESOURCE_EXHAUSTED instead of
+    waiting, so that the threads of the gRPC server are not held by a model that is overloaded.
+
+    A process pool starts max_workers processes that each create their own model object from the model's configuration,
+    so models that hold the GIL can use more than one core, and reloading the models does not change them. The pool
+    waits for the workers to create their models when it is created. The requests and responses are pickled and sent
+    through a pipe, except for numeric arrays that fit in the shared buffer of the worker, which are copied into the
+    buffer. A worker that stops while it makes a prediction is restarted and the prediction fails with UNAVAILABLE, a
+    worker that stopped while it was idle is restarted and the prediction is sent to the next free worker. A worker
+    that does not return its result before the deadline of the prediction is stopped and restarted, and the prediction
+    fails with DEADLINE_EXCEEDED. The restarted workers are only given predictions once they have created their models,
+    so that the time it takes to create a model is not added to a prediction. The functions sent to a process pool must
+    be defined at the top level of a module so that they can be pickled.
+
+    """
+
+    def __init__(self, model_qualified_name, configuration, kind="thread", max_workers=1, max_queue_size=None,
+                 buffer_size=DEFAULT_BUFFER_SIZE):
+        """Create an execution pool.
+
+        :param model_qualified_name: The qualified name of the model.
+        :type model_qualified_name: str
+        :param configuration: The configuration of the model, used to create the model in each process of a process
+            pool.
+        :type configuration: dict
+        :param kind: "thread" or "process".
+        :type kind: str
+        :param max_workers: The number of threads or processes, the maximum number of predictions made at the same
+            time.
+        :type max_workers: int
+        :param max_queue_size: The maximum number of predictions that wait for a worker, None does not limit them,
+            which lets the predictions that wait for a slow model hold the threads of the gRPC server.
+        :type max_queue_size: int
+        :param buffer_size: The size in bytes of the shared buffer of each worker process.
+        :type buffer_size: int
+
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be greater than zero.")
+        if max_queue_size is None:
+            logger.warning("The execution pool of model '{}' does not limit the number of predictions that wait for "
+                           "a worker.".format(model_qualified_name))
+
+        self._executor = None
+        self._workers = None
+        if kind == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                thread_name_prefix="{}-pool".format(model_qualified_name))
+        elif kind == "process":
+            # the processes are spawned instead of forked because forking a process that runs gRPC threads is unsafe
+            self._context = multiprocessing.get_context("spawn")
+            self._configuration = dict(configuration)
+            self._buffer_size = buffer_size
+            workers = [_WorkerProcess(self._context, self._configuration, buffer_size) for _ in range(max_workers)]
+            # waiting for the workers to create their models, so that a model that cannot be created fails when the
+            # pool is created instead of on the first request
+            try:
+                for worker in workers:
+                    worker.wait_until_ready()
+            except BaseException as e:
+                for worker in workers:
+                    worker.stop(timeout=0.0)
+                if isinstance(e, _WorkerCrashed):
+                    raise RuntimeError("A worker process of model '{}' stopped while it created the model.".format(
+                        model_qualified_name)) from e
+                raise
+            # the workers that are not making a prediction, a thread takes a worker out of the queue to use it
+            self._workers = queue.Queue()
+            for worker in workers:
+                self._workers.put(worker)
+        else:
+            raise ValueError("'{}' is not a valid execution pool type.".format(kind))
+
+        self._kind = kind
+        self._max_workers = max_workers
+        self._max_queue_size = max_queue_size
+        self._qualified_name = model_qualified_name
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._queue_depth = _queue_depth.labels(model_qualified_name)
+        self._worker_restarts = _worker_restarts.labels(model_qualified_name)
+
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    @property
+    def kind(self):
+        """Type of the pool, "thread" or "process"."""
+        return self._kind
+
+    def call(self, function, model, *args, timeout=None):
+        """Call function(model, *args) in a worker of the pool and return its result.
+
+        In a process pool the function is called with the model object of the process instead of the model that is
+        passed in.
+
+        :param timeout: The number of seconds until the deadline of the prediction, None waits without a deadline. A
+            thread cannot be stopped, so only the process pools stop waiting at the deadline.
+        :type timeout: float
+        :raises AdmissionRejected: If the queue of the pool is full, if the worker process stopped while it made the
+            prediction, or if the deadline passed before a worker process returned the result.
+
+        """
+        with self._lock:
+            if self._max_queue_size is not None and self._pending >= self._max_workers + self._max_queue_size:
+                self.rejected += 1
+                raise AdmissionRejected(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                                        "The execution pool of model '{}' is full.".format(self._qualified_name))
+            self._pending += 1
+            self._queue_depth.set(max(self._pending - self._max_workers, 0))
+
+        try:
+            if self._kind == "thread":
+                return self._executor.submit(function, model, *args).result()
+            return self._call_worker(function, args, timeout)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+                self._queue_depth.set(max(self._pending - self._max_workers, 0))
+
+    def _call_worker(self, function, args, timeout):
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        resent = False
+        while True:
+            worker = self._next_worker(deadline)
+            try:
+                result = worker.call(function, args, timeout=deadline - time.monotonic() if deadline is not None
+                                     else None)
+            except _WorkerCrashed as e:
+                self._restart_worker(worker)
+                if e.sent or resent:
+                    raise AdmissionRejected(grpc.StatusCode.UNAVAILABLE,
+                                            "The worker process of model '{}' stopped.".format(self._qualified_name))
+                # the worker stopped before it got the prediction, so the prediction is sent to the next free worker
+                resent = True
+                continue
+            except _WorkerTimedOut:
+                # the worker is still making the prediction and its result would be read by the next prediction, so
+                # the worker is replaced
+                self._restart_worker(worker, timed_out=True)
+                raise AdmissionRejected(grpc.StatusCode.DEADLINE_EXCEEDED,
+                                        "The worker process of model '{}' did not return the prediction before the "
+                                        "deadline.".format(self._qualified_name))
+            except BaseException:
+                self._workers.put(worker)
+                raise
+            self._workers.put(worker)
+            return result
+
+    def _next_worker(self, deadline):
+        while True:
+            try:
+                worker = self._workers.get(timeout=max(deadline - time.monotonic(), 0.0) if deadline is not None
+                                           else None)
+            except queue.Empty:
+                raise AdmissionRejected(grpc.StatusCode.DEADLINE_EXCEEDED,
+                                        "The deadline passed before a worker process of model '{}' was free.".format(
+                                            self._qualified_name))
+            if worker.process.is_alive():
+                return worker
+            # a worker that stopped while it was idle is replaced, and the prediction waits for the next free worker
+            self._restart_worker(worker)
+
+    def _restart_worker(self, worker, timed_out=False):
+        if timed_out:
+            logger.error("A worker process of model '{}' did not return a prediction before its deadline, restarting "
+                         "it.".format(self._qualified_name))
+        else:
+            logger.error("A worker process of model '{}' stopped with exit code {}, restarting it.".format(
+                self._qualified_name, worker.process.exitcode))
+        worker.stop(timeout=0.0)
+        with self._lock:
+            self.restarts += 1
+        self._worker_restarts.inc()
+        new_worker = _WorkerProcess(self._context, self._configuration, self._buffer_size)
+        threading.Thread(target=self._add_worker, args=(new_worker,), name="{}-pool-restart".format(
+            self._qualified_name), daemon=True).start()
+
+    def _add_worker(self, worker):
+        # the new worker is only given predictions once it has created its model, so that the time it takes to create
+        # the model is not added to a prediction
+        try:
+            worker.wait_until_ready()
+        except Exception:
+            # the worker is given back anyway, the prediction that gets it restarts it again
+            logger.exception("A restarted worker process of model '{}' could not create the model.".format(
+                self._qualified_name))
+        self._workers.put(worker)
+
+    def stats(self):
+        """Return the queue depth and counters of the pool.
+
+        The predictions that are pending are assumed to occupy the workers first, the rest of them are queued.
+
+        """
+        with self._lock:
+            pending = self._pending
+            return {"workers": self._max_workers, "active": min(pending, self._max_workers),
+                    "queued": max(pending - self._max_workers, 0), "completed": self.completed,
+                    "rejected": self.rejected, "restarts": self.restarts}
+
+    def shutdown(self, wait=True):
+        """Stop the workers of the pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            return
+        for _ in range(self._max_workers):
+            self._workers.get().stop(timeout=5.0 if wait else 0.0)
@@ -0,0 +1,79 @@
+"""Readiness of the model service and of each model, reported through the standard gRPC health checking service."""
+import asyncio
+import logging
+import grpc
+from grpc_health.v1 import health, health_pb2, health_pb2_grpc
+
+from model_grpc_service import __name__
+
+logger = logging.getLogger(__name__)
+
+# the name that the health of the whole service is reported under, along with the empty name
+SERVICE_NAME = "model_grpc_service.ModelgRPCService"
+
+SERVING = health_pb2.HealthCheckResponse.SERVING
+NOT_SERVING = health_pb2.HealthCheckResponse.NOT_SERVING
+
+
+def create_health_servicer():
+    """Create the health servicer of the sync gRPC server."""
+    return health.HealthServicer()
+
+
+class AsyncHealthServicer(health_pb2_grpc.HealthServicer):
+    """Health servicer for the asyncio gRPC server.
+
+    The servicer in grpc_health blocks a thread for each Watch call, so the asyncio server uses this one instead. It
+    must be created and its set() method must be called in the event loop of the server.
+
+    """
+
+    def __init__(self):
+        """Create a health servicer that does not know any services."""
+        self._statuses = {}
+        # the event is set and replaced every time a status changes, so that the watchers wake up
+        self._changed = asyncio.Event()
+
+    def set(self, service, status):
+        """Set the status of a service."""
+        self._statuses[service] = status
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def Check(self, request, context):
+        """Return the status of a service."""
+        status = self._statuses.get(request.service)
+        if status is None:
+            await context.abort(grpc.StatusCode.NOT_FOUND, "Service '{}' is not known.".format(request.service))
+        return health_pb2.HealthCheckResponse(status=status)
+
+    async def Watch(self, request, context):
+        """Send the status of a service, and send it again every time it changes."""
+        last_status = None
+        while True:
+            changed = self._changed
+            status = self._statuses.get(request.service, health_pb2.HealthCheckResponse.SERVICE_UNKNOWN)
+            if status != last_status:
+                yield health_pb2.HealthCheckResponse(status=status)
+                last_status = status
+            await changed.wait()
+
+
+def add_health_servicer_to_server(health_servicer, server, model_names):
+    """Add a health servicer to a server and report the service and all of its models as NOT_SERVING.
+
+    :param health_servicer: A health servicer with a set(service, status) method.
+    :param server: The gRPC server.
+    :param model_names: The qualified names of the models, the status of each one is reported under its name.
+    :type model_names: list
+
+    """
+    health_pb2_grpc.add_HealthServicer_to_server(health_servicer, server)
+    for service in ["", SERVICE_NAME] + list(model_names):
+        health_servicer.set(service, NOT_SERVING)
+
+
+def set_service_status(health_servicer, status):
+    """Set the status of the whole service, under the empty name and the name of the service."""
+    for service in ("", SERVICE_NAME):
+        health_servicer.set(service, status)
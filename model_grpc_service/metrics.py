@@ -0,0 +1,339 @@
+"""Metrics of the model service, exposed in the Prometheus text format."""
+import bisect
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from model_grpc_service import __name__
+from model_grpc_service import stage_profiler
+
+logger = logging.getLogger(__name__)
+
+# the upper bounds of the buckets of the latency histograms, in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _CounterChild(object):
+    """Value of a counter for one set of label values."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        """Add an amount to the counter."""
+        with self.lock:
+            self.value += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class _GaugeChild(object):
+    """Value of a gauge for one set of label values."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        """Add an amount to the gauge."""
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1.0):
+        """Subtract an amount from the gauge."""
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        """Set the value of the gauge."""
+        with self.lock:
+            self.value = value
+
+    def samples(self, name, labels):
+        return [(name, labels, self.value)]
+
+
+class _HistogramChild(object):
+    """Buckets of a histogram for one set of label values."""
+
+    def __init__(self, lock, buckets):
+        self.lock = lock
+        self._buckets = buckets
+        # the last count is for the observations that are greater than the largest bucket
+        self._counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Add an observation to the histogram."""
+        index = self.bucket_index(value)
+        with self.lock:
+            self.add(index, value)
+
+    def bucket_index(self, value):
+        """Return the index of the bucket that a value falls in."""
+        return bisect.bisect_left(self._buckets, value)
+
+    def add(self, index, value):
+        """Add an observation to the histogram without taking its lock, the caller must hold the lock."""
+        self._counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        with self.lock:
+            counts = list(self._counts)
+            total, count = self.sum, self.count
+
+        samples = []
+        cumulative_count = 0
+        for upper_bound, bucket_count in zip(self._buckets + (float("inf"),), counts):
+            cumulative_count += bucket_count
+            samples.append((name + "_bucket", labels + (("le", _format_value(upper_bound)),), cumulative_count))
+        samples.append((name + "_sum", labels, total))
+        samples.append((name + "_count", labels, count))
+        return samples
+
+
+class Metric(object):
+    """A metric with a value for each set of label values."""
+
+    def __init__(self, name, documentation, metric_type, label_names, child_factory):
+        """Create a metric, use the methods of a MetricsRegistry instead of calling this directly."""
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.label_names = tuple(label_names)
+        self._child_factory = child_factory
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *label_values, lock=None):
+        """Get the value of the metric for a set of label values, callers should keep it instead of looking it up.
+
+        :param label_values: The values of the labels, in the same order as the label names of the metric.
+        :param lock: The lock that guards the value when it is created, values of several metrics that are always
+            updated together can share one lock so that they are updated under one lock.
+        :type lock: threading.Lock
+        :returns: An object with the methods of the metric type, like inc() or observe().
+
+        """
+        if len(label_values) != len(self.label_names):
+            raise ValueError("Metric '{}' has {} labels, {} values were given.".format(
+                self.name, len(self.label_names), len(label_values)))
+
+        label_values = tuple(str(value) for value in label_values)
+        with self._lock:
+            child = self._children.get(label_values)
+            if child is None:
+                child = self._child_factory(lock if lock is not None else threading.Lock())
+                self._children[label_values] = child
+            return child
+
+    def render(self):
+        """Render the metric in the Prometheus text format."""
+        lines = ["# HELP {} {}".format(self.name, self.documentation.replace("\\", "\\\\").replace("\n", "\\n")),
+                 "# TYPE {} {}".format(self.name, self.metric_type)]
+        with self._lock:
+            children = sorted(self._children.items())
+        for label_values, child in children:
+            labels = tuple(zip(self.label_names, label_values))
+            for name, sample_labels, value in child.samples(self.name, labels):
+                lines.append("{}{} {}".format(name, _format_labels(sample_labels), _format_value(value)))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry(object):
+    """Holds a set of metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        """Create an empty metrics registry."""
+        self._metrics = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, label_names=()):
+        """Get or create a counter, a value that only goes up."""
+        return self._get_or_create(name, documentation, "counter", label_names, _CounterChild)
+
+    def gauge(self, name, documentation, label_names=()):
+        """Get or create a gauge, a value that goes up and down."""
+        return self._get_or_create(name, documentation, "gauge", label_names, _GaugeChild)
+
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        """Get or create a histogram, which counts observations in buckets by their value."""
+        buckets = tuple(sorted(float(bucket) for bucket in buckets))
+        return self._get_or_create(name, documentation, "histogram", label_names,
+                                   lambda lock: _HistogramChild(lock, buckets))
+
+    def add_callback(self, callback):
+        """Add a function that is called before the metrics are rendered.
+
+        The callbacks update the metrics that are read when they are scraped instead of being recorded when they change.
+
+        """
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def render(self):
+        """Render all of the metrics in the registry in the Prometheus text format."""
+        with self._lock:
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("A metrics callback failed.")
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "".join(metric.render() for metric in metrics)
+
+    def _get_or_create(self, name, documentation, metric_type, label_names, child_factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Metric(name, documentation, metric_type, label_names, child_factory)
+                self._metrics[name] = metric
+            elif metric.metric_type != metric_type or metric.label_names != tuple(label_names):
+                raise ValueError("Metric '{}' is already registered as a {} with different labels.".format(
+                    name, metric.metric_type))
+            return metric
+
+
+def _format_labels(labels):
+    if len(labels) == 0:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(
+        name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+# the registry that the service records its metrics in
+registry = MetricsRegistry()
+
+_requests = registry.counter("model_requests_total", "Number of requests handled by each model and RPC.",
+                             ("model", "rpc"))
+_errors = registry.counter("model_request_errors_total", "Number of requests that failed, by model and RPC.",
+                           ("model", "rpc"))
+_in_flight = registry.gauge("model_requests_in_flight", "Number of requests being handled, by model and RPC.",
+                            ("model", "rpc"))
+_request_latency = registry.histogram("model_request_latency_seconds",
+                                      "Time it takes to handle a whole request, by model and RPC.", ("model", "rpc"))
+_predict_latency = registry.histogram("model_predict_latency_seconds",
+                                      "Time spent in the model's predict method, by model and method.",
+                                      ("model", "method"))
+
+
+class RequestMetrics(object):
+    """Records the count, errors, requests in flight, and latency of the requests to one RPC of a model."""
+
+    def __init__(self, model_qualified_name, rpc):
+        """Create the metrics of an RPC of a model.
+
+        :param model_qualified_name: The qualified name of the model.
+        :type model_qualified_name: str
+        :param rpc: The name of the RPC, for example "predict".
+        :type rpc: str
+
+        """
+        # looking up the values of the metrics once, so that recording a request does not look up the labels, the
+        # values share one lock so that a finished request is recorded under a single lock
+        self._requests = _requests.labels(model_qualified_name, rpc)
+        self._lock = self._requests.lock
+        self._errors = _errors.labels(model_qualified_name, rpc, lock=self._lock)
+        self._in_flight = _in_flight.labels(model_qualified_name, rpc, lock=self._lock)
+        self._latency = _request_latency.labels(model_qualified_name, rpc, lock=self._lock)
+
+    def start(self):
+        """Record that a request started, returns the start time that is passed to finish()."""
+        with self._lock:
+            self._in_flight.value += 1
+        return time.perf_counter()
+
+    def finish(self, start_time, failed=False):
+        """Record that a request that started at start_time finished."""
+        latency = time.perf_counter() - start_time
+        index = self._latency.bucket_index(latency)
+        with self._lock:
+            self._latency.add(index, latency)
+            self._in_flight.value -= 1
+            self._requests.value += 1
+            if failed:
+                self._errors.value += 1
+
+
+def predict_latency(model_qualified_name, method):
+    """Get the histogram of the time spent in a method of a model, like "predict" or "predict_batch"."""
+    return _predict_latency.labels(model_qualified_name, method)
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            self._send(self.server.registry.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+        elif path == "/profile":
+            # the stage timings of each model that is profiled and the total times of its kept cProfile profiles
+            profiles = {name: {"stages": profiler.stats(),
+                               "slowest_profiles": [total for total, _ in profiler.slowest_profiles()]}
+                        for name, profiler in list(stage_profiler.profilers.items())}
+            self._send(json.dumps(profiles).encode("utf-8"), "application/json")
+        elif path.startswith("/profile/"):
+            # a kept cProfile profile, at /profile/{qualified_name}/{rank}, that can be saved and read with pstats
+            parts = path.split("/")
+            profiler = stage_profiler.profilers.get(parts[2]) if len(parts) == 4 else None
+            data = profiler.profile_data(int(parts[3])) if profiler is not None and parts[3].isdigit() else None
+            if data is None:
+                self.send_error(404)
+                return
+            self._send(data, "application/octet-stream")
+        else:
+            self.send_error(404)
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # the requests of the metrics scraper are not logged
+        pass
+
+
+def start_metrics_server(port, address="localhost", metrics_registry=registry):
+    """Serve the metrics in a registry at http://address:port/metrics from a background thread.
+
+    The results of the stage profilers of the models are served at /profile as JSON, and each kept cProfile profile
+    is served at /profile/{qualified_name}/{rank}, the profile of the slowest prediction has rank 0.
+
+    :param port: The port to listen on, 0 picks a free port.
+    :type port: int
+    :param address: The address to listen on, the default only accepts connections from the same host, "" listens on
+        all addresses.
+    :type address: str
+    :param metrics_registry: The registry to serve.
+    :type metrics_registry: model_grpc_service.metrics.MetricsRegistry
+    :returns: The HTTP server, call shutdown() on it to stop it.
+    :rtype: http.server.ThreadingHTTPServer
+
+    """
+    server = ThreadingHTTPServer((address, port), _MetricsRequestHandler)
+    server.daemon_threads = True
+    server.registry = metrics_registry
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info("Serving metrics on {}:{}.".format(server.server_address[0], server.server_address[1]))
+    return server
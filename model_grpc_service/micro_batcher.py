@@ -0,0 +1,107 @@
+"""Class that groups concurrent single predictions into batches."""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from model_grpc_service import __name__
+from model_grpc_service.admission_control import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+# this object is put into the queue to stop the worker thread
+_STOP = object()
+
+
+class MicroBatcher(object):
+    """Queue single predictions and make them together in one batched predict call.
+
+    A batch is flushed as soon as it holds max_batch_size inputs, or when max_wait_time seconds have passed since the
+    first input in the batch was queued, whichever happens first. When a batch fails its inputs are retried one at a
+    time, so that one bad input does not fail the others, except when the batch is rejected with AdmissionRejected,
+    which fails all of the inputs in the batch.
+
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_time=0.005):
+        """Create a micro batcher.
+
+        :param predict_batch: Function that accepts a list of inputs and returns a list of predictions in the same
+            order.
+        :type predict_batch: callable
+        :param max_batch_size: The maximum number of inputs in one batch.
+        :type max_batch_size: int
+        :param max_wait_time: The maximum number of seconds an input will wait in the queue for other inputs.
+        :type max_wait_time: float
+
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be greater than zero.")
+        if max_wait_time < 0:
+            raise ValueError("max_wait_time cannot be negative.")
+
+        self._predict_batch = predict_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait_time = max_wait_time
+        self._queue = queue.Queue()
+
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, data):
+        """Queue an input and wait for the prediction made for it."""
+        future = Future()
+        self._queue.put((data, future))
+        return future.result()
+
+    def close(self):
+        """Stop the worker thread after the inputs already in the queue are processed."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # collecting inputs until the batch is full or the oldest input in it has waited long enough
+            batch = [item]
+            deadline = time.monotonic() + self._max_wait_time
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._process_batch(batch)
+
+    def _process_batch(self, batch):
+        try:
+            predictions = self._predict_batch([data for data, _ in batch])
+        except AdmissionRejected as e:
+            # the model's pool is overloaded or stopped, retrying the inputs one at a time would only add to its load,
+            # so the whole batch fails with the rejection
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # one bad input should not fail the other inputs in the batch, so the inputs are retried one at a time
+            # to send each caller its own result or exception
+            logger.warning("Batch of {} inputs failed, retrying inputs one at a time.".format(len(batch)))
+            for item in batch:
+                self._process_batch([item])
+            return
+
+        for (_, future), prediction in zip(batch, predictions):
+            future.set_result(prediction)
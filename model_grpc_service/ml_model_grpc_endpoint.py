@@ -1,13 +1,55 @@
 """Class to host an MlModel object in a gRPC endpoint."""
 import logging
+import queue
+import threading
+import time
+import numpy as np
+import grpc
 from google.protobuf.json_format import MessageToDict
 
+from google.protobuf.descriptor import FieldDescriptor
+
 import model_service_pb2
 from model_grpc_service import __name__
 from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.micro_batcher import MicroBatcher
+from model_grpc_service.prediction_cache import PredictionCache
+from model_grpc_service.single_flight import SingleFlight
+from model_grpc_service.stage_profiler import StageProfiler
+from model_grpc_service import stage_profiler
+from model_grpc_service.admission_control import AdmissionController, AdmissionRejected
+from model_grpc_service.execution_pool import ExecutionPool, DEFAULT_BUFFER_SIZE
+from model_grpc_service.synthetic_inputs import warm_up_inputs
+from model_grpc_service import execution_pool
+from model_grpc_service import metrics
+
+try:
+    import model_service_converters
+except ImportError:
+    model_service_converters = None
 
 logger = logging.getLogger(__name__)
 
+# this object is put into the queue of a stream when all of the messages in the stream have been read
+_END_OF_STREAM = object()
+
+# this dict maps the field types of the model schema to the protocol buffer field types that can hold them
+_field_type_mappings = {
+    "string": (FieldDescriptor.TYPE_STRING,),
+    "number": (FieldDescriptor.TYPE_FLOAT, FieldDescriptor.TYPE_DOUBLE),
+    "integer": (FieldDescriptor.TYPE_INT64, FieldDescriptor.TYPE_INT32, FieldDescriptor.TYPE_SINT64,
+                FieldDescriptor.TYPE_SINT32, FieldDescriptor.TYPE_UINT64, FieldDescriptor.TYPE_UINT32),
+    "boolean": (FieldDescriptor.TYPE_BOOL,)
+}
+
+# this dict maps the types of the input fields of a model to the type of the values in its tensor input buffer, the
+# buffer is little-endian, this must match the types chosen by scripts/generate_proto.py
+_tensor_dtype_mappings = {
+    frozenset([FieldDescriptor.TYPE_FLOAT]): np.dtype("<f4"),
+    frozenset([FieldDescriptor.TYPE_INT64]): np.dtype("<i8"),
+    frozenset([FieldDescriptor.TYPE_FLOAT, FieldDescriptor.TYPE_INT64]): np.dtype("<f8")
+}
+
 
 class MLModelgRPCEndpoint(object):
     """Class for MLModel gRPC endpoints."""
@@ -21,34 +63,667 @@ class MLModelgRPCEndpoint(object):
         :rtype: MLModelStreamProcessor
 
         """
-        model_manager = ModelManager()
-        self._model = model_manager.get_model(model_qualified_name)
+        # the model object is looked up in the ModelManager when a prediction is made, so that the endpoint can be
+        # created before a lazily loaded model is created
+        self._model_manager = ModelManager()
+        self._qualified_name = model_qualified_name
+        model_metadata = self._model_manager.get_model_metadata(model_qualified_name)
+        model_class = self._model_manager.get_model_class(model_qualified_name)
 
-        if self._model is None:
+        if model_metadata is None:
             raise ValueError("'{}' not found in ModelManager instance.".format(model_qualified_name))
 
-        logger.info("Initializing endpoint for model: {}".format(self._model.qualified_name))
+        logger.info("Initializing endpoint for model: {}".format(model_qualified_name))
+
+        # resolving the model's protocol buffers once, this code relies on the fact that a model's protobufs are always
+        # named the same way, the endpoint fails here if the generated protobufs don't match the model's schemas
+        self._input_protobuf = MLModelgRPCEndpoint._get_protobuf("{}_input".format(model_qualified_name))
+        self._output_protobuf = MLModelgRPCEndpoint._get_protobuf("{}_output".format(model_qualified_name))
+        self._batch_output_protobuf = MLModelgRPCEndpoint._get_protobuf(
+            "{}_batch_output".format(model_qualified_name))
+        MLModelgRPCEndpoint._check_fields(self._input_protobuf, model_metadata["input_schema"])
+        MLModelgRPCEndpoint._check_fields(self._output_protobuf, model_metadata["output_schema"])
+
+        # using the generated converter functions for the model's protocol buffers when they exist, they access the
+        # fields of the protocol buffers directly instead of going through the reflection in json_format
+        self._input_to_dict = MLModelgRPCEndpoint._get_converter("{}_input_to_dict".format(model_qualified_name))
+        if self._input_to_dict is None:
+            self._input_to_dict = MLModelgRPCEndpoint._message_to_dict
+
+        self._output_from_dict = MLModelgRPCEndpoint._get_converter("{}_output_from_dict".format(model_qualified_name))
+        if self._output_from_dict is None:
+            output_protobuf = self._output_protobuf
+            self._output_from_dict = lambda data: output_protobuf(**data)
+
+        # if the tensor input protocol buffer was generated for the model, batches of inputs can be sent in one buffer
+        # of numbers, the columns of the buffer are the fields of the input protocol buffer in order
+        self._tensor_input_protobuf = getattr(model_service_pb2, "{}_tensor_input".format(model_qualified_name), None)
+        if self._tensor_input_protobuf is not None:
+            input_fields = self._input_protobuf.DESCRIPTOR.fields
+            self._tensor_columns = [field.name for field in input_fields]
+            self._tensor_dtype = _tensor_dtype_mappings.get(frozenset(field.type for field in input_fields))
+            if self._tensor_dtype is None:
+                raise ValueError("Protocol buffer '{}' must have only float and int64 fields to have a tensor "
+                                 "input.".format(self._input_protobuf.DESCRIPTOR.name))
+            self._tensor_integer_columns = [index for index, field in enumerate(input_fields)
+                                            if field.type == FieldDescriptor.TYPE_INT64]
+
+        # if batching is turned on for the model, single predictions are queued and made in batches
+        configuration = self._model_manager.get_model_configuration(model_qualified_name) or {}
+        batching = configuration.get("batching")
+        if batching is not None:
+            self._batcher = MicroBatcher(predict_batch=self._predict_batch, **batching)
+            logger.info("Batching predictions for model: {}".format(model_qualified_name))
+        else:
+            self._batcher = None
+
+        # the maximum number of messages from a stream that are grouped into one batch
+        self._stream_max_batch_size = configuration.get("streaming", {}).get("max_batch_size", 32)
+
+        # the inputs that the endpoint is warmed up with before the service reports that the model is serving
+        self._warm_up = configuration.get("warm_up", {})
+
+        # if caching is turned on for the model, responses are cached by the serialized bytes of the request, only
+        # models that declare that they always make the same prediction for the same input can be cached
+        cache = configuration.get("cache")
+        if cache is not None and cache.get("enabled", True):
+            if not getattr(model_class, "deterministic", False):
+                raise ValueError("Model '{}' must declare that it is deterministic to cache its predictions.".format(
+                    model_qualified_name))
+            self._cache = PredictionCache(max_size=cache.get("max_size", 1024), ttl=cache.get("ttl"))
+            logger.info("Caching predictions for model: {}".format(model_qualified_name))
+        else:
+            self._cache = None
+
+        # if coalescing is turned on for the model, identical requests that arrive while a prediction for the same
+        # request is being made wait for that prediction instead of making their own
+        coalescing = configuration.get("coalescing")
+        if coalescing is not None and coalescing.get("enabled", True):
+            self._single_flight = SingleFlight()
+            logger.info("Coalescing identical requests for model: {}".format(model_qualified_name))
+        else:
+            self._single_flight = None
+
+        # if profiling is turned on for the model, the stages of a sample of the predictions are timed
+        profiling = configuration.get("profiling")
+        if profiling is not None and profiling.get("enabled", True):
+            self._profiler = StageProfiler(sample_rate=profiling.get("sample_rate", 0.01),
+                                           profile_slowest=profiling.get("profile_slowest", 0))
+            stage_profiler.profilers[model_qualified_name] = self._profiler
+            logger.info("Profiling predictions for model: {}".format(model_qualified_name))
+        else:
+            self._profiler = None
+
+        # if admission control is turned on for the model, the number of requests that the model handles at the same
+        # time and the number of requests that wait for it are bounded, the other requests are rejected
+        admission = configuration.get("admission")
+        if admission is not None:
+            self._admission_controller = AdmissionController(max_concurrency=admission["max_concurrency"],
+                                                             max_queue_size=admission.get("max_queue_size", 0))
+            self._priorities = admission.get("priorities", {})
+            self._default_priority = self._priorities.get(admission.get("default_priority"), 0)
+            logger.info("Admission control for model: {}".format(model_qualified_name))
+        else:
+            self._admission_controller = None
+
+        # if the model has its own execution pool, its predictions are made by the workers of the pool so that they
+        # don't compete with the predictions of the other models
+        executor = configuration.get("executor")
+        if executor is not None:
+            # the queue holds as many predictions as there are workers unless it is configured, so that the requests
+            # that wait for a slow model cannot hold all of the threads of the server
+            max_workers = executor.get("max_workers", 1)
+            self._pool = ExecutionPool(model_qualified_name, configuration, kind=executor.get("type", "thread"),
+                                       max_workers=max_workers,
+                                       max_queue_size=executor.get("max_queue_size", max_workers),
+                                       buffer_size=executor.get("buffer_size", DEFAULT_BUFFER_SIZE))
+            logger.info("Created a {} pool for model: {}".format(self._pool.kind, model_qualified_name))
+        else:
+            self._pool = None
+
+        # looking up the metrics of the endpoint once, so that recording them costs as little as possible
+        self._request_metrics = {rpc: metrics.RequestMetrics(model_qualified_name, rpc)
+                                 for rpc in ("predict", "batch_predict", "stream_predict", "tensor_predict")}
+        self._predict_latency = metrics.predict_latency(model_qualified_name, "predict")
+        self._predict_batch_latency = metrics.predict_latency(model_qualified_name, "predict_batch")
+        self._predict_array_latency = metrics.predict_latency(model_qualified_name, "predict_array")
+        # set while the thread is warming up the endpoint, so that the warm up predictions are not recorded
+        self._warm_up_state = threading.local()
+        # the deadline of the request that the thread is handling, set when the request is admitted and used by the
+        # process pool to stop waiting for a model that does not return
+        self._request_deadline = threading.local()
+
+    @property
+    def _model(self):
+        model = self._model_manager.get_model(self._qualified_name)
+        if model is None:
+            raise ValueError("'{}' is no longer loaded in the ModelManager instance.".format(self._qualified_name))
+        return model
+
+    @property
+    def stream_max_batch_size(self):
+        """Maximum number of messages from a stream that are grouped into one batch."""
+        return self._stream_max_batch_size
+
+    @property
+    def tensor_input_enabled(self):
+        """Whether the tensor input protocol buffer of the model was generated, so tensor_predict() can be called."""
+        return self._tensor_input_protobuf is not None
+
+    @property
+    def cache(self):
+        """Prediction cache of the endpoint, None if caching is not turned on for the model."""
+        return self._cache
+
+    @property
+    def single_flight(self):
+        """Single flight group of the endpoint, None if coalescing is not turned on for the model."""
+        return self._single_flight
+
+    @property
+    def profiler(self):
+        """Stage profiler of the endpoint, None if profiling is not turned on for the model."""
+        return self._profiler
+
+    @property
+    def admission_controller(self):
+        """Admission controller of the endpoint, None if admission control is not turned on for the model."""
+        return self._admission_controller
+
+    @property
+    def pool(self):
+        """Pool of workers that make the predictions of the model, None if the model does not have its own pool."""
+        return self._pool
+
+    @property
+    def request_metrics(self):
+        """Metrics of the requests to the endpoint, by RPC name."""
+        return self._request_metrics
 
     def __call__(self, request, context):
         """Make predictions with protocol buffers."""
+        request_metrics = self._request_metrics["predict"]
+        start_time = request_metrics.start()
+        try:
+            admitted = self._admit(context)
+            try:
+                response = self._call(request)
+            finally:
+                if admitted:
+                    self._admission_controller.release()
+        except BaseException:
+            request_metrics.finish(start_time, failed=True)
+            raise
+        request_metrics.finish(start_time)
+        return response
+
+    def _admit(self, context):
+        """Admit a request, returns True if the request must release its slot in the admission controller.
+
+        Requests whose deadline has already passed are rejected without running, the other requests wait in the
+        admission controller until they are admitted or their deadline passes.
+
+        """
+        timeout = None
+        # the asyncio server context does not have the time_remaining() method
+        time_remaining = getattr(context, "time_remaining", None)
+        if time_remaining is not None:
+            timeout = time_remaining()
+            if timeout is not None and timeout <= 0:
+                raise AdmissionRejected(grpc.StatusCode.DEADLINE_EXCEEDED,
+                                        "The deadline passed before the model could handle the request.")
+            # the sync server gives the calls without a deadline a time remaining of about 9.2e18 seconds
+            if timeout is not None and not timeout < threading.TIMEOUT_MAX:
+                timeout = None
+        self._request_deadline.value = time.monotonic() + timeout if timeout is not None else None
+
+        if self._admission_controller is None:
+            return False
+
+        priority = self._default_priority
+        if context is not None and len(self._priorities) > 0:
+            for key, value in context.invocation_metadata():
+                if key == "priority":
+                    priority = self._priorities.get(value, self._default_priority)
+        self._admission_controller.acquire(timeout=timeout, priority=priority)
+        return True
+
+    def _call(self, request):
+        if self._cache is None and self._single_flight is None:
+            return self._predict_protobuf(request)
+
+        key = request.SerializeToString(deterministic=True)
+
+        # returning the cached response if the same request was made before
+        if self._cache is not None:
+            response = self._cache.get(key)
+            if response is not None:
+                return response
+
+        model = self._model
+        if self._single_flight is not None:
+            response = self._single_flight.do(key, self._predict_protobuf, request, model)
+        else:
+            response = self._predict_protobuf(request, model)
+
+        # the response is only cached if the model was not replaced while the prediction was being made
+        if self._cache is not None and self._model_manager.get_model(self._qualified_name) is model:
+            self._cache.put(key, response)
+
+        return response
+
+    def warm_up(self):
+        """Make predictions with the warm up inputs of the model through all of the steps of the endpoint.
+
+        The inputs are the ones in the "inputs" key of the model's "warm_up" option, or if there are none, the number
+        of inputs in the "synthetic_inputs" key are generated from the fields of the model's input protocol buffer.
+        Each input is predicted on its own, then all of them are predicted in one batch, and in one tensor if the model
+        has a tensor input, so that the first requests do not run into cold code paths. The responses that the warm up
+        adds to the prediction cache are removed. The failures of the generated inputs are logged and the inputs are
+        left out of the batch and the tensor, the failures of the inputs in the configuration are raised.
+
+        :returns: The number of inputs that the endpoint was warmed up with.
+        :rtype: int
+
+        """
+        inputs = warm_up_inputs(self._warm_up, self._input_protobuf)
+        if len(inputs) == 0:
+            return 0
+
+        # generated values can easily be outside of what the model accepts, so their failures are only logged
+        synthetic = self._warm_up.get("inputs") is None
+        start_time = time.monotonic()
+        predicted_inputs = []
+        self._warm_up_state.active = True
+        self._request_deadline.value = None
+        try:
+            self._warm_up_inputs(inputs, synthetic, predicted_inputs)
+        finally:
+            self._warm_up_state.active = False
+
+        self.clear_cache()
+        logger.info("Warmed up endpoint for model '{}' with {} inputs in {:.3f} seconds.".format(
+            self._qualified_name, len(predicted_inputs), time.monotonic() - start_time))
+        return len(predicted_inputs)
+
+    def _warm_up_inputs(self, inputs, synthetic, predicted_inputs):
+        # the internal prediction paths are called, so that the warm up requests are not counted in the request
+        # metrics and do not take admission slots
+        for data in inputs:
+            try:
+                self._call(self._input_protobuf(**data))
+            except Exception as e:
+                if not synthetic:
+                    raise
+                logger.warning("Warming up model '{}' with a generated input failed: {}".format(
+                    self._qualified_name, e))
+                continue
+            predicted_inputs.append(data)
+        # clearing the cache so that the batch is predicted by the model instead of being found in the cache
+        self.clear_cache()
+
+        try:
+            if len(predicted_inputs) > 0:
+                self._predict_protobufs_cached([self._input_protobuf(**data) for data in predicted_inputs])
+
+            if self._tensor_input_protobuf is not None and len(predicted_inputs) > 0:
+                array = np.array([[data[column] for column in self._tensor_columns] for data in predicted_inputs],
+                                 dtype=self._tensor_dtype)
+                predictions = self._predict_array(self.tensor_to_array(
+                    self._tensor_input_protobuf(values=array.tobytes(), shape=array.shape)))
+                for prediction in predictions:
+                    self._output_from_dict(prediction)
+        except Exception as e:
+            if not synthetic:
+                raise
+            logger.warning("Warming up model '{}' with a batch of generated inputs failed: {}".format(
+                self._qualified_name, e))
+
+    def clear_cache(self):
+        """Remove all of the responses from the prediction cache, called when the model is replaced."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def _predict_protobuf(self, request, model=None):
+        if self._profiler is not None and not self._is_warming_up() and self._profiler.should_sample():
+            return self._profile_predict_protobuf(request, model)
+
         # converting the protocol buffer into a dictionary
         # if the input protobuf is mapped to a type that the model cannot accept, this will cause a schema exception
-        data = MessageToDict(request, preserving_proto_field_name=True)
+        data = self._input_to_dict(request)
 
         # making a prediction with the model
-        prediction = self._model.predict(data=data)
-
-        # getting the output protobuf for the model, this code relies on the fact that a model's output protobufs are
-        # always named the same way
-        output_protobuf_name = "{}_output".format(self._model.qualified_name)
-        output_protobuf = MLModelgRPCEndpoint._get_protobuf(output_protobuf_name)
+        if self._batcher is not None:
+            prediction = self._batcher.predict(data)
+        else:
+            model = model if model is not None else self._model
+            start_time = time.perf_counter()
+            if self._pool is None:
+                prediction = model.predict(data=data)
+            else:
+                prediction = self._pool.call(execution_pool.predict, model, data, timeout=self._time_remaining())
+            self._observe_latency(self._predict_latency, start_time)
 
         # creating the response protocol buffer
         # if the model outputs a data structure that cannot be mapped to the protobuf, this code will fail
-        response = output_protobuf(**prediction)
+        response = self._output_from_dict(prediction)
+
+        return response
+
+    def _profile_predict_protobuf(self, request, model=None):
+        """Make a prediction with a protocol buffer and record the time spent in each stage in the profiler.
+
+        The request is parsed by gRPC before the endpoint is called and the response is serialized after it returns,
+        so those stages are timed by parsing and serializing copies of the messages. The model validates its input in
+        predict(), the validation is timed separately by validating the input once more.
+
+        """
+        model = model if model is not None else self._model
+        profile = self._profiler.create_profile()
+        if profile is not None:
+            profile.enable()
+
+        timings = {}
+        start_time = time.perf_counter()
+        self._input_protobuf.FromString(request.SerializeToString())
+        timings["deserialize"] = time.perf_counter() - start_time
+
+        stage_start_time = time.perf_counter()
+        data = self._input_to_dict(request)
+        timings["to_dict"] = time.perf_counter() - stage_start_time
+
+        input_schema = getattr(model, "input_schema", None)
+        if input_schema is not None:
+            stage_start_time = time.perf_counter()
+            input_schema.validate(data)
+            timings["validate"] = time.perf_counter() - stage_start_time
+
+        stage_start_time = time.perf_counter()
+        if self._batcher is not None:
+            prediction = self._batcher.predict(data)
+        elif self._pool is not None:
+            prediction = self._pool.call(execution_pool.predict, model, data, timeout=self._time_remaining())
+        else:
+            prediction = model.predict(data=data)
+        timings["predict"] = time.perf_counter() - stage_start_time
+        if self._batcher is None:
+            self._predict_latency.observe(timings["predict"])
+
+        stage_start_time = time.perf_counter()
+        response = self._output_from_dict(prediction)
+        timings["from_dict"] = time.perf_counter() - stage_start_time
+
+        stage_start_time = time.perf_counter()
+        response.SerializeToString()
+        timings["serialize"] = time.perf_counter() - stage_start_time
+        timings["total"] = time.perf_counter() - start_time
+
+        if profile is not None:
+            profile.disable()
+        self._profiler.record(timings, profile)
+
+        return response
+
+    def batch_predict(self, request, context):
+        """Make predictions for a batch of protocol buffers in one call."""
+        request_metrics = self._request_metrics["batch_predict"]
+        start_time = request_metrics.start()
+        try:
+            # creating the response protocol buffer, the outputs are in the same order as the inputs
+            response = self._batch_output_protobuf(outputs=self.predict_protobufs(request.inputs, context))
+        except BaseException:
+            request_metrics.finish(start_time, failed=True)
+            raise
+        request_metrics.finish(start_time)
+
+        return response
+
+    def tensor_predict(self, request, context):
+        """Make predictions for a batch of inputs packed into one buffer of numbers.
+
+        The buffer is turned into a NumPy array without copying it. Models that implement a predict_array() method
+        receive the array and must return a list of predictions with one prediction for each row, all other models
+        receive the rows as dictionaries like in a batch prediction.
+
+        """
+        request_metrics = self._request_metrics["tensor_predict"]
+        start_time = request_metrics.start()
+        try:
+            array = self.tensor_to_array(request)
+            admitted = self._admit(context)
+            try:
+                predictions = self._predict_array(array)
+            finally:
+                if admitted:
+                    self._admission_controller.release()
+
+            # creating the response protocol buffer, the outputs are in the same order as the rows
+            response = self._batch_output_protobuf(outputs=[self._output_from_dict(prediction)
+                                                            for prediction in predictions])
+        except BaseException:
+            request_metrics.finish(start_time, failed=True)
+            raise
+        request_metrics.finish(start_time)
 
         return response
 
+    def tensor_to_array(self, request):
+        """Turn a tensor input protocol buffer into a read-only NumPy array with one row for each input."""
+        if self._tensor_input_protobuf is None:
+            raise ValueError("Model '{}' does not have a tensor input.".format(self._qualified_name))
+
+        shape = tuple(request.shape)
+        if len(shape) != 2 or shape[1] != len(self._tensor_columns):
+            raise ValueError("The shape of a tensor input of model '{}' must be [rows, {}], not {}.".format(
+                self._qualified_name, len(self._tensor_columns), list(shape)))
+
+        # the array shares its memory with the bytes of the protocol buffer
+        array = np.frombuffer(request.values, dtype=self._tensor_dtype)
+        if array.size != shape[0] * shape[1]:
+            raise ValueError("A tensor input of shape {} must have {} values, not {}.".format(
+                list(shape), shape[0] * shape[1], array.size))
+        return array.reshape(shape)
+
+    def _predict_array(self, array):
+        model = self._model
+        if getattr(model, "predict_array", None) is None:
+            # converting the array into a dictionary for each row, the values of each column are converted into Python
+            # objects at once, and the integer columns of a mixed array are converted back into integers
+            columns = [array[:, index].astype(np.int64).tolist() if index in self._tensor_integer_columns
+                       and array.dtype.kind == "f" else array[:, index].tolist()
+                       for index in range(len(self._tensor_columns))]
+            data = [dict(zip(self._tensor_columns, row)) for row in zip(*columns)]
+            return self._predict_batch(data, model)
+
+        start_time = time.perf_counter()
+        predictions = self._call_model(execution_pool.predict_array, model, array)
+        self._observe_latency(self._predict_array_latency, start_time)
+        if len(predictions) != len(array):
+            raise ValueError("Model '{}' returned {} predictions for a batch of {} inputs.".format(
+                self._qualified_name, len(predictions), len(array)))
+        return predictions
+
+    def stream_predict(self, request_iterator, context):
+        """Make predictions for a stream of protocol buffers.
+
+        The messages that have already arrived on the stream when the model is ready to make predictions are grouped
+        into one batch, the outputs are sent back on the stream in the same order as the inputs.
+
+        """
+        request_metrics = self._request_metrics["stream_predict"]
+        start_time = request_metrics.start()
+        failed = True
+        try:
+            for response in self._stream_predict(request_iterator, context):
+                yield response
+            failed = False
+        finally:
+            # the latency of a stream is the time from its first message to its last response
+            request_metrics.finish(start_time, failed=failed)
+
+    def _stream_predict(self, request_iterator, context):
+        # reading the stream in a separate thread so that messages can be collected while predictions are being made
+        requests = queue.Queue()
+        reader = threading.Thread(target=MLModelgRPCEndpoint._read_stream, args=(request_iterator, requests),
+                                  name="stream-reader", daemon=True)
+        reader.start()
+
+        end_of_stream = False
+        while not end_of_stream:
+            # waiting for the next message, then taking the messages that are already waiting without blocking
+            batch = [requests.get()]
+            while len(batch) < self._stream_max_batch_size and batch[-1] is not _END_OF_STREAM \
+                    and not isinstance(batch[-1], Exception):
+                try:
+                    batch.append(requests.get_nowait())
+                except queue.Empty:
+                    break
+
+            if batch[-1] is _END_OF_STREAM:
+                end_of_stream = True
+                batch.pop()
+            elif isinstance(batch[-1], Exception):
+                raise batch[-1]
+
+            if len(batch) > 0:
+                for response in self.predict_protobufs(batch, context):
+                    yield response
+
+    def predict_protobufs(self, requests, context=None):
+        """Make predictions for a list of input protocol buffers.
+
+        :param requests: The input protocol buffers.
+        :type requests: iterable
+        :param context: The context of the call that the predictions are made for, used for admission control.
+        :type context: grpc.ServicerContext
+        :returns: The output protocol buffers, in the same order as the inputs.
+        :rtype: list
+
+        """
+        admitted = self._admit(context)
+        try:
+            return self._predict_protobufs_cached(requests)
+        finally:
+            if admitted:
+                self._admission_controller.release()
+
+    def _predict_protobufs_cached(self, requests):
+        if self._cache is None:
+            return self._predict_protobufs(requests)
+
+        # looking up each request in the cache and only making predictions for the ones that are not in it
+        requests = list(requests)
+        keys = [request.SerializeToString(deterministic=True) for request in requests]
+        responses = [self._cache.get(key) for key in keys]
+        misses = [index for index, response in enumerate(responses) if response is None]
+        if len(misses) > 0:
+            model = self._model
+            predictions = self._predict_protobufs([requests[index] for index in misses], model)
+            # the responses are only cached if the model was not replaced while the predictions were being made
+            cacheable = self._model_manager.get_model(self._qualified_name) is model
+            for index, response in zip(misses, predictions):
+                if cacheable:
+                    self._cache.put(keys[index], response)
+                responses[index] = response
+        return responses
+
+    def _predict_protobufs(self, requests, model=None):
+        # converting each input protocol buffer into a dictionary
+        data = [self._input_to_dict(item) for item in requests]
+
+        # making predictions for the whole batch
+        predictions = self._predict_batch(data, model)
+
+        return [self._output_from_dict(prediction) for prediction in predictions]
+
+    @staticmethod
+    def _read_stream(request_iterator, requests):
+        try:
+            for request in request_iterator:
+                requests.put(request)
+            requests.put(_END_OF_STREAM)
+        except Exception as e:
+            # the exception is raised again by the thread that is making predictions
+            requests.put(e)
+
+    def _predict_batch(self, data, model=None):
+        """Make predictions for a list of inputs.
+
+        Models that implement a predict_batch() method receive the whole list in one vectorized call and must return
+        a list of predictions in the same order, all other models are called once for each input in the list.
+
+        """
+        model = model if model is not None else self._model
+        if getattr(model, "predict_batch", None) is not None:
+            start_time = time.perf_counter()
+            predictions = self._call_model(execution_pool.predict_batch, model, data)
+            self._observe_latency(self._predict_batch_latency, start_time)
+            if len(predictions) != len(data):
+                raise ValueError("Model '{}' returned {} predictions for a batch of {} inputs.".format(
+                    self._qualified_name, len(predictions), len(data)))
+            return predictions
+        else:
+            predictions = []
+            for item in data:
+                start_time = time.perf_counter()
+                predictions.append(self._call_model(execution_pool.predict, model, item))
+                self._observe_latency(self._predict_latency, start_time)
+            return predictions
+
+    def _time_remaining(self):
+        deadline = getattr(self._request_deadline, "value", None)
+        return deadline - time.monotonic() if deadline is not None else None
+
+    def _is_warming_up(self):
+        return getattr(self._warm_up_state, "active", False)
+
+    def _observe_latency(self, histogram, start_time):
+        if not self._is_warming_up():
+            histogram.observe(time.perf_counter() - start_time)
+
+    def _call_model(self, function, model, *args):
+        if self._pool is None:
+            return function(model, *args)
+        return self._pool.call(function, model, *args, timeout=self._time_remaining())
+
+    @staticmethod
+    def _message_to_dict(message):
+        return MessageToDict(message, preserving_proto_field_name=True)
+
+    @staticmethod
+    def _get_converter(converter_name):
+        if model_service_converters is None:
+            return None
+        return getattr(model_service_converters, converter_name, None)
+
     @staticmethod
     def _get_protobuf(protobuf_name):
-        return getattr(model_service_pb2, protobuf_name)
+        protobuf = getattr(model_service_pb2, protobuf_name, None)
+        if protobuf is None:
+            raise ValueError("Protocol buffer '{}' not found in model_service_pb2.".format(protobuf_name))
+        return protobuf
+
+    @staticmethod
+    def _check_fields(protobuf, json_schema):
+        """Check that the fields of a protocol buffer match the fields in the JSON schema of a model."""
+        if json_schema is None:
+            return
+
+        properties = json_schema.get("properties", {})
+        fields = protobuf.DESCRIPTOR.fields_by_name
+
+        missing_fields = [name for name in properties if name not in fields]
+        if len(missing_fields) > 0:
+            raise ValueError("Protocol buffer '{}' is missing the fields: {}.".format(
+                protobuf.DESCRIPTOR.name, ", ".join(missing_fields)))
+
+        extra_fields = [name for name in fields if name not in properties]
+        if len(extra_fields) > 0:
+            raise ValueError("Protocol buffer '{}' has fields that are not in the model schema: {}.".format(
+                protobuf.DESCRIPTOR.name, ", ".join(extra_fields)))
+
+        for name, field_schema in properties.items():
+            allowed_types = _field_type_mappings.get(field_schema.get("type"))
+            if allowed_types is not None and fields[name].type not in allowed_types:
+                raise ValueError("Field '{}' of protocol buffer '{}' cannot hold the model schema type '{}'.".format(
+                    name, protobuf.DESCRIPTOR.name, field_schema["type"]))
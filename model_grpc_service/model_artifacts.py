@@ -0,0 +1,82 @@
+"""Loading model artifacts so that the numpy arrays in them are memory-mapped and shared between processes."""
+import hashlib
+import logging
+import os
+import stat
+import tempfile
+import joblib
+
+from model_grpc_service import __name__
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_directory():
+    """Return the directory that the memory-mappable copies of the artifacts are stored in by default.
+
+    The directory is in the user's cache directory, $XDG_CACHE_HOME or ~/.cache, because the directory of an artifact
+    that is installed with a package is usually not writable.
+
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "model_grpc_service", "artifacts")
+
+
+def _check_cache_directory(cache_directory):
+    # the copies in the cache directory are unpickled, so a directory that another user can write to would let that
+    # user run code in the service
+    status = os.lstat(cache_directory)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o022:
+        raise ValueError("Cache directory '{}' must be a directory that is owned by the current user and that other "
+                         "users cannot write to.".format(cache_directory))
+
+
+def load_artifact(path, cache_directory=None):
+    """Load a pickled or joblib model artifact with its numpy arrays memory-mapped read-only.
+
+    The first time an artifact is loaded, it is saved again into cache_directory as an uncompressed joblib file that
+    holds the arrays in their raw form, and that copy is loaded with mmap_mode="r". Every process that loads the same
+    artifact maps the same file, so the arrays are kept in RAM once in the page cache of the operating system instead
+    of once in each worker process. The copy is named after the path, size and modification time of the artifact, so
+    it is created again when the artifact changes.
+
+    The cache directory is created with permissions that only let the current user use it. Because the copies are
+    unpickled, the function refuses to use a directory that is owned by another user or that other users can write to.
+
+    The ModelManager calls this function for the files in the "artifacts" option of a model's configuration, model
+    classes can also call it in place of joblib.load() in their __init__ methods. The arrays it returns are read-only,
+    a model that writes to its arrays has to copy them first.
+
+    :param path: The path of the artifact.
+    :type path: str
+    :param cache_directory: The directory that the memory-mappable copy of the artifact is stored in, by default the
+        directory returned by default_cache_directory().
+    :type cache_directory: str
+    :returns: The object in the artifact.
+
+    """
+    if cache_directory is None:
+        cache_directory = default_cache_directory()
+    os.makedirs(cache_directory, mode=0o700, exist_ok=True)
+    _check_cache_directory(cache_directory)
+
+    status = os.stat(path)
+    key = "{}:{}:{}".format(os.path.abspath(path), status.st_size, status.st_mtime_ns)
+    file_name = "{}-{}.joblib".format(os.path.basename(path), hashlib.sha256(key.encode("utf-8")).hexdigest()[:16])
+    cached_path = os.path.join(cache_directory, file_name)
+
+    if not os.path.exists(cached_path):
+        artifact = joblib.load(path)
+        # writing the copy under a temporary name and renaming it, so that a process that loads the artifact at the
+        # same time never maps a file that is partly written
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=cache_directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as f:
+                joblib.dump(artifact, f)
+            os.replace(temporary_path, cached_path)
+        except Exception:
+            os.remove(temporary_path)
+            raise
+        logger.info("Created a memory-mappable copy of artifact '{}' at '{}'.".format(path, cached_path))
+
+    return joblib.load(cached_path, mmap_mode="r")
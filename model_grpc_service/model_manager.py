@@ -1,65 +1,285 @@
 """Model Manager class for loading, managing, and interacting with models."""
 import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 
 from ml_model_abc import MLModel
 
+from model_grpc_service import __name__
+from model_grpc_service.process_memory import memory_usage, format_memory_usage
+from model_grpc_service.synthetic_inputs import warm_up_inputs
+from model_grpc_service.model_artifacts import load_artifact
+
+try:
+    import model_service_pb2
+except ImportError:
+    model_service_pb2 = None
+
+logger = logging.getLogger(__name__)
+
+# the names of the attributes of an MLModel class that are part of the model's metadata
+_metadata_attributes = ("display_name", "qualified_name", "description", "major_version", "minor_version")
+
+
+class _ModelEntry(object):
+    """Holds a model object, or the class and configuration needed to create it when it is first used."""
+
+    def __init__(self, model_class, configuration, metadata, model_object=None):
+        self.model_class = model_class
+        self.configuration = configuration
+        self.metadata = metadata
+        self.model_object = model_object
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Create the model object if it was not created yet and return it."""
+        with self._lock:
+            if self.model_object is None:
+                self.model_object = create_model(self.model_class, self.configuration)
+            return self.model_object
+
+
+def import_model_class(configuration):
+    """Import the class of a model from the "module_name" and "class_name" keys of its configuration."""
+    model_module = importlib.import_module(configuration["module_name"])
+    return getattr(model_module, configuration["class_name"])
+
+
+def create_model(model_class, configuration):
+    """Create a model object from its class and configuration, with the files of its "artifacts" option.
+
+    :param model_class: The class of the model, a subclass of MLModel.
+    :type model_class: type
+    :param configuration: The configuration of the model.
+    :type configuration: dict
+    :returns: The model object.
+    :rtype: MLModel
+
+    """
+    start_time = time.monotonic()
+    # the files in the artifacts option are memory-mapped, so that the processes that create the same model share their
+    # arrays, and they are passed to the model class as keyword arguments
+    artifacts = configuration.get("artifacts", {})
+    model_object = model_class(**{name: load_artifact(path, cache_directory=artifacts.get("cache_directory"))
+                                  for name, path in artifacts.get("files", {}).items()})
+    if not isinstance(model_object, MLModel):
+        raise ValueError("The ModelManager can only hold references to objects of type MLModel.")
+    logger.info("Loaded model '{}' in {:.3f} seconds.".format(configuration["class_name"],
+                                                              time.monotonic() - start_time))
+    return model_object
+
+
+def _warm_up_model(entry):
+    # making predictions with the warm up inputs in the model's configuration, so that the first requests do not run
+    # into cold code paths, the inputs are found like the endpoints find them when the service starts
+    input_protobuf = None
+    if model_service_pb2 is not None:
+        input_protobuf = getattr(model_service_pb2, "{}_input".format(entry.metadata["qualified_name"]), None)
+    warm_up = entry.configuration.get("warm_up", {})
+    inputs = warm_up_inputs(warm_up, input_protobuf)
+    if len(inputs) == 0:
+        return
+
+    # the failures of the generated inputs are only logged, because generated values can easily be outside of what the
+    # model accepts, the failures of the inputs in the configuration fail the warm up
+    synthetic = warm_up.get("inputs") is None
+    start_time = time.monotonic()
+    model_object = entry.load()
+    for data in inputs:
+        try:
+            model_object.predict(data=dict(data))
+        except Exception as e:
+            if not synthetic:
+                raise
+            logger.warning("Warming up model '{}' with a generated input failed: {}".format(
+                entry.metadata["qualified_name"], e))
+    logger.info("Warmed up model '{}' with {} inputs in {:.3f} seconds.".format(
+        entry.metadata["qualified_name"], len(inputs), time.monotonic() - start_time))
+
 
 class ModelManager(object):
-    """Singleton class that instantiates and manages model objects."""
+    """Singleton class that instantiates and manages model objects.
 
-    _models = []
+    The models are indexed by qualified name and by (qualified name, major version), so that several major versions
+    of a model can be hosted side by side. Looking up a model by qualified name alone returns the highest major version
+    that is loaded.
+
+    """
+
+    _entries = {}
+    _model_list = ()
+    _reload_lock = threading.Lock()
 
     @classmethod
-    def load_models(cls, configuration):
-        """Load models from configuration."""
-        cls._models = []  # resetting the model list to empty
-        for c in configuration:
-            model_module = importlib.import_module(c["module_name"])
-            model_class = getattr(model_module, c["class_name"])
-            model_object = model_class()
+    def load_models(cls, configuration, loading_mode="sequential", max_workers=None):
+        """Load models from configuration.
+
+        :param configuration: List of model configurations, each one has a module_name and a class_name.
+        :type configuration: list
+        :param loading_mode: How the model objects are created: "sequential" creates them one after another,
+            "parallel" creates them at the same time in a thread pool, and "lazy" only imports the model classes and
+            creates each model object when it is first used or when load_pending_models() is called.
+        :type loading_mode: str
+        :param max_workers: The number of threads used to create the model objects in the "parallel" mode.
+        :type max_workers: int
 
-            if not isinstance(model_object, MLModel):
-                raise ValueError("The ModelManager can only hold references to objects of type MLModel.")
+        """
+        start_time = time.monotonic()
 
-            # saving the model reference to the models list
-            cls._models.append(model_object)
+        model_entries, model_list = cls._build_registry(configuration, loading_mode, max_workers)
+
+        # replacing the registry all at once, so that readers never see a partially loaded set of models
+        cls._entries = model_entries
+        cls._model_list = model_list
+
+        logger.info("Loaded {} models in {:.3f} seconds with the {} loading mode, memory used: {}.".format(
+            len(model_list), time.monotonic() - start_time, loading_mode, format_memory_usage(memory_usage())))
+
+    @classmethod
+    def reload_models(cls, configuration, loading_mode="sequential", max_workers=None):
+        """Load a new set of models, warm them up, and swap them into the registry at once.
+
+        The models that are being used to make predictions when the registry is swapped finish the predictions, the
+        predictions that start after the swap use the new models. If loading the new models fails, or warming them up
+        with the inputs in their configuration fails, the registry is not changed. The failures of the warm up inputs
+        that are generated from the input protocol buffers are logged and don't stop the reload.
+
+        :param configuration: List of model configurations, each one has a module_name and a class_name.
+        :type configuration: list
+        :param loading_mode: How the new model objects are created, "sequential" or "parallel".
+        :type loading_mode: str
+        :param max_workers: The number of threads used to create the model objects in the "parallel" mode.
+        :type max_workers: int
+
+        """
+        if loading_mode not in ("sequential", "parallel"):
+            raise ValueError("'{}' is not a valid loading mode for reloading models.".format(loading_mode))
+
+        with cls._reload_lock:
+            start_time = time.monotonic()
+            model_entries, model_list = cls._build_registry(configuration, loading_mode, max_workers)
+
+            for entry in set(model_entries.values()):
+                _warm_up_model(entry)
+
+            cls._entries = model_entries
+            cls._model_list = model_list
+
+            logger.info("Reloaded {} models in {:.3f} seconds, memory used: {}.".format(
+                len(model_list), time.monotonic() - start_time, format_memory_usage(memory_usage())))
+
+    @classmethod
+    def _build_registry(cls, configuration, loading_mode, max_workers):
+        if loading_mode == "sequential":
+            entries = [cls._create_entry(c) for c in configuration]
+        elif loading_mode == "parallel":
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                entries = list(executor.map(cls._create_entry, configuration))
+        elif loading_mode == "lazy":
+            entries = [cls._create_lazy_entry(c) for c in configuration]
+        else:
+            raise ValueError("'{}' is not a valid loading mode.".format(loading_mode))
+
+        model_entries = {}
+        model_list = []
+        for entry in entries:
+            qualified_name = entry.metadata["qualified_name"]
+            major_version = entry.metadata["major_version"]
+            versioned_key = (qualified_name, major_version)
+            if versioned_key in model_entries:
+                raise ValueError("Version {} of model '{}' is already loaded.".format(major_version, qualified_name))
+
+            model_list.append(MappingProxyType({key: entry.metadata[key] for key in _metadata_attributes}))
+
+            # saving the model entry under the versioned key, and under the qualified name if it is the highest
+            # major version of the model loaded so far
+            model_entries[versioned_key] = entry
+            default_entry = model_entries.get(qualified_name)
+            if default_entry is None or major_version > default_entry.metadata["major_version"]:
+                model_entries[qualified_name] = entry
+
+        return model_entries, tuple(model_list)
+
+    @classmethod
+    def load_pending_models(cls, max_workers=None):
+        """Create the model objects that were not created yet in the "lazy" loading mode."""
+        entries = [entry for entry in set(cls._entries.values()) if entry.model_object is None]
+        if len(entries) > 0:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(lambda entry: entry.load(), entries))
 
     @classmethod
     def get_models(cls):
         """Get a list of models in the model manager instance."""
-        model_objects = [{"display_name": model.display_name,
-                          "qualified_name": model.qualified_name,
-                          "description": model.description,
-                          "major_version": model.major_version,
-                          "minor_version": model.minor_version} for model in cls._models]
-        return model_objects
+        return cls._model_list
 
     @classmethod
-    def get_model_metadata(cls, qualified_name):
-        """Get a model metadata by qualified name."""
-        # searching the list of model objects to find the one with the right qualified name
-        model_objects = [model for model in cls._models if model.qualified_name == qualified_name]
+    def get_model_metadata(cls, qualified_name, major_version=None):
+        """Get a model metadata by qualified name and optional major version."""
+        entry = cls._entries.get(ModelManager._key(qualified_name, major_version))
+        return entry.metadata if entry is not None else None
 
-        if len(model_objects) == 0:
+    @classmethod
+    def get_model(cls, qualified_name, major_version=None):
+        """Get a model object by qualified name and optional major version, creates it if it was loaded lazily."""
+        entry = cls._entries.get(ModelManager._key(qualified_name, major_version))
+        if entry is None:
             return None
-        else:
-            model_object = model_objects[0]
-            return {
-                "display_name": model_object.display_name,
-                "qualified_name": model_object.qualified_name,
-                "description": model_object.description,
-                "major_version": model_object.major_version,
-                "minor_version": model_object.minor_version,
-                "input_schema": model_object.input_schema.json_schema("https://example.com/input_schema.json"),
-                "output_schema": model_object.output_schema.json_schema("https://example.com/output_schema.json")}
+        model_object = entry.model_object
+        return model_object if model_object is not None else entry.load()
 
     @classmethod
-    def get_model(cls, qualified_name):
-        """Get a model object by qualified name."""
-        # searching the list of model objects to find the one with the right qualified name
-        model_objects = [model for model in cls._models if model.qualified_name == qualified_name]
+    def get_model_class(cls, qualified_name, major_version=None):
+        """Get the class of a model by qualified name and optional major version, without creating the model."""
+        entry = cls._entries.get(ModelManager._key(qualified_name, major_version))
+        return entry.model_class if entry is not None else None
 
-        if len(model_objects) == 0:
-            return None
-        else:
-            return model_objects[0]
+    @classmethod
+    def get_model_configuration(cls, qualified_name, major_version=None):
+        """Get the configuration that a model was loaded from by qualified name and optional major version."""
+        entry = cls._entries.get(ModelManager._key(qualified_name, major_version))
+        return entry.configuration if entry is not None else None
+
+    @staticmethod
+    def _key(qualified_name, major_version):
+        return qualified_name if major_version is None else (qualified_name, major_version)
+
+    @staticmethod
+    def _create_entry(configuration):
+        model_class = import_model_class(configuration)
+        model_object = create_model(model_class, configuration)
+        # building the metadata of the model once, the snapshots are read-only views so they can be shared by all
+        # callers
+        metadata = MappingProxyType(ModelManager._build_metadata(model_object))
+        return _ModelEntry(model_class, configuration, metadata, model_object)
+
+    @staticmethod
+    def _create_lazy_entry(configuration):
+        model_class = import_model_class(configuration)
+        if not isinstance(model_class, type) or not issubclass(model_class, MLModel):
+            raise ValueError("The ModelManager can only hold references to objects of type MLModel.")
+
+        # the metadata of a lazily loaded model is read from its class, so it must be defined in class attributes
+        for attribute in _metadata_attributes + ("input_schema", "output_schema"):
+            if isinstance(getattr(model_class, attribute), property):
+                raise ValueError("Model class '{}' must define {} as a class attribute to be loaded lazily.".format(
+                    configuration["class_name"], attribute))
+
+        metadata = MappingProxyType(ModelManager._build_metadata(model_class))
+        return _ModelEntry(model_class, configuration, metadata)
+
+    @staticmethod
+    def _build_metadata(model):
+        return {
+            "display_name": model.display_name,
+            "qualified_name": model.qualified_name,
+            "description": model.description,
+            "major_version": model.major_version,
+            "minor_version": model.minor_version,
+            "input_schema": model.input_schema.json_schema("https://example.com/input_schema.json")
+            if model.input_schema is not None else None,
+            "output_schema": model.output_schema.json_schema("https://example.com/output_schema.json")
+            if model.output_schema is not None else None}
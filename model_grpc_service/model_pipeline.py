@@ -0,0 +1,262 @@
+"""Endpoints that make a prediction with several models in one call, in a pipeline or in an ensemble."""
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import grpc
+
+from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.admission_control import AdmissionRejected
+from model_grpc_service.ml_model_grpc_endpoint import MLModelgRPCEndpoint
+from model_grpc_service import metrics
+
+
+def _vote(values):
+    # the most common value wins, a tie goes to the value of the member that is first in the configuration
+    counts = collections.Counter(values)
+    highest_count = max(counts.values())
+    return next(value for value in values if counts[value] == highest_count)
+
+
+def _mean(values):
+    # averaging the numbers, the other values are voted on, the mean of integers is rounded so that it still fits an
+    # integer field
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+        return int(round(sum(values) / len(values)))
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        return sum(values) / len(values)
+    return _vote(values)
+
+
+def _schema_fields(schema):
+    # the types of the fields of a model's JSON schema by name, None if the model does not have the schema
+    if schema is None:
+        return None
+    return {name: field.get("type") for name, field in schema["properties"].items()}
+
+
+# functions that combine the values of one output field of the members of an ensemble, by name
+_combine_functions = {
+    "vote": _vote,
+    "mean": _mean
+}
+
+
+class _CompositeEndpoint(object):
+    """Converts the protocol buffers of a pipeline or ensemble and records the metrics of its predict RPC.
+
+    The models are called directly, without the admission control, execution pool and cache of their own endpoints.
+    This is on purpose: the pipeline or ensemble is one request to the service, and the models must not queue behind
+    each other or be rejected halfway through it. The deadline of the request is checked by the pipeline or ensemble
+    itself before the models are called.
+
+    """
+
+    def __init__(self, configuration, model_names, input_model_name, output_model_name):
+        self._qualified_name = configuration["qualified_name"]
+        self._model_manager = ModelManager()
+        if len(model_names) == 0:
+            raise ValueError("'{}' must have at least one model.".format(self._qualified_name))
+        for model_name in model_names:
+            if self._model_manager.get_model_metadata(qualified_name=model_name) is None:
+                raise ValueError("'{}' not found in ModelManager instance.".format(model_name))
+        self._model_names = list(model_names)
+
+        # the request of the RPC is converted like a request to the first model, and the response is created like a
+        # response of the last model
+        self._input_to_dict = MLModelgRPCEndpoint._get_converter("{}_input_to_dict".format(input_model_name))
+        if self._input_to_dict is None:
+            self._input_to_dict = MLModelgRPCEndpoint._message_to_dict
+        self._output_from_dict = MLModelgRPCEndpoint._get_converter("{}_output_from_dict".format(output_model_name))
+        if self._output_from_dict is None:
+            output_protobuf = MLModelgRPCEndpoint._get_protobuf("{}_output".format(output_model_name))
+            self._output_from_dict = lambda data: output_protobuf(**data)
+
+        self._request_metrics = metrics.RequestMetrics(self._qualified_name, "predict")
+
+    @property
+    def qualified_name(self):
+        """Qualified name of the pipeline or ensemble."""
+        return self._qualified_name
+
+    @property
+    def model_names(self):
+        """Qualified names of the models that make the prediction."""
+        return list(self._model_names)
+
+    def __call__(self, request, context):
+        """Make a prediction with protocol buffers."""
+        start_time = self._request_metrics.start()
+        try:
+            response = self._output_from_dict(self.predict(self._input_to_dict(request), context=context))
+        except BaseException:
+            self._request_metrics.finish(start_time, failed=True)
+            raise
+        self._request_metrics.finish(start_time)
+        return response
+
+    @staticmethod
+    def _check_deadline(context):
+        # the asyncio server context does not have the time_remaining() method
+        time_remaining = getattr(context, "time_remaining", None)
+        if time_remaining is not None:
+            timeout = time_remaining()
+            if timeout is not None and timeout <= 0:
+                raise AdmissionRejected(grpc.StatusCode.DEADLINE_EXCEEDED,
+                                        "The deadline passed before the models could handle the request.")
+
+    def _get_model(self, model_name):
+        # getting the model for each prediction, so that the models that are reloaded are used right away
+        model = self._model_manager.get_model(model_name)
+        if model is None:
+            raise ValueError("'{}' not found in ModelManager instance.".format(model_name))
+        return model
+
+
+class PipelineEndpoint(_CompositeEndpoint):
+    """Makes a prediction with a chain of models, the output of each model is the input of the next one."""
+
+    def __init__(self, configuration):
+        """Create an endpoint for a pipeline.
+
+        :param configuration: The configuration of the pipeline, a dictionary with the keys qualified_name (str) and
+            steps (list, the qualified names of the models in the order they are called). The input fields of each
+            step must be output fields of the step before it, with the same types.
+        :type configuration: dict
+
+        """
+        steps = configuration.get("steps", [])
+        super().__init__(configuration, steps, steps[0] if len(steps) > 0 else None,
+                         steps[-1] if len(steps) > 0 else None)
+
+        # the names of the input fields of each step, None for the steps without an input schema, the output of a
+        # step is cut down to the input fields of the next step so that its other fields don't fail a strict schema
+        self._input_fields = []
+        for model_name in steps:
+            metadata = self._model_manager.get_model_metadata(qualified_name=model_name)
+            input_fields = _schema_fields(metadata["input_schema"])
+            self._input_fields.append(list(input_fields) if input_fields is not None else None)
+
+        for model_name, next_model_name in zip(steps, steps[1:]):
+            output_fields = _schema_fields(
+                self._model_manager.get_model_metadata(qualified_name=model_name)["output_schema"])
+            input_fields = _schema_fields(
+                self._model_manager.get_model_metadata(qualified_name=next_model_name)["input_schema"])
+            # the models without a schema can't be checked
+            if output_fields is None or input_fields is None:
+                continue
+            for name, field_type in input_fields.items():
+                if output_fields.get(name) != field_type:
+                    raise ValueError("Input field '{}' of model '{}' is not an output field of model '{}' in "
+                                     "pipeline '{}'.".format(name, next_model_name, model_name, self._qualified_name))
+
+    def predict(self, data, context=None):
+        """Make a prediction with dictionaries, the dictionaries are passed from one model to the next in memory.
+
+        :param data: The input of the first model.
+        :type data: dict
+        :param context: The context of the RPC, the deadline of the RPC is checked before each model is called.
+        :returns: The output of the last model.
+        :rtype: dict
+
+        """
+        for index, model_name in enumerate(self._model_names):
+            self._check_deadline(context)
+            if index > 0 and self._input_fields[index] is not None:
+                data = {name: data[name] for name in self._input_fields[index] if name in data}
+            data = self._get_model(model_name).predict(data=data)
+        return data
+
+
+class EnsembleEndpoint(_CompositeEndpoint):
+    """Makes a prediction with several models at the same time and combines their outputs field by field."""
+
+    def __init__(self, configuration, concurrent_requests=10):
+        """Create an endpoint for an ensemble.
+
+        :param configuration: The configuration of the ensemble, a dictionary with the keys qualified_name (str),
+            members (list, the qualified names of the models, which have the same input and output fields),
+            combine (str, "vote" or "mean", "vote" by default) and max_workers (int, the number of threads that the
+            members after the first one make their predictions in, by default enough for concurrent_requests
+            requests).
+        :type configuration: dict
+        :param concurrent_requests: The number of requests that the ensemble is expected to handle at the same time.
+        :type concurrent_requests: int
+
+        """
+        combine = configuration.get("combine", "vote")
+        self._combine = _combine_functions.get(combine)
+        if self._combine is None:
+            raise ValueError("'{}' is not a valid way to combine the outputs of an ensemble.".format(combine))
+
+        members = configuration.get("members", [])
+        super().__init__(configuration, members, members[0] if len(members) > 0 else None,
+                         members[0] if len(members) > 0 else None)
+
+        # the operation of an ensemble has the input and output of its first member, so all of the members must match
+        # them, the models without a schema can't be checked
+        first_metadata = self._model_manager.get_model_metadata(qualified_name=members[0])
+        for model_name in members[1:]:
+            metadata = self._model_manager.get_model_metadata(qualified_name=model_name)
+            for schema in ("input_schema", "output_schema"):
+                fields = _schema_fields(metadata[schema])
+                first_fields = _schema_fields(first_metadata[schema])
+                if fields is not None and first_fields is not None and fields != first_fields:
+                    raise ValueError("Model '{}' must have the same {} as model '{}' to be in ensemble '{}'.".format(
+                        model_name, schema.replace("_", " "), members[0], self._qualified_name))
+
+        # the combined values of the integer output fields are rounded, the mean of the members' outputs is a float
+        # when they are not all integers
+        output_fields = _schema_fields(first_metadata["output_schema"]) or {}
+        self._integer_fields = [name for name, field_type in output_fields.items() if field_type == "integer"]
+
+        # the first member makes its prediction in the thread of the call, so each request needs one less thread, the
+        # pool is shared by all of the requests to the ensemble
+        self._executor = None
+        if len(members) > 1:
+            max_workers = configuration.get("max_workers", concurrent_requests * (len(members) - 1))
+            self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                thread_name_prefix="{}-".format(self._qualified_name))
+
+    def predict(self, data, context=None):
+        """Make a prediction with dictionaries, the members make their predictions in parallel.
+
+        :param data: The input of the members.
+        :type data: dict
+        :param context: The context of the RPC, the deadline of the RPC is checked before the members are called.
+        :returns: The combined outputs of the members.
+        :rtype: dict
+
+        """
+        self._check_deadline(context)
+        models = [self._get_model(model_name) for model_name in self._model_names]
+        futures = [self._executor.submit(model.predict, data=data) for model in models[1:]]
+        predictions = [models[0].predict(data=data)] + [future.result() for future in futures]
+        combined = {field_name: self._combine([prediction[field_name] for prediction in predictions])
+                    for field_name in predictions[0]}
+        for field_name in self._integer_fields:
+            if isinstance(combined.get(field_name), float):
+                combined[field_name] = int(round(combined[field_name]))
+        return combined
+
+    def shutdown(self, wait=True):
+        """Stop the threads that the members make their predictions in."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+def create_endpoint(configuration, concurrent_requests=10):
+    """Create the endpoint of an entry of Config.pipelines.
+
+    :param configuration: The configuration of the pipeline or ensemble, its "type" key is "pipeline" or "ensemble".
+    :type configuration: dict
+    :param concurrent_requests: The number of requests that the endpoint is expected to handle at the same time.
+    :type concurrent_requests: int
+    :rtype: PipelineEndpoint or EnsembleEndpoint
+
+    """
+    endpoint_type = configuration.get("type", "pipeline")
+    if endpoint_type == "pipeline":
+        return PipelineEndpoint(configuration)
+    elif endpoint_type == "ensemble":
+        return EnsembleEndpoint(configuration, concurrent_requests=concurrent_requests)
+    else:
+        raise ValueError("'{}' is not a valid pipeline type.".format(endpoint_type))
@@ -0,0 +1,76 @@
+"""Cache of predictions with least recently used and time to live eviction."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache(object):
+    """Thread-safe cache that holds a bounded number of predictions for a limited time.
+
+    When the cache is full the least recently used prediction is evicted, predictions that are older than the time to
+    live are evicted when they are looked up.
+
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        """Create a prediction cache.
+
+        :param max_size: The maximum number of predictions held in the cache.
+        :type max_size: int
+        :param ttl: The number of seconds a prediction stays in the cache, None means predictions never expire.
+        :type ttl: float
+
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be greater than zero.")
+
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Return the number of predictions in the cache."""
+        return len(self._entries)
+
+    def get(self, key):
+        """Get a prediction from the cache, returns None if it is not in the cache or has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Put a prediction into the cache."""
+        expires = time.monotonic() + self._ttl if self._ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all of the predictions from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return the counters of the cache."""
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
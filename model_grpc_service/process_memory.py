@@ -0,0 +1,59 @@
+"""Memory usage of the process, so that the memory used by each worker process can be reported."""
+from model_grpc_service import metrics
+
+# the fields of /proc/{pid}/smaps that are reported, by the name they are reported with
+_smaps_fields = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+                 "Private_Clean": "private", "Private_Dirty": "private"}
+
+_memory = metrics.registry.gauge("process_memory_bytes",
+                                 "Memory used by the process: rss counts all of its pages, pss divides the pages that "
+                                 "it shares between the processes that share them, shared and private split rss.",
+                                 ("type",))
+
+
+def memory_usage(pid="self"):
+    """Return the memory used by a process in bytes, by type, or None if the operating system does not report it.
+
+    The types are "rss", the memory of the process that is in RAM, "shared", the part of rss that is shared with other
+    processes, like the pages of memory-mapped model files or the pages that a forked worker has not written to,
+    "private", the rest of rss, and "pss", rss with each shared page divided by the number of processes that share it.
+    The pss of the worker processes adds up to the memory they use together.
+
+    :param pid: The process ID, "self" is the current process.
+    :type pid: int or str
+
+    """
+    # smaps_rollup has the totals of all of the mappings, it is not available in Linux kernels older than 4.14
+    for file_name in ("smaps_rollup", "smaps"):
+        try:
+            with open("/proc/{}/{}".format(pid, file_name)) as f:
+                lines = f.readlines()
+        except OSError:
+            continue
+
+        usage = {"rss": 0, "pss": 0, "shared": 0, "private": 0}
+        for line in lines:
+            parts = line.split()
+            name = _smaps_fields.get(parts[0].rstrip(":"))
+            if name is not None and len(parts) == 3 and parts[2] == "kB":
+                usage[name] += int(parts[1]) * 1024
+        return usage
+    return None
+
+
+def update_memory_metrics():
+    """Set the memory gauges to the memory used by the current process."""
+    usage = memory_usage()
+    if usage is not None:
+        for name, value in usage.items():
+            _memory.labels(name).set(value)
+
+
+def format_memory_usage(usage):
+    """Format the result of memory_usage() for a log message."""
+    if usage is None:
+        return "not available"
+    return ", ".join("{} {:.1f} MB".format(name, value / 1048576.0) for name, value in usage.items())
+
+
+metrics.registry.add_callback(update_memory_metrics)
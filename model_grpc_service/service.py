@@ -1,6 +1,10 @@
 """gRPC service that hosts MLModel classes."""
 import os
+import asyncio
+import importlib
 import logging
+import signal
+import threading
 import time
 from concurrent import futures
 import grpc
@@ -11,6 +15,13 @@ import model_service_pb2_grpc
 from model_grpc_service.config import Config
 from model_grpc_service.model_manager import ModelManager
 from model_grpc_service.ml_model_grpc_endpoint import MLModelgRPCEndpoint
+from model_grpc_service.model_pipeline import create_endpoint
+from model_grpc_service.aio_service import serve_async
+from model_grpc_service.supervisor import Supervisor
+from model_grpc_service.metrics import start_metrics_server
+from model_grpc_service.admission_control import AdmissionInterceptor
+from model_grpc_service.health import create_health_servicer, add_health_servicer_to_server, set_service_status, \
+    SERVING
 
 logging.basicConfig(level=logging.INFO)
 
@@ -20,30 +31,124 @@ _ONE_DAY_IN_SECONDS = 60 * 60 * 24
 class ModelgRPCServiceServicer(model_service_pb2_grpc.ModelgRPCServiceServicer):
     """Provides methods that implement functionality of Model gRPC Service."""
 
-    def __init__(self):
-        """Initialize an instance of the service."""
+    def __init__(self, load_models=True, configuration=Config):
+        """Initialize an instance of the service.
+
+        :param load_models: Load the models from configuration, set to False when the models are already loaded.
+        :type load_models: bool
+        :param configuration: The configuration that the models are loaded from.
+        :type configuration: model_grpc_service.config.Config
+
+        """
         self.model_manager = ModelManager()
-        self.model_manager.load_models(configuration=Config.models)
+        if load_models:
+            self.model_manager.load_models(configuration=configuration.models,
+                                           loading_mode=configuration.model_loading,
+                                           max_workers=configuration.model_loading_workers)
 
+        self._endpoints = {}
         for model in self.model_manager.get_models():
+            # the operations of a model are bound to the highest major version of the model that is loaded, so only
+            # one endpoint is created for each qualified name
+            if model["qualified_name"] in self._endpoints:
+                continue
             endpoint = MLModelgRPCEndpoint(model_qualified_name=model["qualified_name"])
+            self._endpoints[model["qualified_name"]] = endpoint
             operation_name = "{}_predict".format(model["qualified_name"])
             setattr(self, operation_name, endpoint)
+            batch_operation_name = "{}_batch_predict".format(model["qualified_name"])
+            setattr(self, batch_operation_name, endpoint.batch_predict)
+            stream_operation_name = "{}_stream_predict".format(model["qualified_name"])
+            setattr(self, stream_operation_name, endpoint.stream_predict)
+            if endpoint.tensor_input_enabled:
+                tensor_operation_name = "{}_tensor_predict".format(model["qualified_name"])
+                setattr(self, tensor_operation_name, endpoint.tensor_predict)
+
+        # the pipelines and ensembles call the models in this process, so each one is served by a single operation
+        self._pipeline_endpoints = {}
+        for pipeline_configuration in getattr(configuration, "pipelines", []):
+            endpoint = create_endpoint(pipeline_configuration,
+                                       concurrent_requests=getattr(configuration, "max_workers", Config.max_workers))
+            self._pipeline_endpoints[endpoint.qualified_name] = endpoint
+            setattr(self, "{}_predict".format(endpoint.qualified_name), endpoint)
+
+    @property
+    def model_names(self):
+        """Qualified names of the models that have endpoints in the service."""
+        return list(self._endpoints)
+
+    @property
+    def pipeline_names(self):
+        """Qualified names of the pipelines and ensembles that have endpoints in the service."""
+        return list(self._pipeline_endpoints)
+
+    def warm_up(self, set_status):
+        """Warm up the endpoint of each model, and report each model as SERVING once its endpoint is warmed up.
+
+        The warm up follows the same rules as reloading the models: the failures of the inputs that are generated from
+        the input protocol buffer are logged and the model is reported as SERVING, a model whose warm up fails with the
+        inputs in its configuration is logged and stays NOT_SERVING.
+
+        :param set_status: A function that is called with the qualified name of a model and its health status.
+        :type set_status: callable
+
+        """
+        for qualified_name, endpoint in self._endpoints.items():
+            try:
+                endpoint.warm_up()
+            except Exception:
+                logging.exception("Failed to warm up the endpoint for model '{}'.".format(qualified_name))
+                continue
+            set_status(qualified_name, SERVING)
+
+    def reload_models(self, configuration):
+        """Load the models in the configuration again and swap them into the endpoints of the service.
+
+        The endpoints of the service are fixed when it starts, so models that are added to the configuration are not
+        served until the service is restarted with protocol buffers that include them.
+
+        """
+        self.model_manager.reload_models(configuration=configuration.models,
+                                         loading_mode="parallel" if configuration.model_loading == "parallel"
+                                         else "sequential",
+                                         max_workers=configuration.model_loading_workers)
+
+        # clearing the responses that were made by the models that were replaced
+        for endpoint in self._endpoints.values():
+            endpoint.clear_cache()
+
+        for model in self.model_manager.get_models():
+            if model["qualified_name"] not in self._endpoints:
+                logging.warning("Model '{}' has no endpoint in this service, restart the service to serve it.".format(
+                    model["qualified_name"]))
 
     def get_models(self, request, context):
-        """Return list of models hosted in this service."""
+        """Return list of models hosted in this service.
+
+        The operations of a model are only served for its highest major version, the other versions that are loaded
+        are listed without types and operations.
+
+        """
         model_data = self.model_manager.get_models()
         models = []
         for m in model_data:
+            endpoint = self._endpoints.get(m["qualified_name"])
+            default_metadata = self.model_manager.get_model_metadata(m["qualified_name"])
+            served = endpoint is not None and m["major_version"] == default_metadata["major_version"]
             # creating a list of model protobufs from the model information returned by the model manager
             response_model = model(qualified_name=m["qualified_name"],
                                    display_name=m["display_name"],
                                    description=m["description"],
                                    major_version=m["major_version"],
-                                   minor_version=m["minor_version"],
-                                   input_type="{}_input".format(m["qualified_name"]),
-                                   output_type="{}_output".format(m["qualified_name"]),
-                                   predict_operation="{}_predict".format(m["qualified_name"]))
+                                   minor_version=m["minor_version"])
+            if served:
+                response_model.input_type = "{}_input".format(m["qualified_name"])
+                response_model.output_type = "{}_output".format(m["qualified_name"])
+                response_model.predict_operation = "{}_predict".format(m["qualified_name"])
+                response_model.batch_predict_operation = "{}_batch_predict".format(m["qualified_name"])
+                response_model.stream_predict_operation = "{}_stream_predict".format(m["qualified_name"])
+                if endpoint.tensor_input_enabled:
+                    response_model.tensor_predict_operation = "{}_tensor_predict".format(m["qualified_name"])
             models.append(response_model)
 
         # creating the response protobuf from the list created above
@@ -59,14 +164,95 @@ def serve():
         __getattribute__("config"). \
         __getattribute__(os.environ["APP_SETTINGS"])
 
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    model_service_pb2_grpc.add_ModelgRPCServiceServicer_to_server(ModelgRPCServiceServicer(), server)
+    worker_count = configuration.worker_processes or os.cpu_count()
+    if worker_count == 1:
+        if configuration.metrics_port is not None:
+            start_metrics_server(configuration.metrics_port, address=configuration.metrics_address)
+        start_server(ModelgRPCServiceServicer(configuration=configuration), configuration)
+    else:
+        # loading the models once in the supervisor process so that the forked worker processes share them
+        ModelManager().load_models(configuration=configuration.models,
+                                   loading_mode=configuration.model_loading,
+                                   max_workers=configuration.model_loading_workers)
+
+        def worker(index):
+            # each worker records its own metrics, so they are served on a separate port for each worker
+            if configuration.metrics_port is not None:
+                start_metrics_server(configuration.metrics_port + index, address=configuration.metrics_address)
+
+            # the servicer is created in the worker because the threads and gRPC objects in it do not survive a fork,
+            # the workers all bind to the same port with SO_REUSEPORT and the kernel balances connections across them
+            start_server(ModelgRPCServiceServicer(load_models=False, configuration=configuration), configuration,
+                         options=[("grpc.so_reuseport", 1)])
+
+        supervisor = Supervisor(worker=worker, worker_count=worker_count)
+        signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: supervisor.stop())
+        signal.signal(signal.SIGHUP, lambda signum, frame: supervisor.signal_workers(signal.SIGHUP))
+        logging.info("Starting {} worker processes.".format(worker_count))
+        supervisor.run()
+
+
+def reload_configuration(servicer):
+    """Import the configuration again and reload the models in it into a servicer."""
+    configuration_module = importlib.reload(importlib.import_module("model_grpc_service.config"))
+    configuration = getattr(configuration_module, os.environ["APP_SETTINGS"])
+    try:
+        servicer.reload_models(configuration)
+    except Exception:
+        logging.exception("Failed to reload the models, the models that were loaded before are still being used.")
+
+
+def load_pending_models(max_workers):
+    """Create the lazily loaded models, the models that fail are loaded again when they are first used."""
+    try:
+        ModelManager.load_pending_models(max_workers)
+    except Exception:
+        logging.exception("Failed to load the models in the background.")
+
+
+def start_server(servicer, configuration, options=None):
+    """Start the model service on the kind of server selected in the configuration and wait for it to terminate."""
+    # reloading the models in the background when the process receives SIGHUP
+    signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(
+        target=reload_configuration, args=(servicer,), name="model-reloader", daemon=True).start())
+
+    if configuration.server_mode == "asyncio":
+        try:
+            asyncio.run(serve_async(servicer, configuration, options=options))
+        except KeyboardInterrupt:
+            pass
+    elif configuration.server_mode == "sync":
+        serve_sync(servicer, configuration, options=options)
+    else:
+        raise ValueError("'{}' is not a valid server mode.".format(configuration.server_mode))
+
+
+def serve_sync(servicer, configuration, options=None):
+    """Start the model service on a gRPC server that handles each call in a thread."""
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=configuration.max_workers),
+                         interceptors=[AdmissionInterceptor()], options=options,
+                         maximum_concurrent_rpcs=configuration.maximum_concurrent_rpcs)
+    model_service_pb2_grpc.add_ModelgRPCServiceServicer_to_server(servicer, server)
+    health_servicer = create_health_servicer()
+    add_health_servicer_to_server(health_servicer, server, servicer.model_names)
     server.add_insecure_port(configuration.service_port)
     server.start()
+
+    # creating the lazily loaded models in the background now that the port is bound
+    if configuration.model_loading == "lazy":
+        threading.Thread(target=load_pending_models, args=(configuration.model_loading_workers,),
+                         name="model-loader", daemon=True).start()
+
+    # the service reports that it is serving once all of the models are warmed up
+    servicer.warm_up(health_servicer.set)
+    set_service_status(health_servicer, SERVING)
+
     try:
         while True:
             time.sleep(_ONE_DAY_IN_SECONDS)
     except KeyboardInterrupt:
+        health_servicer.enter_graceful_shutdown()
         server.stop(0)
 
 
@@ -0,0 +1,61 @@
+"""Class that coalesces identical calls that are in flight at the same time."""
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight(object):
+    """Make concurrent calls with the same key share the result of one call.
+
+    The first call with a key runs the function, the calls with the same key that arrive while it is running wait for
+    it and get its result or exception. Nothing is kept after the call finishes, so a call that arrives later runs the
+    function again.
+
+    """
+
+    def __init__(self):
+        """Create a single flight group."""
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, function, *args):
+        """Call a function, or wait for the result of the call with the same key that is already in flight.
+
+        :param key: The key that identifies identical calls.
+        :type key: hashable
+        :param function: The function to call.
+        :type function: callable
+        :returns: The result of the function.
+
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = function(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self):
+        """Return the counters of the single flight group."""
+        return {"in_flight": len(self._calls), "calls": self.calls, "shared": self.shared}
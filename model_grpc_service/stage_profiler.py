@@ -0,0 +1,152 @@
+"""Sampling profiler that times the stages of a prediction."""
+import cProfile
+import heapq
+import itertools
+import marshal
+import os
+import random
+import threading
+from collections import deque
+
+# the stages of a prediction, in the order that they happen
+STAGES = ("deserialize", "to_dict", "validate", "predict", "from_dict", "serialize", "total")
+
+# the profilers of the endpoints by the qualified name of their model, the metrics server serves their results
+profilers = {}
+
+
+class StageProfiler(object):
+    """Times the stages of a sample of the predictions made by an endpoint and aggregates the timings in memory.
+
+    Only the predictions that are sampled are timed, the others pay for one call to random(). The sampled predictions
+    can also be run under cProfile, the profiles of the slowest ones are kept so that they can be dumped to files.
+
+    """
+
+    def __init__(self, sample_rate=0.01, profile_slowest=0, window_size=1024):
+        """Create a stage profiler.
+
+        :param sample_rate: The fraction of the predictions that are timed, between 0.0 and 1.0.
+        :type sample_rate: float
+        :param profile_slowest: The number of cProfile profiles of the slowest sampled predictions that are kept, 0
+            turns cProfile off.
+        :type profile_slowest: int
+        :param window_size: The number of recent timings of each stage that the percentiles are computed from.
+        :type window_size: int
+
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0.0 and 1.0.")
+        if profile_slowest < 0:
+            raise ValueError("profile_slowest must not be negative.")
+
+        self._sample_rate = sample_rate
+        self._profile_slowest = profile_slowest
+        self._window_size = window_size
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self.reset()
+
+    def should_sample(self):
+        """Return True if the next prediction should be timed."""
+        # the random numbers only pick the predictions that are sampled, they are not used for security
+        return random.random() < self._sample_rate  # nosec
+
+    def create_profile(self):
+        """Create a cProfile profile for a sampled prediction, returns None if cProfile is turned off."""
+        return cProfile.Profile() if self._profile_slowest > 0 else None
+
+    def record(self, timings, profile=None):
+        """Record the timings of the stages of a sampled prediction.
+
+        :param timings: The number of seconds spent in each stage, by stage name, including "total".
+        :type timings: dict
+        :param profile: The cProfile profile of the prediction.
+        :type profile: cProfile.Profile
+
+        """
+        with self._lock:
+            for stage, seconds in timings.items():
+                aggregate = self._stages.get(stage)
+                if aggregate is None:
+                    aggregate = {"count": 0, "total": 0.0, "max": 0.0, "window": deque(maxlen=self._window_size)}
+                    self._stages[stage] = aggregate
+                aggregate["count"] += 1
+                aggregate["total"] += seconds
+                aggregate["max"] = max(aggregate["max"], seconds)
+                aggregate["window"].append(seconds)
+
+            if profile is not None:
+                entry = (timings["total"], next(self._sequence), profile)
+                if len(self._profiles) < self._profile_slowest:
+                    heapq.heappush(self._profiles, entry)
+                elif entry[0] > self._profiles[0][0]:
+                    heapq.heapreplace(self._profiles, entry)
+
+    def stats(self):
+        """Return the aggregated timings of each stage in seconds.
+
+        :returns: A dictionary with the keys count, mean, max, p50, and p99 for each stage, by stage name.
+        :rtype: dict
+
+        """
+        with self._lock:
+            stages = {stage: (aggregate["count"], aggregate["total"], aggregate["max"], sorted(aggregate["window"]))
+                      for stage, aggregate in self._stages.items()}
+
+        stats = {}
+        for stage in sorted(stages, key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES)):
+            count, total, maximum, window = stages[stage]
+            stats[stage] = {
+                "count": count,
+                "mean": total / count,
+                "max": maximum,
+                "p50": window[int(0.5 * (len(window) - 1))],
+                "p99": window[int(0.99 * (len(window) - 1))]
+            }
+        return stats
+
+    def slowest_profiles(self):
+        """Return the kept cProfile profiles as (total seconds, profile) tuples, the slowest first."""
+        with self._lock:
+            profiles = sorted(self._profiles, reverse=True)
+        return [(total, profile) for total, _, profile in profiles]
+
+    def profile_data(self, rank):
+        """Return a kept cProfile profile in the format of the files written by dump_slowest_profiles().
+
+        :param rank: The rank of the profile, 0 is the profile of the slowest prediction.
+        :type rank: int
+        :returns: The contents of a profile file, or None if there is no profile with the rank.
+        :rtype: bytes
+
+        """
+        profiles = self.slowest_profiles()
+        if not 0 <= rank < len(profiles):
+            return None
+        profile = profiles[rank][1]
+        profile.create_stats()
+        return marshal.dumps(profile.stats)
+
+    def dump_slowest_profiles(self, directory):
+        """Write the kept cProfile profiles to files in a directory, they can be read with the pstats module.
+
+        :param directory: The directory that the files are written to.
+        :type directory: str
+        :returns: The paths of the files, the profile of the slowest prediction first.
+        :rtype: list
+
+        """
+        paths = []
+        for rank, (total, profile) in enumerate(self.slowest_profiles()):
+            path = os.path.join(directory, "profile_{}_{:.6f}s.prof".format(rank, total))
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def reset(self):
+        """Remove all of the recorded timings and profiles."""
+        with self._lock:
+            self._stages = {}
+            # the heap holds (total time, sequence number, profile) tuples, the fastest of the kept profiles is first
+            self._profiles = []
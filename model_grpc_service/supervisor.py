@@ -0,0 +1,149 @@
+"""Supervisor that runs the model service in several forked worker processes."""
+import os
+import signal
+import logging
+import time
+
+from model_grpc_service import __name__
+
+logger = logging.getLogger(__name__)
+
+
+class Supervisor(object):
+    """Forks worker processes, restarts the ones that exit, and stops all of them on shutdown.
+
+    Everything that is loaded into memory before the workers are forked, like the models in the ModelManager, is
+    shared by the workers. Threads and gRPC objects must be created inside of the workers because they do not survive a
+    fork.
+
+    """
+
+    def __init__(self, worker, worker_count, restart_delay=1.0, max_restart_delay=60.0, max_fast_failures=5,
+                 fast_failure_time=10.0):
+        """Create a supervisor.
+
+        :param worker: Function that is called in each worker process with the index of the worker, the process exits
+            when it returns.
+        :type worker: callable
+        :param worker_count: The number of worker processes.
+        :type worker_count: int
+        :param restart_delay: The number of seconds to wait before restarting a worker that exited, the delay doubles
+            with each fast failure of the worker in a row.
+        :type restart_delay: float
+        :param max_restart_delay: The longest delay before restarting a worker in seconds.
+        :type max_restart_delay: float
+        :param max_fast_failures: The number of fast failures of a worker in a row after which the supervisor stops all
+            of the workers and run() raises an exception, None restarts the workers forever.
+        :type max_fast_failures: int
+        :param fast_failure_time: A worker that exits within this number of seconds of starting failed fast.
+        :type fast_failure_time: float
+
+        """
+        if not hasattr(os, "fork"):
+            raise RuntimeError("The supervisor can only run on platforms that support os.fork().")
+        if worker_count < 1:
+            raise ValueError("worker_count must be greater than zero.")
+
+        self._worker = worker
+        self._worker_count = worker_count
+        self._restart_delay = restart_delay
+        self._max_restart_delay = max_restart_delay
+        self._max_fast_failures = max_fast_failures
+        self._fast_failure_time = fast_failure_time
+        self._workers = {}
+        self._start_times = {}
+        self._stopping = False
+
+    @property
+    def worker_pids(self):
+        """Process ids of the worker processes that are running."""
+        return list(self._workers.keys())
+
+    def run(self):
+        """Start the worker processes and restart them when they exit, returns after stop() is called.
+
+        A worker that keeps failing right after it starts, for example because its port is taken, is restarted with an
+        exponential backoff. When it fails fast max_fast_failures times in a row the other workers are stopped and a
+        RuntimeError is raised, so that the process exits with an error instead of restarting the worker forever.
+
+        """
+        self._stopping = False
+        fast_failures = [0] * self._worker_count
+        failed_index = None
+        for index in range(self._worker_count):
+            self._start_worker(index)
+
+        while len(self._workers) > 0:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            index = self._workers.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+
+            if time.monotonic() - self._start_times[index] < self._fast_failure_time:
+                fast_failures[index] += 1
+            else:
+                fast_failures[index] = 0
+            if self._max_fast_failures is not None and fast_failures[index] >= self._max_fast_failures:
+                logger.error("Worker {} (pid {}) exited with status {}, it failed {} times in a row, stopping the "
+                             "workers.".format(index, pid, status, fast_failures[index]))
+                failed_index = index
+                self.stop()
+                continue
+
+            delay = min(self._restart_delay * 2 ** max(fast_failures[index] - 1, 0), self._max_restart_delay)
+            logger.warning("Worker {} (pid {}) exited with status {}, restarting it in {:.1f} seconds.".format(
+                index, pid, status, delay))
+            self._sleep(delay)
+            if not self._stopping:
+                self._start_worker(index)
+
+        if failed_index is not None:
+            raise RuntimeError("Worker {} failed {} times in a row within {} seconds of starting.".format(
+                failed_index, fast_failures[failed_index], self._fast_failure_time))
+
+    def stop(self):
+        """Stop all of the worker processes, can be called from a signal handler."""
+        self._stopping = True
+        self.signal_workers(signal.SIGTERM)
+
+    def signal_workers(self, signum):
+        """Send a signal to all of the worker processes, can be called from a signal handler."""
+        for pid in list(self._workers.keys()):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _sleep(self, seconds):
+        # sleeping in short steps so that a stop() from a signal handler does not wait for the whole delay
+        end_time = time.monotonic() + seconds
+        while not self._stopping and time.monotonic() < end_time:
+            time.sleep(min(0.1, max(end_time - time.monotonic(), 0.0)))
+
+    def _start_worker(self, index):
+        pid = os.fork()
+        if pid == 0:
+            # this is the worker process, the signal handlers of the supervisor are replaced so that SIGTERM and
+            # SIGINT raise a KeyboardInterrupt in the worker
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            # the worker has no workers of its own, so that the inherited handlers never signal the other workers
+            self._workers.clear()
+            exit_code = 0
+            try:
+                self._worker(index)
+            except KeyboardInterrupt:
+                pass
+            except BaseException:
+                logger.exception("Worker {} failed.".format(index))
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        else:
+            logger.info("Started worker {} (pid {}).".format(index, pid))
+            self._workers[pid] = index
+            self._start_times[index] = time.monotonic()
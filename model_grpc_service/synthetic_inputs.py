@@ -0,0 +1,60 @@
+"""Inputs for a model that are generated from the fields of its input protocol buffer."""
+import random
+from google.protobuf.descriptor import FieldDescriptor
+
+
+def synthetic_inputs(input_protobuf, count, seed=0):
+    """Generate random inputs from the fields of a model's input protocol buffer.
+
+    The input protocol buffer of a model is generated from the model's input schema, so its fields have the names and
+    types of the fields in the schema.
+
+    :param input_protobuf: The class of the model's input protocol buffer.
+    :type input_protobuf: type
+    :param count: The number of inputs to generate.
+    :type count: int
+    :param seed: The seed of the random number generator, the same seed always generates the same inputs.
+    :type seed: int
+    :returns: A list of dictionaries with a value for each field.
+    :rtype: list
+
+    """
+    # the random numbers only fill in the values of the inputs, they are not used for security
+    generator = random.Random(seed)  # nosec
+    inputs = []
+    for _ in range(count):
+        data = {}
+        for field in input_protobuf.DESCRIPTOR.fields:
+            if field.type in (FieldDescriptor.TYPE_FLOAT, FieldDescriptor.TYPE_DOUBLE):
+                data[field.name] = round(generator.uniform(0.0, 10.0), 2)
+            elif field.type == FieldDescriptor.TYPE_BOOL:
+                data[field.name] = generator.random() < 0.5
+            elif field.type == FieldDescriptor.TYPE_STRING:
+                data[field.name] = "".join(generator.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(8))
+            else:
+                data[field.name] = generator.randint(0, 100)
+        inputs.append(data)
+    return inputs
+
+
+def warm_up_inputs(warm_up, input_protobuf):
+    """Return the inputs that a model is warmed up with.
+
+    The inputs are the ones in the "inputs" key of the model's "warm_up" option, or if there are none, the number of
+    inputs in the "synthetic_inputs" key are generated from the fields of the model's input protocol buffer.
+
+    :param warm_up: The "warm_up" option of the model's configuration.
+    :type warm_up: dict
+    :param input_protobuf: The class of the model's input protocol buffer, None if the model does not have one, then
+        no inputs are generated.
+    :type input_protobuf: type
+    :returns: A list of dictionaries.
+    :rtype: list
+
+    """
+    inputs = warm_up.get("inputs")
+    if inputs is None:
+        if input_protobuf is None:
+            return []
+        inputs = synthetic_inputs(input_protobuf, warm_up.get("synthetic_inputs", 0))
+    return inputs
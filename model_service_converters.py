@@ -0,0 +1,20 @@
+# Generated by scripts/generate_proto.py from the models in configuration. DO NOT EDIT!
+"""Functions that convert the protocol buffers of the models to and from dictionaries by accessing fields directly."""
+import model_service_pb2
+
+
+def iris_model_input_to_dict(message):
+    """Convert a protocol buffer of type iris_model_input into a dictionary."""
+    return {
+        "sepal_length": message.sepal_length,
+        "sepal_width": message.sepal_width,
+        "petal_length": message.petal_length,
+        "petal_width": message.petal_width
+    }
+
+
+def iris_model_output_from_dict(data):
+    """Create a protocol buffer of type iris_model_output from a dictionary."""
+    message = model_service_pb2.iris_model_output()
+    message.species = data["species"]
+    return message
@@ -20,7 +20,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   package='model_grpc_service',
   syntax='proto3',
   serialized_options=None,
-  serialized_pb=_b('\n\x13model_service.proto\x12\x12model_grpc_service\"\x07\n\x05\x65mpty\"\xbc\x01\n\x05model\x12\x16\n\x0equalified_name\x18\x01 \x01(\t\x12\x14\n\x0c\x64isplay_name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x15\n\rmajor_version\x18\x04 \x01(\x11\x12\x15\n\rminor_version\x18\x05 \x01(\x11\x12\x12\n\ninput_type\x18\x06 \x01(\t\x12\x13\n\x0boutput_type\x18\x07 \x01(\t\x12\x19\n\x11predict_operation\x18\x08 \x01(\t\"=\n\x10model_collection\x12)\n\x06models\x18\x01 \x03(\x0b\x32\x19.model_grpc_service.model\"h\n\x10iris_model_input\x12\x14\n\x0csepal_length\x18\x01 \x01(\x02\x12\x13\n\x0bsepal_width\x18\x02 \x01(\x02\x12\x14\n\x0cpetal_length\x18\x03 \x01(\x02\x12\x13\n\x0bpetal_width\x18\x04 \x01(\x02\"$\n\x11iris_model_output\x12\x0f\n\x07species\x18\x01 \x01(\t2\xc8\x01\n\x10ModelgRPCService\x12O\n\nget_models\x12\x19.model_grpc_service.empty\x1a$.model_grpc_service.model_collection\"\x00\x12\x63\n\x12iris_model_predict\x12$.model_grpc_service.iris_model_input\x1a%.model_grpc_service.iris_model_output\"\x00\x62\x06proto3')
+  serialized_pb=_b('\n\x13model_service.proto\x12\x12model_grpc_service\"\x07\n\x05\x65mpty\"\xa1\x02\n\x05model\x12\x16\n\x0equalified_name\x18\x01 \x01(\t\x12\x14\n\x0c\x64isplay_name\x18\x02 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x03 \x01(\t\x12\x15\n\rmajor_version\x18\x04 \x01(\x11\x12\x15\n\rminor_version\x18\x05 \x01(\x11\x12\x12\n\ninput_type\x18\x06 \x01(\t\x12\x13\n\x0boutput_type\x18\x07 \x01(\t\x12\x19\n\x11predict_operation\x18\x08 \x01(\t\x12\x1f\n\x17\x62\x61tch_predict_operation\x18\t \x01(\t\x12 \n\x18stream_predict_operation\x18\n \x01(\t\x12 \n\x18tensor_predict_operation\x18\x0b \x01(\t\"=\n\x10model_collection\x12)\n\x06models\x18\x01 \x03(\x0b\x32\x19.model_grpc_service.model\"h\n\x10iris_model_input\x12\x14\n\x0csepal_length\x18\x01 \x01(\x02\x12\x13\n\x0bsepal_width\x18\x02 \x01(\x02\x12\x14\n\x0cpetal_length\x18\x03 \x01(\x02\x12\x13\n\x0bpetal_width\x18\x04 \x01(\x02\"$\n\x11iris_model_output\x12\x0f\n\x07species\x18\x01 \x01(\t\"N\n\x16iris_model_batch_input\x12\x34\n\x06inputs\x18\x01 \x03(\x0b\x32$.model_grpc_service.iris_model_input\"Q\n\x17iris_model_batch_output\x12\x36\n\x07outputs\x18\x01 \x03(\x0b\x32%.model_grpc_service.iris_model_output\"8\n\x17iris_model_tensor_input\x12\x0e\n\x06values\x18\x01 \x01(\x0c\x12\r\n\x05shape\x18\x02 \x03(\x03\x32\xa8\x04\n\x10ModelgRPCService\x12O\n\nget_models\x12\x19.model_grpc_service.empty\x1a$.model_grpc_service.model_collection\"\x00\x12\x63\n\x12iris_model_predict\x12$.model_grpc_service.iris_model_input\x1a%.model_grpc_service.iris_model_output\"\x00\x12u\n\x18iris_model_batch_predict\x12*.model_grpc_service.iris_model_batch_input\x1a+.model_grpc_service.iris_model_batch_output\"\x00\x12n\n\x19iris_model_stream_predict\x12$.model_grpc_service.iris_model_input\x1a%.model_grpc_service.iris_model_output\"\x00(\x01\x30\x01\x12w\n\x19iris_model_tensor_predict\x12+.model_grpc_service.iris_model_tensor_input\x1a+.model_grpc_service.iris_model_batch_output\"\x00\x62\x06proto3')
 )
 
 
@@ -113,6 +113,27 @@ _MODEL = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='batch_predict_operation', full_name='model_grpc_service.model.batch_predict_operation', index=8,
+      number=9, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='stream_predict_operation', full_name='model_grpc_service.model.stream_predict_operation', index=9,
+      number=10, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='tensor_predict_operation', full_name='model_grpc_service.model.tensor_predict_operation', index=10,
+      number=11, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b("").decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -126,7 +147,7 @@ _MODEL = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=53,
-  serialized_end=241,
+  serialized_end=342,
 )
 
 
@@ -156,8 +177,8 @@ _MODEL_COLLECTION = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=243,
-  serialized_end=304,
+  serialized_start=344,
+  serialized_end=405,
 )
 
 
@@ -208,8 +229,8 @@ _IRIS_MODEL_INPUT = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=306,
-  serialized_end=410,
+  serialized_start=407,
+  serialized_end=511,
 )
 
 
@@ -239,16 +260,121 @@ _IRIS_MODEL_OUTPUT = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=412,
-  serialized_end=448,
+  serialized_start=513,
+  serialized_end=549,
+)
+
+
+_IRIS_MODEL_BATCH_INPUT = _descriptor.Descriptor(
+  name='iris_model_batch_input',
+  full_name='model_grpc_service.iris_model_batch_input',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='inputs', full_name='model_grpc_service.iris_model_batch_input.inputs', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=551,
+  serialized_end=629,
+)
+
+
+_IRIS_MODEL_BATCH_OUTPUT = _descriptor.Descriptor(
+  name='iris_model_batch_output',
+  full_name='model_grpc_service.iris_model_batch_output',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='outputs', full_name='model_grpc_service.iris_model_batch_output.outputs', index=0,
+      number=1, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=631,
+  serialized_end=712,
+)
+
+
+_IRIS_MODEL_TENSOR_INPUT = _descriptor.Descriptor(
+  name='iris_model_tensor_input',
+  full_name='model_grpc_service.iris_model_tensor_input',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='values', full_name='model_grpc_service.iris_model_tensor_input.values', index=0,
+      number=1, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='shape', full_name='model_grpc_service.iris_model_tensor_input.shape', index=1,
+      number=2, type=3, cpp_type=2, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=714,
+  serialized_end=770,
 )
 
 _MODEL_COLLECTION.fields_by_name['models'].message_type = _MODEL
+_IRIS_MODEL_BATCH_INPUT.fields_by_name['inputs'].message_type = _IRIS_MODEL_INPUT
+_IRIS_MODEL_BATCH_OUTPUT.fields_by_name['outputs'].message_type = _IRIS_MODEL_OUTPUT
 DESCRIPTOR.message_types_by_name['empty'] = _EMPTY
 DESCRIPTOR.message_types_by_name['model'] = _MODEL
 DESCRIPTOR.message_types_by_name['model_collection'] = _MODEL_COLLECTION
 DESCRIPTOR.message_types_by_name['iris_model_input'] = _IRIS_MODEL_INPUT
 DESCRIPTOR.message_types_by_name['iris_model_output'] = _IRIS_MODEL_OUTPUT
+DESCRIPTOR.message_types_by_name['iris_model_batch_input'] = _IRIS_MODEL_BATCH_INPUT
+DESCRIPTOR.message_types_by_name['iris_model_batch_output'] = _IRIS_MODEL_BATCH_OUTPUT
+DESCRIPTOR.message_types_by_name['iris_model_tensor_input'] = _IRIS_MODEL_TENSOR_INPUT
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
 empty = _reflection.GeneratedProtocolMessageType('empty', (_message.Message,), {
@@ -286,6 +412,27 @@ iris_model_output = _reflection.GeneratedProtocolMessageType('iris_model_output'
   })
 _sym_db.RegisterMessage(iris_model_output)
 
+iris_model_batch_input = _reflection.GeneratedProtocolMessageType('iris_model_batch_input', (_message.Message,), {
+  'DESCRIPTOR' : _IRIS_MODEL_BATCH_INPUT,
+  '__module__' : 'model_service_pb2'
+  # @@protoc_insertion_point(class_scope:model_grpc_service.iris_model_batch_input)
+  })
+_sym_db.RegisterMessage(iris_model_batch_input)
+
+iris_model_batch_output = _reflection.GeneratedProtocolMessageType('iris_model_batch_output', (_message.Message,), {
+  'DESCRIPTOR' : _IRIS_MODEL_BATCH_OUTPUT,
+  '__module__' : 'model_service_pb2'
+  # @@protoc_insertion_point(class_scope:model_grpc_service.iris_model_batch_output)
+  })
+_sym_db.RegisterMessage(iris_model_batch_output)
+
+iris_model_tensor_input = _reflection.GeneratedProtocolMessageType('iris_model_tensor_input', (_message.Message,), {
+  'DESCRIPTOR' : _IRIS_MODEL_TENSOR_INPUT,
+  '__module__' : 'model_service_pb2'
+  # @@protoc_insertion_point(class_scope:model_grpc_service.iris_model_tensor_input)
+  })
+_sym_db.RegisterMessage(iris_model_tensor_input)
+
 
 
 _MODELGRPCSERVICE = _descriptor.ServiceDescriptor(
@@ -294,8 +441,8 @@ _MODELGRPCSERVICE = _descriptor.ServiceDescriptor(
   file=DESCRIPTOR,
   index=0,
   serialized_options=None,
-  serialized_start=451,
-  serialized_end=651,
+  serialized_start=773,
+  serialized_end=1325,
   methods=[
   _descriptor.MethodDescriptor(
     name='get_models',
@@ -315,6 +462,33 @@ _MODELGRPCSERVICE = _descriptor.ServiceDescriptor(
     output_type=_IRIS_MODEL_OUTPUT,
     serialized_options=None,
   ),
+  _descriptor.MethodDescriptor(
+    name='iris_model_batch_predict',
+    full_name='model_grpc_service.ModelgRPCService.iris_model_batch_predict',
+    index=2,
+    containing_service=None,
+    input_type=_IRIS_MODEL_BATCH_INPUT,
+    output_type=_IRIS_MODEL_BATCH_OUTPUT,
+    serialized_options=None,
+  ),
+  _descriptor.MethodDescriptor(
+    name='iris_model_stream_predict',
+    full_name='model_grpc_service.ModelgRPCService.iris_model_stream_predict',
+    index=3,
+    containing_service=None,
+    input_type=_IRIS_MODEL_INPUT,
+    output_type=_IRIS_MODEL_OUTPUT,
+    serialized_options=None,
+  ),
+  _descriptor.MethodDescriptor(
+    name='iris_model_tensor_predict',
+    full_name='model_grpc_service.ModelgRPCService.iris_model_tensor_predict',
+    index=4,
+    containing_service=None,
+    input_type=_IRIS_MODEL_TENSOR_INPUT,
+    output_type=_IRIS_MODEL_BATCH_OUTPUT,
+    serialized_options=None,
+  ),
 ])
 _sym_db.RegisterServiceDescriptor(_MODELGRPCSERVICE)
 
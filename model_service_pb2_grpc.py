@@ -24,6 +24,21 @@ class ModelgRPCServiceStub(object):
         request_serializer=model__service__pb2.iris_model_input.SerializeToString,
         response_deserializer=model__service__pb2.iris_model_output.FromString,
         )
+    self.iris_model_batch_predict = channel.unary_unary(
+        '/model_grpc_service.ModelgRPCService/iris_model_batch_predict',
+        request_serializer=model__service__pb2.iris_model_batch_input.SerializeToString,
+        response_deserializer=model__service__pb2.iris_model_batch_output.FromString,
+        )
+    self.iris_model_stream_predict = channel.stream_stream(
+        '/model_grpc_service.ModelgRPCService/iris_model_stream_predict',
+        request_serializer=model__service__pb2.iris_model_input.SerializeToString,
+        response_deserializer=model__service__pb2.iris_model_output.FromString,
+        )
+    self.iris_model_tensor_predict = channel.unary_unary(
+        '/model_grpc_service.ModelgRPCService/iris_model_tensor_predict',
+        request_serializer=model__service__pb2.iris_model_tensor_input.SerializeToString,
+        response_deserializer=model__service__pb2.iris_model_batch_output.FromString,
+        )
 
 
 class ModelgRPCServiceServicer(object):
@@ -44,6 +59,27 @@ class ModelgRPCServiceServicer(object):
     context.set_details('Method not implemented!')
     raise NotImplementedError('Method not implemented!')
 
+  def iris_model_batch_predict(self, request, context):
+    # missing associated documentation comment in .proto file
+    pass
+    context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+    context.set_details('Method not implemented!')
+    raise NotImplementedError('Method not implemented!')
+
+  def iris_model_stream_predict(self, request_iterator, context):
+    # missing associated documentation comment in .proto file
+    pass
+    context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+    context.set_details('Method not implemented!')
+    raise NotImplementedError('Method not implemented!')
+
+  def iris_model_tensor_predict(self, request, context):
+    # missing associated documentation comment in .proto file
+    pass
+    context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+    context.set_details('Method not implemented!')
+    raise NotImplementedError('Method not implemented!')
+
 
 def add_ModelgRPCServiceServicer_to_server(servicer, server):
   rpc_method_handlers = {
@@ -57,6 +93,21 @@ def add_ModelgRPCServiceServicer_to_server(servicer, server):
           request_deserializer=model__service__pb2.iris_model_input.FromString,
           response_serializer=model__service__pb2.iris_model_output.SerializeToString,
       ),
+      'iris_model_batch_predict': grpc.unary_unary_rpc_method_handler(
+          servicer.iris_model_batch_predict,
+          request_deserializer=model__service__pb2.iris_model_batch_input.FromString,
+          response_serializer=model__service__pb2.iris_model_batch_output.SerializeToString,
+      ),
+      'iris_model_stream_predict': grpc.stream_stream_rpc_method_handler(
+          servicer.iris_model_stream_predict,
+          request_deserializer=model__service__pb2.iris_model_input.FromString,
+          response_serializer=model__service__pb2.iris_model_output.SerializeToString,
+      ),
+      'iris_model_tensor_predict': grpc.unary_unary_rpc_method_handler(
+          servicer.iris_model_tensor_predict,
+          request_deserializer=model__service__pb2.iris_model_tensor_input.FromString,
+          response_serializer=model__service__pb2.iris_model_batch_output.SerializeToString,
+      ),
   }
   generic_handler = grpc.method_handlers_generic_handler(
       'model_grpc_service.ModelgRPCService', rpc_method_handlers)
@@ -0,0 +1,339 @@
+"""Load generator that measures the throughput and latency of the predict operations of the model service."""
+import argparse
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent import futures
+import grpc
+import numpy as np
+from google.protobuf.descriptor import FieldDescriptor
+
+import model_service_pb2
+import model_service_pb2_grpc
+from model_grpc_service.synthetic_inputs import synthetic_inputs
+
+# the percentiles of the latency that are reported
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+def load_corpus(path):
+    """Load the inputs in a JSONL file, each line is a dictionary with the fields of a model's input."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip() != ""]
+
+
+def percentile(sorted_values, percent):
+    """Return the value at a percentile of a sorted list with the nearest rank method."""
+    if len(sorted_values) == 0:
+        return None
+    rank = max(int(round(percent / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies, errors, predictions, elapsed):
+    """Compute the throughput and latency percentiles of a run, the latencies are in seconds."""
+    latencies = sorted(latencies)
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "predictions": predictions,
+        "elapsed_seconds": elapsed,
+        "calls_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "predictions_per_second": predictions / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": dict(
+            [("p{:g}".format(percent), percentile(latencies, percent) * 1000.0 if len(latencies) > 0 else None)
+             for percent in PERCENTILES] +
+            [("mean", sum(latencies) / len(latencies) * 1000.0 if len(latencies) > 0 else None),
+             ("max", latencies[-1] * 1000.0 if len(latencies) > 0 else None)])
+    }
+
+
+class _Recorder(object):
+    """Collects the latencies and errors of the calls made by several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.predictions = 0
+
+    def record(self, latency, predictions):
+        with self._lock:
+            self.latencies.append(latency)
+            self.predictions += predictions
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+
+def _cycle(items):
+    # the items are shared by all of the threads, next() on the iterator is not thread-safe so it is guarded by a lock
+    lock = threading.Lock()
+    iterator = iter(items)
+
+    def next_item():
+        nonlocal iterator
+        with lock:
+            try:
+                return next(iterator)
+            except StopIteration:
+                iterator = iter(items)
+                return next(iterator)
+    return next_item
+
+
+def run_closed_loop(stub, qualified_name, mode, requests, concurrency, duration, batch_size=1):
+    """Make calls from a number of threads that each wait for a response before making the next call.
+
+    :param stub: The stub of the model service.
+    :param qualified_name: The qualified name of the model.
+    :param mode: "unary", "batch", "tensor", or "stream".
+    :param requests: The input protocol buffers, they are reused in order until the run ends.
+    :param concurrency: The number of threads that make calls.
+    :param duration: The number of seconds that the run lasts.
+    :param batch_size: The number of inputs in each call of the "batch" and "tensor" modes.
+    :returns: The summary of the run.
+
+    """
+    recorder = _Recorder()
+    next_request = _cycle(requests)
+    deadline = time.perf_counter() + duration
+
+    def unary_worker():
+        method = getattr(stub, "{}_predict".format(qualified_name))
+        while time.perf_counter() < deadline:
+            request = next_request()
+            start_time = time.perf_counter()
+            try:
+                method(request)
+            except grpc.RpcError:
+                recorder.record_error()
+                continue
+            recorder.record(time.perf_counter() - start_time, 1)
+
+    def batch_worker():
+        method = getattr(stub, "{}_batch_predict".format(qualified_name))
+        batch_input = getattr(model_service_pb2, "{}_batch_input".format(qualified_name))
+        while time.perf_counter() < deadline:
+            request = batch_input(inputs=[next_request() for _ in range(batch_size)])
+            start_time = time.perf_counter()
+            try:
+                method(request)
+            except grpc.RpcError:
+                recorder.record_error()
+                continue
+            recorder.record(time.perf_counter() - start_time, batch_size)
+
+    def tensor_worker():
+        # packing the inputs into the buffer of the tensor input protocol buffer, with the columns in field order
+        method = getattr(stub, "{}_tensor_predict".format(qualified_name))
+        tensor_input = getattr(model_service_pb2, "{}_tensor_input".format(qualified_name))
+        fields = requests[0].DESCRIPTOR.fields
+        dtype = "<f4" if all(field.type == FieldDescriptor.TYPE_FLOAT for field in fields) else \
+            "<i8" if all(field.type == FieldDescriptor.TYPE_INT64 for field in fields) else "<f8"
+        while time.perf_counter() < deadline:
+            batch = [next_request() for _ in range(batch_size)]
+            rows = np.array([[getattr(request, field.name) for field in fields] for request in batch], dtype=dtype)
+            request = tensor_input(values=rows.tobytes(), shape=rows.shape)
+            start_time = time.perf_counter()
+            try:
+                method(request)
+            except grpc.RpcError:
+                recorder.record_error()
+                continue
+            recorder.record(time.perf_counter() - start_time, batch_size)
+
+    def stream_worker():
+        # each thread keeps one stream open and sends the next message when the response to the last one arrives
+        method = getattr(stub, "{}_stream_predict".format(qualified_name))
+        outgoing = queue.Queue()
+        responses = method(iter(outgoing.get, None))
+        try:
+            while time.perf_counter() < deadline:
+                start_time = time.perf_counter()
+                outgoing.put(next_request())
+                next(responses)
+                recorder.record(time.perf_counter() - start_time, 1)
+        except grpc.RpcError:
+            recorder.record_error()
+        finally:
+            # closing the stream and reading the responses that are left
+            outgoing.put(None)
+            try:
+                for _ in responses:
+                    pass
+            except grpc.RpcError:
+                pass
+
+    worker = {"unary": unary_worker, "batch": batch_worker, "tensor": tensor_worker, "stream": stream_worker}[mode]
+    start_time = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(recorder.latencies, recorder.errors, recorder.predictions, time.perf_counter() - start_time)
+
+
+def run_open_loop(stub, qualified_name, mode, requests, rate, duration, batch_size=1):
+    """Make calls at a constant rate without waiting for the responses to the calls that were made before.
+
+    The latency of each call is measured from the time it was scheduled to be made, so that a slow service is not
+    hidden by calls that were made late.
+
+    :param rate: The number of calls that are made each second.
+    :returns: The summary of the run.
+
+    """
+    if mode not in ("unary", "batch"):
+        raise ValueError("The open loop mode supports the unary and batch modes.")
+
+    if mode == "unary":
+        method = getattr(stub, "{}_predict".format(qualified_name))
+    else:
+        method = getattr(stub, "{}_batch_predict".format(qualified_name))
+        batch_input = getattr(model_service_pb2, "{}_batch_input".format(qualified_name))
+    predictions = 1 if mode == "unary" else batch_size
+
+    recorder = _Recorder()
+    next_request = _cycle(requests)
+    outstanding = []
+    interval = 1.0 / rate
+    start_time = time.perf_counter()
+    call_count = int(duration * rate)
+
+    for index in range(call_count):
+        scheduled_time = start_time + index * interval
+        delay = scheduled_time - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+        request = next_request() if mode == "unary" else batch_input(
+            inputs=[next_request() for _ in range(batch_size)])
+        future = method.future(request)
+
+        def done(future, scheduled_time=scheduled_time):
+            if future.exception() is not None:
+                recorder.record_error()
+            else:
+                recorder.record(time.perf_counter() - scheduled_time, predictions)
+        future.add_done_callback(done)
+        outstanding.append(future)
+
+    for future in outstanding:
+        try:
+            future.result()
+        except grpc.RpcError:
+            pass
+    return summarize(recorder.latencies, recorder.errors, recorder.predictions, time.perf_counter() - start_time)
+
+
+def start_in_process_server(configuration):
+    """Start the model service on a free port of localhost in this process.
+
+    :returns: The server and the address that it listens on.
+
+    """
+    from model_grpc_service.service import ModelgRPCServiceServicer
+    from model_grpc_service.admission_control import AdmissionInterceptor
+
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=configuration.max_workers),
+                         interceptors=[AdmissionInterceptor()],
+                         maximum_concurrent_rpcs=configuration.maximum_concurrent_rpcs)
+    model_service_pb2_grpc.add_ModelgRPCServiceServicer_to_server(
+        ModelgRPCServiceServicer(configuration=configuration), server)
+    address = "localhost:{}".format(port)
+    server.add_insecure_port(address)
+    server.start()
+    return server, address
+
+
+def main(args):
+    server = None
+    address = args.address
+    if args.in_process:
+        from model_grpc_service import config
+        server, address = start_in_process_server(getattr(config, os.environ.get("APP_SETTINGS", "Config")))
+
+    input_protobuf = getattr(model_service_pb2, "{}_input".format(args.model))
+    if args.corpus is not None:
+        inputs = load_corpus(args.corpus)
+    else:
+        inputs = synthetic_inputs(input_protobuf, args.synthetic_rows, seed=args.seed)
+    requests = [input_protobuf(**data) for data in inputs]
+
+    try:
+        with grpc.insecure_channel(address) as channel:
+            stub = model_service_pb2_grpc.ModelgRPCServiceStub(channel)
+
+            # warming up the service and the connection before measuring
+            if args.warm_up > 0:
+                run_closed_loop(stub, args.model, args.mode, requests, args.concurrency, args.warm_up, args.batch_size)
+
+            if args.rate is not None:
+                results = run_open_loop(stub, args.model, args.mode, requests, args.rate, args.duration,
+                                        args.batch_size)
+            else:
+                results = run_closed_loop(stub, args.model, args.mode, requests, args.concurrency, args.duration,
+                                          args.batch_size)
+    finally:
+        if server is not None:
+            server.stop(0)
+
+    results["settings"] = {
+        "model": args.model,
+        "mode": args.mode,
+        "concurrency": args.concurrency if args.rate is None else None,
+        "rate": args.rate,
+        "batch_size": args.batch_size if args.mode in ("batch", "tensor") else 1,
+        "duration": args.duration,
+        "in_process": args.in_process
+    }
+
+    latency = results["latency_ms"]
+    print("{} calls ({} errors) in {:.2f} seconds, {:.1f} calls/s, {:.1f} predictions/s".format(
+        results["calls"], results["errors"], results["elapsed_seconds"], results["calls_per_second"],
+        results["predictions_per_second"]))
+    if results["calls"] > 0:
+        print("latency ms: " + ", ".join("{} {:.3f}".format(name, value) for name, value in latency.items()))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure the throughput and latency of the model service.')
+    parser.add_argument('--model', default='iris_model', help='Qualified name of the model to call.')
+    parser.add_argument('--address', default='localhost:50051', help='Address of the model service.')
+    parser.add_argument('--in_process', action='store_true',
+                        help='Start the model service in this process on a free port of localhost, the configuration '
+                             'is selected with the APP_SETTINGS environment variable.')
+    parser.add_argument('--corpus', help='JSONL file with one input of the model on each line.')
+    parser.add_argument('--synthetic_rows', type=int, default=1000,
+                        help='Number of random inputs to generate when no corpus is given.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random inputs.')
+    parser.add_argument('--mode', choices=['unary', 'batch', 'tensor', 'stream'], default='unary',
+                        help='Operation to call: {model}_predict, {model}_batch_predict, {model}_tensor_predict or '
+                             '{model}_stream_predict.')
+    parser.add_argument('--batch_size', type=int, default=32,
+                        help='Number of inputs in each call in the batch and tensor modes.')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Number of threads that make calls in the closed loop mode.')
+    parser.add_argument('--rate', type=float,
+                        help='Make calls at this constant rate per second instead of in a closed loop.')
+    parser.add_argument('--duration', type=float, default=10.0, help='Number of seconds to measure for.')
+    parser.add_argument('--warm_up', type=float, default=1.0, help='Number of seconds to make calls before measuring.')
+    parser.add_argument('--output', help='File to write the results to as JSON.')
+
+    main(parser.parse_args())
@@ -1,21 +1,18 @@
 import argparse
-import grpc
 
-from model_service_pb2 import iris_model_input, empty
-from model_service_pb2_grpc import ModelgRPCServiceStub
+from model_service_pb2 import iris_model_input
+from model_grpc_service.client import ModelClient
 
 
 def run(get_models=False, iris_model_predict=False):
-    with grpc.insecure_channel("localhost:50051") as channel:
-
-        stub = ModelgRPCServiceStub(channel)
+    with ModelClient("localhost:50051", channels=1) as client:
 
         if get_models:
-            response = stub.get_models(empty())
+            response = client.get_models()
             print(response)
         elif iris_model_predict:
-            response = stub.iris_model_predict(
-                iris_model_input(sepal_length=1.1, sepal_width=1.2, petal_length=1.3, petal_width=1.4))
+            response = client.predict(
+                "iris_model", iris_model_input(sepal_length=1.1, sepal_width=1.2, petal_length=1.3, petal_width=1.4))
             print(response)
         else:
             print("No action selected.")
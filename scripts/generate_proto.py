@@ -18,45 +18,115 @@ type_mappings = {
     "null": "NullValue"
 }
 
+# this dict maps the types of the input fields of a model to the type of the values in its tensor input buffer
+tensor_type_mappings = {
+    frozenset(["float"]): "float32",
+    frozenset(["int64"]): "int64",
+    frozenset(["float", "int64"]): "float64"
+}
+
+
+def tensor_input(qualified_name, input_schema):
+    """Describe the tensor input message of a model, all of the input fields of the model must be numbers."""
+    dtype = tensor_type_mappings.get(frozenset(field["type"] for field in input_schema))
+    if dtype is None:
+        raise ValueError("Model '{}' must have only number and integer input fields to have a tensor input.".format(
+            qualified_name))
+    return {"dtype": dtype, "columns": ", ".join(field["name"] for field in input_schema)}
+
+
+def pipeline(pipeline_configuration, models):
+    """Describe the operation of a pipeline or ensemble, the models that it calls must be in the ModelManager."""
+    models = {model["qualified_name"]: model for model in models}
+    model_names = pipeline_configuration.get("steps" if pipeline_configuration.get("type", "pipeline") == "pipeline"
+                                             else "members", [])
+    if len(model_names) == 0:
+        raise ValueError("'{}' must have at least one model.".format(pipeline_configuration["qualified_name"]))
+    for model_name in model_names:
+        if model_name not in models:
+            raise ValueError("'{}' not found in ModelManager instance.".format(model_name))
+
+    if pipeline_configuration.get("type", "pipeline") == "pipeline":
+        # the output of each step is the input of the next one, so the next step's input fields must be in it
+        for model_name, next_model_name in zip(model_names, model_names[1:]):
+            output_fields = {field["name"]: field["type"] for field in models[model_name]["output_schema"]}
+            for field in models[next_model_name]["input_schema"]:
+                if output_fields.get(field["name"]) != field["type"]:
+                    raise ValueError("Input field '{}' of model '{}' is not an output field of model '{}' in "
+                                     "pipeline '{}'.".format(field["name"], next_model_name, model_name,
+                                                             pipeline_configuration["qualified_name"]))
+        return {"qualified_name": pipeline_configuration["qualified_name"], "input_model": model_names[0],
+                "output_model": model_names[-1]}
+
+    # the operation of an ensemble has the input and output of its first member, so all of the members must match them
+    for model_name in model_names[1:]:
+        for schema in ("input_schema", "output_schema"):
+            if models[model_name][schema] != models[model_names[0]][schema]:
+                raise ValueError("Model '{}' must have the same {} as model '{}' to be in ensemble '{}'.".format(
+                    model_name, schema.replace("_", " "), model_names[0], pipeline_configuration["qualified_name"]))
+    return {"qualified_name": pipeline_configuration["qualified_name"], "input_model": model_names[0],
+            "output_model": model_names[0]}
+
 
-def main(output_file):
+def main(output_file, converters_file=None):
     template_loader = jinja2.FileSystemLoader(searchpath="./")
     template_env = jinja2.Environment(loader=template_loader)
     template = template_env.get_template("model_service_template.proto")
 
     # building a data structure to feed to the template from the models in ModelManager
     models = []
+    qualified_names = []
     for model in model_manager.get_models():
+        # the protocol buffers of a model are generated from the highest major version of the model that is loaded
+        if model["qualified_name"] in qualified_names:
+            continue
+        qualified_names.append(model["qualified_name"])
         model_details = model_manager.get_model_metadata(qualified_name=model["qualified_name"])
+        model_configuration = model_manager.get_model_configuration(qualified_name=model["qualified_name"])
+        input_schema = [
+            {
+                "index": str(index + 1),
+                "name": field_name,
+                "type": type_mappings[model_details["input_schema"]["properties"][field_name]["type"]]
+            } for index, field_name in enumerate(model_details["input_schema"]["properties"])]
         models.append(
             {
                 "qualified_name": model_details["qualified_name"],
-                "input_schema": [
-                    {
-                        "index": str(index + 1),
-                        "name": field_name,
-                        "type": type_mappings[model_details["input_schema"]["properties"][field_name]["type"]]
-                    } for index, field_name in enumerate(model_details["input_schema"]["properties"])],
+                "input_schema": input_schema,
                 "output_schema": [
                     {
                         "index": str(index + 1),
                         "name": field_name,
                         "type": type_mappings[model_details["output_schema"]["properties"][field_name]["type"]]
-                    } for index, field_name in enumerate(model_details["output_schema"]["properties"])]
+                    } for index, field_name in enumerate(model_details["output_schema"]["properties"])],
+                # the tensor input message is only generated for the models that turn it on in the configuration
+                "tensor_input": tensor_input(model_details["qualified_name"], input_schema)
+                if model_configuration.get("tensor_input", {}).get("enabled", False) else None
             }
         )
 
+    pipelines = [pipeline(pipeline_configuration, models) for pipeline_configuration in Config.pipelines]
+
     # rendering the template with the data structure
-    output_text = template.render(models=models)
+    output_text = template.render(models=models, pipelines=pipelines)
 
     with open(output_file, "w") as f:
         f.write(output_text)
 
+    # rendering the module of functions that convert the protocol buffers to and from dictionaries
+    if converters_file is not None:
+        converters_template = template_env.get_template("model_service_converters_template.jinja2")
+        converters_text = converters_template.render(models=models)
+
+        with open(converters_file, "w") as f:
+            f.write(converters_text)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Build a protocol buffer definition from MLModel classes.')
     parser.add_argument('--output_file', type=str, help='Location of output .proto file.')
+    parser.add_argument('--converters_file', type=str, help='Location of output python module of converter functions.')
 
     args = parser.parse_args()
 
-    main(output_file=args.output_file)
+    main(output_file=args.output_file, converters_file=args.converters_file)
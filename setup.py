@@ -20,11 +20,14 @@ setup(
     author="Brian Schmidt",
     author_email="6666331+schmidtbri@users.noreply.github.com",
     packages=["model_grpc_service"],
-    py_modules = ['model_service_pb2', 'model_service_pb2_grpc'],
-    python_requires=">=3.5",
+    py_modules = ['model_service_pb2', 'model_service_pb2_grpc', 'model_service_converters'],
+    python_requires=">=3.7",
     install_requires=["iris-model@git+https://github.com/schmidtbri/ml-model-abc-improvements#egg=iris_model@master",
-                      "grpcio==1.26.0",
+                      "grpcio==1.32.0",
                       "grpcio-tools==1.26.0",
-                      "Jinja2==2.11.3"],
+                      "grpcio-health-checking==1.26.0",
+                      "Jinja2==2.11.3",
+                      "joblib==0.14.1",
+                      "numpy==1.18.1"],
     tests_require=['pytest', 'pytest-html', 'pylama', 'coverage', 'coverage-badge', 'bandit', 'safety']
 )
@@ -0,0 +1,167 @@
+import time
+import unittest
+import threading
+from concurrent import futures
+import grpc
+
+from model_service_pb2 import iris_model_input
+import model_service_pb2_grpc
+from model_grpc_service.admission_control import AdmissionController, AdmissionRejected, AdmissionInterceptor
+
+
+# creating a servicer that rejects all of the requests
+class RejectingServicerMock(model_service_pb2_grpc.ModelgRPCServiceServicer):
+
+    def iris_model_predict(self, request, context):
+        raise AdmissionRejected(grpc.StatusCode.RESOURCE_EXHAUSTED, "The model is overloaded.")
+
+
+class AdmissionControllerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that requests are rejected when the model is busy and the queue is full"""
+        # arrange
+        controller = AdmissionController(max_concurrency=2, max_queue_size=0)
+
+        # act
+        controller.acquire()
+        controller.acquire()
+        exception = None
+        try:
+            controller.acquire()
+        except AdmissionRejected as e:
+            exception = e
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.RESOURCE_EXHAUSTED)
+        self.assertTrue(controller.stats() == {"running": 2, "queued": 0, "admitted": 2, "rejected": 1,
+                                               "expired": 0})
+
+    def test2(self):
+        """testing that queued requests are admitted in priority order when a request finishes"""
+        # arrange
+        controller = AdmissionController(max_concurrency=1, max_queue_size=2)
+        controller.acquire()
+        admitted = []
+
+        def request(name, priority):
+            controller.acquire(timeout=10.0, priority=priority)
+            admitted.append(name)
+
+        low = threading.Thread(target=request, args=("low", 2))
+        low.start()
+        while controller.stats()["queued"] < 1:
+            time.sleep(0.001)
+        high = threading.Thread(target=request, args=("high", 0))
+        high.start()
+        while controller.stats()["queued"] < 2:
+            time.sleep(0.001)
+
+        # act
+        controller.release()
+        high.join(10.0)
+        controller.release()
+        low.join(10.0)
+
+        # assert
+        self.assertTrue(admitted == ["high", "low"])
+
+    def test3(self):
+        """testing that a queued request is rejected when its deadline passes"""
+        # arrange
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+        controller.acquire()
+
+        # act
+        exception = None
+        try:
+            controller.acquire(timeout=0.01)
+        except AdmissionRejected as e:
+            exception = e
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertTrue(controller.stats()["expired"] == 1)
+        self.assertTrue(controller.stats()["queued"] == 0)
+
+    def test4(self):
+        """testing that a request with a higher priority sheds a queued request with a lower priority"""
+        # arrange
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+        controller.acquire()
+        exceptions = []
+
+        def request(priority):
+            try:
+                controller.acquire(timeout=10.0, priority=priority)
+            except AdmissionRejected as e:
+                exceptions.append(e)
+
+        low = threading.Thread(target=request, args=(2,))
+        low.start()
+        while controller.stats()["queued"] < 1:
+            time.sleep(0.001)
+
+        # act
+        high = threading.Thread(target=request, args=(0,))
+        high.start()
+        low.join(10.0)
+        controller.release()
+        high.join(10.0)
+
+        # assert
+        self.assertTrue(len(exceptions) == 1 and exceptions[0].code == grpc.StatusCode.RESOURCE_EXHAUSTED)
+        self.assertTrue(controller.stats()["admitted"] == 2)
+
+    def test5(self):
+        """testing that the interceptor ends the calls that are rejected with the status code of the rejection"""
+        # arrange
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=1), interceptors=[AdmissionInterceptor()])
+        model_service_pb2_grpc.add_ModelgRPCServiceServicer_to_server(RejectingServicerMock(), server)
+        port = server.add_insecure_port("localhost:0")
+        server.start()
+
+        # act
+        code = None
+        try:
+            with grpc.insecure_channel("localhost:{}".format(port)) as channel:
+                stub = model_service_pb2_grpc.ModelgRPCServiceStub(channel)
+                stub.iris_model_predict(iris_model_input(), timeout=10.0)
+        except grpc.RpcError as e:
+            code = e.code()
+        finally:
+            server.stop(0)
+
+        # assert
+        self.assertTrue(code == grpc.StatusCode.RESOURCE_EXHAUSTED)
+
+    def test6(self):
+        """testing that a queued request without a deadline waits without a limit and keeps no slot after it runs"""
+        # arrange
+        controller = AdmissionController(max_concurrency=1, max_queue_size=1)
+        controller.acquire()
+        admitted = []
+
+        def request():
+            # the sync server gives the calls without a deadline this time remaining
+            controller.acquire(timeout=9.2e18)
+            admitted.append(True)
+            controller.release()
+
+        thread = threading.Thread(target=request)
+        thread.start()
+        while controller.stats()["queued"] < 1:
+            time.sleep(0.001)
+
+        # act
+        controller.release()
+        thread.join(10.0)
+
+        # assert
+        self.assertTrue(admitted == [True])
+        self.assertTrue(controller.stats() == {"running": 0, "queued": 0, "admitted": 2, "rejected": 0,
+                                               "expired": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
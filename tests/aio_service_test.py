@@ -0,0 +1,94 @@
+import unittest
+import asyncio
+from concurrent import futures
+from model_service_pb2 import iris_model_input, iris_model_batch_input
+from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.ml_model_grpc_endpoint import MLModelgRPCEndpoint
+from model_grpc_service.aio_service import AsyncModelgRPCServiceServicer, _log_loading_failure
+
+
+# creating a servicer class that hosts the models to test with
+class ModelgRPCServiceServicerMock(object):
+
+    def __init__(self):
+        self.model_manager = ModelManager()
+        self.model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "BatchIrisModelMock"
+        }])
+        self.iris_model_predict = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        self.pipeline_names = []
+
+
+async def request_stream(requests):
+    for request in requests:
+        yield request
+
+
+class AsyncModelgRPCServiceServicerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = futures.ThreadPoolExecutor(max_workers=2)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        self.executor.shutdown()
+
+    def test1(self):
+        """testing the predict and batch predict coroutines"""
+        # arrange
+        servicer = AsyncModelgRPCServiceServicer(ModelgRPCServiceServicerMock(), self.executor)
+        request = iris_model_input(sepal_length=6.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+
+        # act
+        response = self.loop.run_until_complete(servicer.iris_model_predict(request, None))
+        batch_response = self.loop.run_until_complete(
+            servicer.iris_model_batch_predict(iris_model_batch_input(inputs=[request, request]), None))
+
+        # assert
+        self.assertTrue(response.species == "virginica")
+        self.assertTrue([output.species for output in batch_response.outputs] == ["virginica", "virginica"])
+
+    def test2(self):
+        """testing the stream predict coroutine"""
+        # arrange
+        servicer = AsyncModelgRPCServiceServicer(ModelgRPCServiceServicerMock(), self.executor)
+        requests = [iris_model_input(sepal_length=float(value), sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+                    for value in range(1, 51)]
+
+        async def collect():
+            return [response async for response in
+                    servicer.iris_model_stream_predict(request_stream(requests), None)]
+
+        # act
+        responses = self.loop.run_until_complete(collect())
+
+        # assert
+        self.assertTrue([response.species for response in responses] ==
+                        ["setosa" if value < 5 else "virginica" for value in range(1, 51)])
+
+    def test3(self):
+        """testing that a failure of the models that are loaded in the background is logged"""
+        # arrange
+        def load_pending_models():
+            raise RuntimeError("The model could not be created.")
+
+        async def load():
+            loader = asyncio.get_running_loop().run_in_executor(self.executor, load_pending_models)
+            loader.add_done_callback(_log_loading_failure)
+            await asyncio.wait([loader])
+            # letting the done callback run
+            await asyncio.sleep(0)
+
+        # act
+        with self.assertLogs("model_grpc_service", level="ERROR") as logs:
+            self.loop.run_until_complete(load())
+
+        # assert
+        self.assertTrue(len(logs.records) == 1)
+        self.assertTrue(isinstance(logs.records[0].exc_info[1], RuntimeError))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from model_grpc_service.bulk_scoring import read_rows, score_file
+from tests.ml_model_grpc_endpoint_test import BatchIrisModelMock
+
+# the configuration of the model that the files are scored with
+configuration = {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "BatchIrisModelMock"}
+
+
+# creating an MLModel class whose batch predictions are missing the prediction of the last row
+class ShortBatchIrisModelMock(BatchIrisModelMock):
+
+    def predict_batch(self, data):
+        return super().predict_batch(data)[:-1]
+
+
+class BulkScoringTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input_path = os.path.join(self.directory, "rows.jsonl")
+        with open(self.input_path, "w") as f:
+            for value in range(100):
+                f.write(json.dumps({"sepal_length": value / 10.0, "sepal_width": 1.0, "petal_length": 1.0,
+                                    "petal_width": 1.0}) + "\n")
+        self.output_path = os.path.join(self.directory, "scores.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_output(self):
+        with open(self.output_path) as f:
+            return [json.loads(line) for line in f]
+
+    def test1(self):
+        """testing that the rows are scored in worker processes and written in order"""
+        # arrange, act
+        scored_rows = score_file("iris_model", configuration, self.input_path, self.output_path, batch_size=7,
+                                 workers=2)
+
+        # assert
+        results = self.read_output()
+        self.assertTrue(scored_rows == 100)
+        self.assertTrue([result["row"] for result in results] == list(range(100)))
+        self.assertTrue([result["prediction"]["species"] for result in results] ==
+                        ["setosa" if value < 50 else "virginica" for value in range(100)])
+        self.assertTrue(not os.path.exists(self.output_path + ".checkpoint"))
+
+    def test2(self):
+        """testing that the scoring resumes from the checkpoint and writes each row once"""
+        # arrange
+        score_file("iris_model", configuration, self.input_path, self.output_path, batch_size=10, workers=0)
+        with open(self.output_path) as f:
+            lines = f.readlines()
+        # writing the output and the checkpoint that an interrupted run would have left after 30 rows, with a partly
+        # written row after them
+        with open(self.output_path, "w") as f:
+            f.writelines(lines[:30])
+            output_size = f.tell()
+            f.write(lines[30][:10])
+        with open(self.output_path + ".checkpoint", "w") as f:
+            json.dump({"rows": 30, "output_size": output_size}, f)
+
+        # act
+        scored_rows = score_file("iris_model", configuration, self.input_path, self.output_path, batch_size=10,
+                                 workers=0, resume=True)
+
+        # assert
+        self.assertTrue(scored_rows == 70)
+        self.assertTrue([result["row"] for result in self.read_output()] == list(range(100)))
+
+    def test3(self):
+        """testing that the values of a CSV file are converted into the types of the fields of the input"""
+        # arrange
+        path = os.path.join(self.directory, "rows.csv")
+        with open(path, "w") as f:
+            f.write("sepal_length,sepal_width,petal_length,petal_width,id\n4.5,1.0,1.0,1.0,a\n")
+        from model_service_pb2 import iris_model_input
+
+        # act
+        rows = list(read_rows(path, "csv", iris_model_input))
+
+        # assert
+        self.assertTrue(rows == [{"sepal_length": 4.5, "sepal_width": 1.0, "petal_length": 1.0, "petal_width": 1.0,
+                                  "id": "a"}])
+
+    def test4(self):
+        """testing that the integers in the float fields of a JSONL file are converted into floats"""
+        # arrange
+        path = os.path.join(self.directory, "integers.jsonl")
+        with open(path, "w") as f:
+            f.write(json.dumps({"sepal_length": 4, "sepal_width": 1.5, "petal_length": 1, "petal_width": 1}) + "\n")
+        from model_service_pb2 import iris_model_input
+
+        # act
+        rows = list(read_rows(path, "jsonl", iris_model_input))
+
+        # assert
+        self.assertTrue(all(isinstance(value, float) for value in rows[0].values()))
+
+    def test5(self):
+        """testing that a CSV row with a value that cannot be converted gets an error and the other rows are scored"""
+        # arrange
+        input_path = os.path.join(self.directory, "rows.csv")
+        with open(input_path, "w") as f:
+            f.write("sepal_length,sepal_width,petal_length,petal_width\n4.5,1.0,1.0,1.0\n,1.0,1.0,1.0\n"
+                    "6.0,1.0,1.0,1.0\n")
+
+        # act
+        scored_rows = score_file("iris_model", configuration, input_path, self.output_path, input_format="csv",
+                                 workers=0)
+
+        # assert
+        results = self.read_output()
+        self.assertTrue(scored_rows == 3 and [result["row"] for result in results] == [0, 1, 2])
+        self.assertTrue(results[0]["prediction"]["species"] == "setosa")
+        self.assertTrue("error" in results[1] and "prediction" not in results[1])
+        self.assertTrue(results[2]["prediction"]["species"] == "virginica")
+
+    def test6(self):
+        """testing that a JSONL row that is not an object gets an error and the other rows are scored"""
+        # arrange
+        input_path = os.path.join(self.directory, "values.jsonl")
+        with open(input_path, "w") as f:
+            f.write("3\n[1]\n")
+            f.write(json.dumps({"sepal_length": 4.5, "sepal_width": 1.0, "petal_length": 1.0,
+                                "petal_width": 1.0}) + "\n")
+
+        # act
+        scored_rows = score_file("iris_model", configuration, input_path, self.output_path, workers=0)
+
+        # assert
+        results = self.read_output()
+        self.assertTrue(scored_rows == 3)
+        self.assertTrue([result.get("error") for result in results[:2]] == ["The row is not a JSON object."] * 2)
+        self.assertTrue(results[2]["prediction"]["species"] == "setosa")
+
+    def test7(self):
+        """testing that the rows are predicted one at a time when the batch predictions are missing a row"""
+        # arrange, act
+        scored_rows = score_file("iris_model", {"module_name": "tests.bulk_scoring_test",
+                                                "class_name": "ShortBatchIrisModelMock"},
+                                 self.input_path, self.output_path, batch_size=10, workers=0)
+
+        # assert
+        results = self.read_output()
+        self.assertTrue(scored_rows == 100 and all("prediction" in result for result in results))
+        self.assertTrue([result["row"] for result in results] == list(range(100)))
+
+    def test8(self):
+        """testing that the scoring starts from the first row when the output file of the checkpoint is missing"""
+        # arrange
+        with open(self.output_path + ".checkpoint", "w") as f:
+            json.dump({"rows": 30, "output_size": 1000}, f)
+
+        # act
+        scored_rows = score_file("iris_model", configuration, self.input_path, self.output_path, batch_size=10,
+                                 workers=0, resume=True)
+
+        # assert
+        self.assertTrue(scored_rows == 100)
+        self.assertTrue([result["row"] for result in self.read_output()] == list(range(100)))
+
+
+if __name__ == '__main__':
+    unittest.main()
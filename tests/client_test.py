@@ -0,0 +1,325 @@
+import time
+import asyncio
+import unittest
+import threading
+from concurrent import futures
+import grpc
+
+from model_service_pb2 import iris_model_input, iris_model_output, iris_model_batch_output
+import model_service_pb2_grpc
+from model_grpc_service.client import ModelClient, AsyncModelClient
+
+
+# creating a servicer that makes its first predictions and all of its batch predictions slowly and counts the calls
+class SlowServicerMock(model_service_pb2_grpc.ModelgRPCServiceServicer):
+
+    def __init__(self, slow_calls=0, delay=1.0, batch_delay=0.0):
+        self.slow_calls = slow_calls
+        self.delay = delay
+        self.batch_delay = batch_delay
+        self.predict_calls = 0
+        self.batch_sizes = []
+        self.batch_priorities = []
+        self._lock = threading.Lock()
+
+    def iris_model_predict(self, request, context):
+        with self._lock:
+            self.predict_calls += 1
+            slow = self.predict_calls <= self.slow_calls
+        if slow:
+            time.sleep(self.delay)
+        return iris_model_output(species="setosa" if request.sepal_length < 5.0 else "virginica")
+
+    def iris_model_batch_predict(self, request, context):
+        with self._lock:
+            self.batch_sizes.append(len(request.inputs))
+            self.batch_priorities.append(dict(context.invocation_metadata()).get("priority"))
+        time.sleep(self.batch_delay)
+        return iris_model_batch_output(outputs=[
+            iris_model_output(species="setosa" if item.sepal_length < 5.0 else "virginica") for item in request.inputs])
+
+    def iris_model_stream_predict(self, request_iterator, context):
+        for request in request_iterator:
+            yield iris_model_output(species="setosa" if request.sepal_length < 5.0 else "virginica")
+
+
+# creating a servicer that returns one output less than the inputs of a batch
+class ShortBatchServicerMock(SlowServicerMock):
+
+    def iris_model_batch_predict(self, request, context):
+        response = super().iris_model_batch_predict(request, context)
+        return iris_model_batch_output(outputs=response.outputs[:-1])
+
+
+class ModelClientTests(unittest.TestCase):
+
+    def start_server(self, servicer):
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=16))
+        model_service_pb2_grpc.add_ModelgRPCServiceServicer_to_server(servicer, self.server)
+        port = self.server.add_insecure_port("127.0.0.1:0")
+        self.server.start()
+        return "127.0.0.1:{}".format(port)
+
+    def tearDown(self):
+        self.server.stop(0)
+
+    def test1(self):
+        """testing the predict, batch predict and stream predict methods of the client"""
+        # arrange
+        target = self.start_server(SlowServicerMock())
+        data = {"sepal_length": 4.0, "sepal_width": 1.0, "petal_length": 1.0, "petal_width": 1.0}
+
+        # act
+        with ModelClient(target, channels=2) as client:
+            response = client.predict("iris_model", data)
+            message_response = client.predict("iris_model", iris_model_input(sepal_length=6.0))
+            batch_responses = client.predict_batch("iris_model", [data, iris_model_input(sepal_length=6.0)])
+            stream_responses = list(client.stream_predict("iris_model", [data] * 3))
+
+        # assert
+        self.assertTrue(response.species == "setosa" and message_response.species == "virginica")
+        self.assertTrue([output.species for output in batch_responses] == ["setosa", "virginica"])
+        self.assertTrue([output.species for output in stream_responses] == ["setosa"] * 3)
+
+    def test2(self):
+        """testing that a slow call is sent again and the first response is used"""
+        # arrange
+        servicer = SlowServicerMock(slow_calls=1, delay=2.0)
+        target = self.start_server(servicer)
+
+        # act
+        with ModelClient(target, channels=2, default_timeout=5.0, hedging_delay=0.05) as client:
+            start_time = time.monotonic()
+            response = client.predict("iris_model", iris_model_input(sepal_length=4.0))
+            elapsed_time = time.monotonic() - start_time
+            hedged_attempts = client.hedged_attempts
+
+        # assert
+        self.assertTrue(response.species == "setosa")
+        self.assertTrue(elapsed_time < 1.0)
+        self.assertTrue(hedged_attempts == 1 and servicer.predict_calls == 2)
+
+    def test3(self):
+        """testing that a call that takes longer than its timeout fails with DEADLINE_EXCEEDED"""
+        # arrange
+        target = self.start_server(SlowServicerMock(slow_calls=10, delay=1.0))
+
+        # act
+        codes = []
+        with ModelClient(target, default_timeout=0.1, hedging_delay=0.02, max_attempts=3) as client:
+            for timeout in (None, 0.2):
+                try:
+                    client.predict("iris_model", iris_model_input(sepal_length=4.0), timeout=timeout)
+                except grpc.RpcError as e:
+                    codes.append(e.code())
+
+        # assert
+        self.assertTrue(codes == [grpc.StatusCode.DEADLINE_EXCEEDED, grpc.StatusCode.DEADLINE_EXCEEDED])
+
+    def test4(self):
+        """testing that the single predictions of concurrent callers are sent in batch RPCs"""
+        # arrange
+        servicer = SlowServicerMock()
+        target = self.start_server(servicer)
+        responses = []
+
+        # act
+        with ModelClient(target, batch_size=8, batch_wait_time=0.05) as client:
+            def predict(value):
+                responses.append((value, client.predict("iris_model", iris_model_input(sepal_length=value)).species))
+            threads = [threading.Thread(target=predict, args=(float(value),)) for value in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # assert
+        self.assertTrue(servicer.predict_calls == 0 and sum(servicer.batch_sizes) == 8)
+        self.assertTrue(len(servicer.batch_sizes) < 8)
+        self.assertTrue(all(species == ("setosa" if value < 5.0 else "virginica") for value, species in responses))
+
+    def test5(self):
+        """testing the hedged and batched predictions of the asyncio client"""
+        # arrange
+        servicer = SlowServicerMock(slow_calls=1, delay=2.0)
+        target = self.start_server(servicer)
+        loop = asyncio.new_event_loop()
+
+        async def predict():
+            async with AsyncModelClient(target, channels=2, default_timeout=5.0, hedging_delay=0.05) as client:
+                response = await client.predict("iris_model", {"sepal_length": 4.0})
+                hedged_attempts = client.hedged_attempts
+            async with AsyncModelClient(target, batch_size=4, batch_wait_time=0.05) as client:
+                batched_responses = await asyncio.gather(
+                    *[client.predict("iris_model", iris_model_input(sepal_length=float(value))) for value in (4, 6)])
+            return response, hedged_attempts, batched_responses
+
+        # act
+        try:
+            start_time = time.monotonic()
+            response, hedged_attempts, batched_responses = loop.run_until_complete(predict())
+            elapsed_time = time.monotonic() - start_time
+        finally:
+            loop.close()
+
+        # assert
+        self.assertTrue(response.species == "setosa" and hedged_attempts == 1 and elapsed_time < 1.5)
+        self.assertTrue([output.species for output in batched_responses] == ["setosa", "virginica"])
+        self.assertTrue(servicer.batch_sizes == [2])
+
+    def test6(self):
+        """testing that the batched predictions fail within their own timeout when the server is slow"""
+        # arrange
+        target = self.start_server(SlowServicerMock(batch_delay=2.0))
+        results = []
+
+        # act
+        with ModelClient(target, batch_size=8, batch_wait_time=0.01) as client:
+            def predict(value):
+                start_time = time.monotonic()
+                try:
+                    client.predict("iris_model", iris_model_input(sepal_length=value), timeout=0.3)
+                    results.append((None, time.monotonic() - start_time))
+                except grpc.RpcError as e:
+                    results.append((e.code(), time.monotonic() - start_time))
+            threads = [threading.Thread(target=predict, args=(float(value),)) for value in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        # assert
+        self.assertTrue(len(results) == 8)
+        self.assertTrue(all(code == grpc.StatusCode.DEADLINE_EXCEEDED for code, _ in results))
+        self.assertTrue(all(elapsed_time < 0.5 for _, elapsed_time in results))
+
+    def test7(self):
+        """testing that several batch RPCs are in flight at the same time and that they keep the callers' metadata"""
+        # arrange
+        servicer = SlowServicerMock(batch_delay=0.3)
+        target = self.start_server(servicer)
+        responses = []
+
+        # act
+        with ModelClient(target, default_timeout=5.0, batch_size=2, batch_wait_time=0.05) as client:
+            def predict(value, priority):
+                responses.append(client.predict("iris_model", iris_model_input(sepal_length=value),
+                                                metadata=(("priority", priority),)).species)
+            threads = [threading.Thread(target=predict, args=(float(value), "high" if value % 2 == 0 else "low"))
+                       for value in range(8)]
+            start_time = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed_time = time.monotonic() - start_time
+
+        # assert
+        self.assertTrue(len(responses) == 8 and servicer.batch_sizes == [2] * 4)
+        self.assertTrue(sorted(servicer.batch_priorities) == ["high", "high", "low", "low"])
+        # the four batches take 1.2 seconds when they are sent one after the other
+        self.assertTrue(elapsed_time < 0.9)
+
+    def test8(self):
+        """testing that the batched predictions of the asyncio client fail within their own timeout"""
+        # arrange
+        target = self.start_server(SlowServicerMock(batch_delay=2.0))
+        loop = asyncio.new_event_loop()
+
+        async def predict():
+            async with AsyncModelClient(target, batch_size=4, batch_wait_time=0.01) as client:
+                return await asyncio.gather(
+                    *[client.predict("iris_model", iris_model_input(sepal_length=float(value)), timeout=timeout)
+                      for value, timeout in ((4, 0.3), (6, 0.6))], return_exceptions=True)
+
+        # act
+        try:
+            start_time = time.monotonic()
+            errors = loop.run_until_complete(predict())
+            elapsed_time = time.monotonic() - start_time
+        finally:
+            loop.close()
+
+        # assert
+        self.assertTrue([error.code() for error in errors] == [grpc.StatusCode.DEADLINE_EXCEEDED] * 2)
+        self.assertTrue(elapsed_time < 0.5)
+
+    def test9(self):
+        """testing that a hedged call whose timeout has already passed fails with DEADLINE_EXCEEDED"""
+        # arrange
+        target = self.start_server(SlowServicerMock(slow_calls=2))
+        loop = asyncio.new_event_loop()
+
+        async def predict():
+            async with AsyncModelClient(target, hedging_delay=0.05) as client:
+                return await client.predict("iris_model", iris_model_input(sepal_length=4.0), timeout=0.0)
+
+        # act
+        codes = []
+        with ModelClient(target, hedging_delay=0.05) as client:
+            try:
+                client.predict("iris_model", iris_model_input(sepal_length=4.0), timeout=0.0)
+            except grpc.RpcError as e:
+                codes.append(e.code())
+        try:
+            loop.run_until_complete(predict())
+        except grpc.RpcError as e:
+            codes.append(e.code())
+        finally:
+            loop.close()
+
+        # assert
+        self.assertTrue(codes == [grpc.StatusCode.DEADLINE_EXCEEDED] * 2)
+
+    def test10(self):
+        """testing that the batched predictions fail right away when the batch response is missing outputs"""
+        # arrange
+        target = self.start_server(ShortBatchServicerMock())
+        errors = []
+
+        # act
+        with ModelClient(target, default_timeout=5.0, batch_size=2, batch_wait_time=0.05) as client:
+            def predict(value):
+                try:
+                    client.predict("iris_model", iris_model_input(sepal_length=value))
+                except ValueError as e:
+                    errors.append(str(e))
+            threads = [threading.Thread(target=predict, args=(float(value),)) for value in range(2)]
+            start_time = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed_time = time.monotonic() - start_time
+
+        # assert
+        self.assertTrue(errors == ["The batch response has 1 outputs for 2 inputs."] * 2)
+        self.assertTrue(elapsed_time < 1.0)
+
+    def test11(self):
+        """testing that closing the asyncio client fails the predictions that wait in its batchers"""
+        # arrange
+        target = self.start_server(SlowServicerMock())
+        loop = asyncio.new_event_loop()
+
+        async def predict():
+            client = AsyncModelClient(target, default_timeout=5.0, batch_size=4, batch_wait_time=10.0)
+            prediction = asyncio.ensure_future(client.predict("iris_model", iris_model_input(sepal_length=4.0)))
+            await asyncio.sleep(0.05)
+            await client.close()
+            return await asyncio.gather(prediction, return_exceptions=True)
+
+        # act
+        try:
+            start_time = time.monotonic()
+            errors = loop.run_until_complete(predict())
+            elapsed_time = time.monotonic() - start_time
+        finally:
+            loop.close()
+
+        # assert
+        self.assertTrue([str(error) for error in errors] == ["The client is closed."] and elapsed_time < 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
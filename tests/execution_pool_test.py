@@ -0,0 +1,229 @@
+import os
+import ctypes
+import signal
+import time
+import unittest
+import threading
+import numpy as np
+import grpc
+
+from model_grpc_service.execution_pool import ExecutionPool
+from model_grpc_service.admission_control import AdmissionRejected
+
+
+# functions that are called in the workers of the pools, they are defined at the top level so that they can be pickled
+def predict(model, data):
+    return model.predict(data=data)
+
+
+def process_id(model):
+    return os.getpid()
+
+
+def crash(model):
+    os._exit(1)
+
+
+def hang(model):
+    time.sleep(30.0)
+
+
+def describe_array(model, array):
+    # the arrays that are passed in the shared buffer are views of the ctypes array of the buffer
+    base = array
+    while isinstance(base, np.ndarray):
+        base = base.base
+    return float(array.sum()), isinstance(base, ctypes.Array)
+
+
+class ExecutionPoolTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that a thread pool calls the function with the model and counts the calls"""
+        # arrange
+        pool = ExecutionPool("iris_model", {}, kind="thread", max_workers=2)
+
+        # act
+        results = [pool.call(lambda model, value: model + value, 1, value) for value in range(3)]
+        stats = pool.stats()
+        pool.shutdown()
+
+        # assert
+        self.assertTrue(results == [1, 2, 3])
+        self.assertTrue(stats == {"workers": 2, "active": 0, "queued": 0, "completed": 3, "rejected": 0,
+                                  "restarts": 0})
+
+    def test2(self):
+        """testing that a call is rejected when all of the workers are busy and the queue is full"""
+        # arrange
+        pool = ExecutionPool("iris_model", {}, kind="thread", max_workers=1, max_queue_size=1)
+        event = threading.Event()
+        threads = [threading.Thread(target=pool.call, args=(lambda model: event.wait(10.0), None)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while pool.stats()["queued"] < 1:
+            time.sleep(0.001)
+
+        # act
+        exception = None
+        try:
+            pool.call(lambda model: None, None)
+        except AdmissionRejected as e:
+            exception = e
+        stats = pool.stats()
+        event.set()
+        for thread in threads:
+            thread.join()
+        pool.shutdown()
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.RESOURCE_EXHAUSTED)
+        self.assertTrue(stats["active"] == 1 and stats["queued"] == 1 and stats["rejected"] == 1)
+
+    def test3(self):
+        """testing that a process pool makes predictions with a model that it creates from the configuration"""
+        # arrange
+        pool = ExecutionPool("iris_model", {"module_name": "tests.ml_model_grpc_endpoint_test",
+                                            "class_name": "IrisModelMock"}, kind="process", max_workers=1)
+
+        # act
+        prediction = pool.call(predict, None, {"sepal_length": 4.0})
+        pid = pool.call(process_id, None)
+        pool.shutdown()
+
+        # assert
+        self.assertTrue(prediction == {"species": "setosa"})
+        self.assertTrue(pid != os.getpid())
+
+    def test4(self):
+        """testing that an exception is raised when the type of the pool is not valid"""
+        # arrange, act
+        exception_raised = False
+        try:
+            ExecutionPool("iris_model", {}, kind="fiber")
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+
+    def test5(self):
+        """testing that a worker process that stops is restarted and the prediction fails with UNAVAILABLE"""
+        # arrange
+        pool = ExecutionPool("iris_model", {"module_name": "tests.ml_model_grpc_endpoint_test",
+                                            "class_name": "IrisModelMock"}, kind="process", max_workers=1)
+        first_pid = pool.call(process_id, None)
+
+        # act
+        exception = None
+        try:
+            pool.call(crash, None)
+        except AdmissionRejected as e:
+            exception = e
+        second_pid = pool.call(process_id, None)
+        stats = pool.stats()
+        pool.shutdown()
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.UNAVAILABLE)
+        self.assertTrue(first_pid != second_pid)
+        self.assertTrue(stats["restarts"] == 1)
+
+    def test6(self):
+        """testing that arrays that fit in the shared buffer are passed without pickling and larger ones are pickled"""
+        # arrange
+        pool = ExecutionPool("iris_model", {"module_name": "tests.ml_model_grpc_endpoint_test",
+                                            "class_name": "IrisModelMock"}, kind="process", max_workers=1,
+                             buffer_size=1024)
+
+        # act
+        small = pool.call(describe_array, None, np.ones((4, 4), dtype="<f4"))
+        large = pool.call(describe_array, None, np.ones((64, 4), dtype="<f8"))
+        pool.shutdown()
+
+        # assert
+        self.assertTrue(small == (16.0, True))
+        self.assertTrue(large == (256.0, False))
+
+    def test7(self):
+        """testing that a worker process that stops while it is idle is restarted before a prediction is sent to it"""
+        # arrange
+        pool = ExecutionPool("iris_model", {"module_name": "tests.ml_model_grpc_endpoint_test",
+                                            "class_name": "IrisModelMock"}, kind="process", max_workers=1)
+        first_pid = pool.call(process_id, None)
+        os.kill(first_pid, signal.SIGKILL)
+        pool._workers.queue[0].process.join(10.0)
+
+        # act
+        prediction = pool.call(predict, None, {"sepal_length": 4.0})
+        second_pid = pool.call(process_id, None)
+        stats = pool.stats()
+        pool.shutdown()
+
+        # assert
+        self.assertTrue(prediction == {"species": "setosa"})
+        self.assertTrue(first_pid != second_pid)
+        self.assertTrue(stats["restarts"] == 1)
+
+    def test8(self):
+        """testing that a process pool fails when it is created if its workers cannot create the model"""
+        # arrange, act
+        exception_message = None
+        try:
+            ExecutionPool("iris_model", {"module_name": "tests.ml_model_grpc_endpoint_test",
+                                         "class_name": "SomeClass"}, kind="process", max_workers=2)
+        except ValueError as e:
+            exception_message = str(e)
+
+        # assert
+        self.assertTrue(exception_message == "The ModelManager can only hold references to objects of type MLModel.")
+
+    def test9(self):
+        """testing that a worker process that does not return before the deadline is restarted"""
+        # arrange
+        pool = ExecutionPool("iris_model", {"module_name": "tests.ml_model_grpc_endpoint_test",
+                                            "class_name": "IrisModelMock"}, kind="process", max_workers=1)
+        first_pid = pool.call(process_id, None)
+
+        # act
+        exception = None
+        start_time = time.monotonic()
+        try:
+            pool.call(hang, None, timeout=0.2)
+        except AdmissionRejected as e:
+            exception = e
+        elapsed_time = time.monotonic() - start_time
+        second_pid = pool.call(process_id, None, timeout=30.0)
+        stats = pool.stats()
+        pool.shutdown()
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertTrue(elapsed_time < 5.0)
+        self.assertTrue(first_pid != second_pid)
+        self.assertTrue(stats["restarts"] == 1)
+
+    def test10(self):
+        """testing that a restarted worker process creates its model before it is given a prediction"""
+        # arrange
+        pool = ExecutionPool("iris_model", {"module_name": "tests.ml_model_grpc_endpoint_test",
+                                            "class_name": "IrisModelMock"}, kind="process", max_workers=1)
+
+        # act
+        try:
+            pool.call(crash, None)
+        except AdmissionRejected:
+            pass
+        timeout = time.monotonic() + 30.0
+        while pool._workers.qsize() == 0 and time.monotonic() < timeout:
+            time.sleep(0.01)
+        ready = pool._workers.queue[0]._ready
+        pool.shutdown()
+
+        # assert
+        # the new worker is only put back into the pool once the background thread has waited for its model
+        self.assertTrue(ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
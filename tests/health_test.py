@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+from concurrent import futures
+import grpc
+from grpc_health.v1 import health_pb2, health_pb2_grpc
+
+from model_grpc_service.service import ModelgRPCServiceServicer
+from model_grpc_service.health import AsyncHealthServicer, create_health_servicer, add_health_servicer_to_server, \
+    set_service_status, SERVICE_NAME, SERVING, NOT_SERVING
+from tests.ml_model_grpc_endpoint_test import IrisModelMock
+
+
+# creating a configuration with a model that is warmed up with synthetic inputs
+class ConfigMock(object):
+    model_loading = "sequential"
+    model_loading_workers = None
+    models = [{
+        "module_name": "tests.ml_model_grpc_endpoint_test",
+        "class_name": "IrisModelMock",
+        "warm_up": {"synthetic_inputs": 2}
+    }]
+
+
+# creating a second major version of the iris model
+class IrisModelMockV2(IrisModelMock):
+    major_version = 2
+
+
+# creating a context that raises an exception when the call is aborted
+class AbortingContextMock(object):
+
+    async def abort(self, code, details):
+        raise grpc.RpcError(code)
+
+
+class HealthTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the service and its models are reported as serving after they are warmed up"""
+        # arrange
+        servicer = ModelgRPCServiceServicer(configuration=ConfigMock)
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+        health_servicer = create_health_servicer()
+        add_health_servicer_to_server(health_servicer, server, servicer.model_names)
+        port = server.add_insecure_port("127.0.0.1:0")
+        server.start()
+
+        # act
+        try:
+            with grpc.insecure_channel("127.0.0.1:{}".format(port)) as channel:
+                stub = health_pb2_grpc.HealthStub(channel)
+                before = [stub.Check(health_pb2.HealthCheckRequest(service=service), timeout=10.0).status
+                          for service in ("", "iris_model")]
+                servicer.warm_up(health_servicer.set)
+                set_service_status(health_servicer, SERVING)
+                after = [stub.Check(health_pb2.HealthCheckRequest(service=service), timeout=10.0).status
+                         for service in ("", SERVICE_NAME, "iris_model")]
+        finally:
+            server.stop(0)
+
+        # assert
+        self.assertTrue(before == [NOT_SERVING, NOT_SERVING])
+        self.assertTrue(after == [SERVING, SERVING, SERVING])
+        # the two inputs were predicted on their own, in a batch and in a tensor
+        self.assertTrue(servicer.iris_model_predict._model.predict_calls == 6)
+
+    def test2(self):
+        """testing that the asyncio health servicer sends the changes of a status to the watchers"""
+        # arrange
+        loop = asyncio.new_event_loop()
+
+        async def watch():
+            health_servicer = AsyncHealthServicer()
+            health_servicer.set("iris_model", NOT_SERVING)
+            watcher = health_servicer.Watch(health_pb2.HealthCheckRequest(service="iris_model"), None)
+            statuses = [(await watcher.__anext__()).status]
+            health_servicer.set("iris_model", SERVING)
+            statuses.append((await watcher.__anext__()).status)
+            check = await health_servicer.Check(health_pb2.HealthCheckRequest(service="iris_model"), None)
+            not_found = False
+            try:
+                await health_servicer.Check(health_pb2.HealthCheckRequest(service="unknown"), AbortingContextMock())
+            except grpc.RpcError:
+                not_found = True
+            return statuses, check.status, not_found
+
+        # act
+        try:
+            statuses, status, not_found = loop.run_until_complete(watch())
+        finally:
+            loop.close()
+
+        # assert
+        self.assertTrue(statuses == [NOT_SERVING, SERVING])
+        self.assertTrue(status == SERVING)
+        self.assertTrue(not_found)
+
+    def test3(self):
+        """testing that a model whose configured warm up inputs fail is not reported as serving"""
+        # arrange
+        statuses = []
+        for warm_up in ({"synthetic_inputs": 2}, {"inputs": [{"sepal_length": 4.0}]}):
+            configuration = type("FailingConfigMock", (ConfigMock,), {"models": [
+                {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "FailingIrisModelMock",
+                 "warm_up": warm_up}]})
+            servicer = ModelgRPCServiceServicer(configuration=configuration)
+
+            # act
+            reported = []
+            servicer.warm_up(lambda qualified_name, status: reported.append((qualified_name, status)))
+            statuses.append(reported)
+
+        # assert
+        self.assertTrue(statuses == [[("iris_model", SERVING)], []])
+
+    def test4(self):
+        """testing that get_models() only lists the operations of the highest major version of a model"""
+        # arrange
+        configuration = type("VersionedConfigMock", (ConfigMock,), {"models": [
+            {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "IrisModelMock"},
+            {"module_name": "tests.health_test", "class_name": "IrisModelMockV2"}]})
+        servicer = ModelgRPCServiceServicer(configuration=configuration)
+
+        # act
+        response = servicer.get_models(None, None)
+
+        # assert
+        operations = {m.major_version: (m.input_type, m.predict_operation, m.batch_predict_operation)
+                      for m in response.models}
+        self.assertTrue(operations == {2: ("iris_model_input", "iris_model_predict", "iris_model_batch_predict"),
+                                       1: ("", "", "")})
+
+
+if __name__ == '__main__':
+    unittest.main()
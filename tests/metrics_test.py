@@ -0,0 +1,136 @@
+import json
+import marshal
+import unittest
+import urllib.error
+import urllib.request
+from model_grpc_service.metrics import MetricsRegistry, start_metrics_server
+from model_grpc_service.stage_profiler import StageProfiler
+from model_grpc_service import stage_profiler
+
+
+class MetricsTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the metrics are rendered in the Prometheus text format"""
+        # arrange
+        registry = MetricsRegistry()
+        counter = registry.counter("requests_total", "Number of requests.", ("model",))
+        gauge = registry.gauge("in_flight", "Requests in flight.")
+        histogram = registry.histogram("latency_seconds", "Latency.", ("model",), buckets=(0.1, 1.0))
+
+        # act
+        counter.labels("iris_model").inc()
+        counter.labels("iris_model").inc()
+        gauge.labels().inc()
+        histogram.labels("iris_model").observe(0.05)
+        histogram.labels("iris_model").observe(0.5)
+        histogram.labels("iris_model").observe(5.0)
+        text = registry.render()
+
+        # assert
+        self.assertTrue("# TYPE requests_total counter" in text)
+        self.assertTrue('requests_total{model="iris_model"} 2' in text)
+        self.assertTrue("in_flight 1" in text)
+        self.assertTrue('latency_seconds_bucket{model="iris_model",le="0.1"} 1' in text)
+        self.assertTrue('latency_seconds_bucket{model="iris_model",le="1"} 2' in text)
+        self.assertTrue('latency_seconds_bucket{model="iris_model",le="+Inf"} 3' in text)
+        self.assertTrue('latency_seconds_sum{model="iris_model"} 5.55' in text)
+        self.assertTrue('latency_seconds_count{model="iris_model"} 3' in text)
+
+    def test2(self):
+        """testing that a metric cannot be registered again with different labels"""
+        # arrange
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Number of requests.", ("model",))
+
+        # act
+        exception_raised = False
+        try:
+            registry.counter("requests_total", "Number of requests.", ("model", "rpc"))
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(registry.counter("requests_total", "Number of requests.", ("model",)) is not None)
+
+    def test3(self):
+        """testing that the metrics server serves the metrics"""
+        # arrange
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Number of requests.").labels().inc()
+        server = start_metrics_server(0, address="127.0.0.1", metrics_registry=registry)
+
+        # act
+        try:
+            url = "http://127.0.0.1:{}/metrics".format(server.server_address[1])
+            with urllib.request.urlopen(url, timeout=10.0) as response:
+                text = response.read().decode("utf-8")
+        finally:
+            server.shutdown()
+
+        # assert
+        self.assertTrue("requests_total 1" in text)
+
+    def test4(self):
+        """testing that the callbacks of the registry update the metrics before they are rendered"""
+        # arrange
+        registry = MetricsRegistry()
+        gauge = registry.gauge("memory_bytes", "Memory.")
+        registry.add_callback(lambda: gauge.labels().set(123))
+
+        # act
+        text = registry.render()
+
+        # assert
+        self.assertTrue("memory_bytes 123" in text)
+
+    def test5(self):
+        """testing that the metrics server serves the results of the stage profilers"""
+        # arrange
+        profiler = StageProfiler(sample_rate=1.0, profile_slowest=1)
+        profile = profiler.create_profile()
+        profile.enable()
+        sorted(range(100))
+        profile.disable()
+        profiler.record({"predict": 0.010, "total": 0.011}, profile)
+        stage_profiler.profilers["profiled_model"] = profiler
+        server = start_metrics_server(0, address="127.0.0.1", metrics_registry=MetricsRegistry())
+
+        # act
+        try:
+            url = "http://127.0.0.1:{}/profile".format(server.server_address[1])
+            with urllib.request.urlopen(url, timeout=10.0) as response:
+                profiles = json.loads(response.read().decode("utf-8"))
+            with urllib.request.urlopen(url + "/profiled_model/0", timeout=10.0) as response:
+                profile_stats = marshal.loads(response.read())
+            missing_status = None
+            try:
+                urllib.request.urlopen(url + "/profiled_model/1", timeout=10.0)
+            except urllib.error.HTTPError as e:
+                missing_status = e.code
+        finally:
+            server.shutdown()
+            del stage_profiler.profilers["profiled_model"]
+
+        # assert
+        self.assertTrue(profiles["profiled_model"]["stages"]["predict"]["count"] == 1)
+        self.assertTrue(profiles["profiled_model"]["slowest_profiles"] == [0.011])
+        self.assertTrue(any(function[2] == "<built-in method builtins.sorted>" for function in profile_stats))
+        self.assertTrue(missing_status == 404)
+
+    def test6(self):
+        """testing that the metrics server only listens on the loopback interface by default"""
+        # arrange, act
+        server = start_metrics_server(0, metrics_registry=MetricsRegistry())
+        try:
+            address = server.server_address[0]
+        finally:
+            server.shutdown()
+
+        # assert
+        self.assertTrue(address in ("127.0.0.1", "::1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+import threading
+import grpc
+from model_grpc_service.micro_batcher import MicroBatcher
+from model_grpc_service.admission_control import AdmissionRejected
+
+
+class MicroBatcherTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that concurrent predictions are made in batches and each caller gets its own result"""
+        # arrange
+        batch_sizes = []
+
+        def predict_batch(data):
+            batch_sizes.append(len(data))
+            return [{"prediction": item["value"] * 2} for item in data]
+
+        batcher = MicroBatcher(predict_batch=predict_batch, max_batch_size=8, max_wait_time=0.5)
+        results = {}
+
+        def make_prediction(value):
+            results[value] = batcher.predict({"value": value})
+
+        threads = [threading.Thread(target=make_prediction, args=(value,)) for value in range(8)]
+
+        # act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+
+        # assert
+        self.assertTrue(results == {value: {"prediction": value * 2} for value in range(8)})
+        self.assertTrue(sum(batch_sizes) == 8)
+        self.assertTrue(len(batch_sizes) < 8)
+
+    def test2(self):
+        """testing that an input that fails does not fail the other inputs in the batch"""
+        # arrange
+        def predict_batch(data):
+            if any(item["value"] < 0 for item in data):
+                raise ValueError("Negative value.")
+            return [{"prediction": item["value"]} for item in data]
+
+        batcher = MicroBatcher(predict_batch=predict_batch, max_batch_size=2, max_wait_time=0.5)
+        results = {}
+
+        def make_prediction(value):
+            try:
+                results[value] = batcher.predict({"value": value})
+            except Exception as e:
+                results[value] = str(e)
+
+        threads = [threading.Thread(target=make_prediction, args=(value,)) for value in (-1, 1)]
+
+        # act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+
+        # assert
+        self.assertTrue(results == {-1: "Negative value.", 1: {"prediction": 1}})
+
+    def test3(self):
+        """testing that a single prediction is made after the max wait time when the batch is not full"""
+        # arrange
+        batcher = MicroBatcher(predict_batch=lambda data: [{"prediction": 1} for _ in data],
+                               max_batch_size=100, max_wait_time=0.01)
+
+        # act
+        result = batcher.predict({"value": 1})
+        batcher.close()
+
+        # assert
+        self.assertTrue(result == {"prediction": 1})
+
+    def test4(self):
+        """testing that a batch that is rejected fails all of its inputs without retrying them one at a time"""
+        # arrange
+        batch_sizes = []
+
+        def predict_batch(data):
+            batch_sizes.append(len(data))
+            raise AdmissionRejected(grpc.StatusCode.RESOURCE_EXHAUSTED, "The execution pool is full.")
+
+        batcher = MicroBatcher(predict_batch=predict_batch, max_batch_size=2, max_wait_time=0.5)
+        results = {}
+
+        def make_prediction(value):
+            try:
+                results[value] = batcher.predict({"value": value})
+            except AdmissionRejected as e:
+                results[value] = e.code
+
+        threads = [threading.Thread(target=make_prediction, args=(value,)) for value in (1, 2)]
+
+        # act
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+
+        # assert
+        self.assertTrue(results == {1: grpc.StatusCode.RESOURCE_EXHAUSTED, 2: grpc.StatusCode.RESOURCE_EXHAUSTED})
+        self.assertTrue(batch_sizes == [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,15 @@
+import time
 import unittest
+import threading
+import numpy as np
+import grpc
+from schema import Schema
 from ml_model_abc import MLModel
+from model_service_pb2 import iris_model_input, iris_model_batch_input, iris_model_tensor_input
 from model_grpc_service.model_manager import ModelManager
 from model_grpc_service.ml_model_grpc_endpoint import MLModelgRPCEndpoint
+from model_grpc_service import metrics
+from model_grpc_service.admission_control import AdmissionRejected
 
 
 # creating an MLModel class to test with
@@ -22,6 +30,98 @@ class MLModelMock(MLModel):
         return {"prediction": 123}
 
 
+# creating an MLModel class that uses the iris_model protocol buffers to test with
+class IrisModelMock(MLModel):
+    display_name = "display name"
+    qualified_name = "iris_model"
+    description = "description"
+    major_version = 1
+    minor_version = 1
+    input_schema = None
+    output_schema = None
+
+    def __init__(self):
+        self.predict_calls = 0
+
+    def predict(self, data):
+        self.predict_calls += 1
+        return {"species": "setosa" if data["sepal_length"] < 5.0 else "virginica"}
+
+
+# creating an MLModel class that can make predictions for a batch of inputs in one call
+class BatchIrisModelMock(IrisModelMock):
+
+    def __init__(self):
+        super().__init__()
+        self.predict_batch_calls = 0
+
+    def predict_batch(self, data):
+        self.predict_batch_calls += 1
+        return [{"species": "setosa" if item["sepal_length"] < 5.0 else "virginica"} for item in data]
+
+
+# creating an MLModel class that can make predictions for a NumPy array of inputs
+class ArrayIrisModelMock(IrisModelMock):
+
+    def __init__(self):
+        super().__init__()
+        self.arrays = []
+
+    def predict_array(self, array):
+        self.arrays.append(array)
+        return [{"species": "setosa" if sepal_length < 5.0 else "virginica"} for sepal_length in array[:, 0]]
+
+
+# creating an MLModel class that declares that it always makes the same prediction for the same input
+class DeterministicIrisModelMock(IrisModelMock):
+    deterministic = True
+
+
+# creating an MLModel class that holds its predictions until its gate is opened
+class GatedIrisModelMock(DeterministicIrisModelMock):
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    def predict(self, data):
+        self.gate.wait(10.0)
+        return super().predict(data)
+
+
+# creating an MLModel class with schemas that match the iris_model protocol buffers
+class SchemaIrisModelMock(IrisModelMock):
+    input_schema = Schema({"sepal_length": float, "sepal_width": float, "petal_length": float, "petal_width": float})
+    output_schema = Schema({"species": str})
+
+
+# creating an MLModel class with an input schema that does not match the iris_model protocol buffers
+class MismatchedIrisModelMock(IrisModelMock):
+    input_schema = Schema({"sepal_length": float, "sepal_width": float, "petal_length": float, "color": str})
+    output_schema = Schema({"species": str})
+
+
+# creating an MLModel class that fails to make any prediction
+class FailingIrisModelMock(IrisModelMock):
+
+    def predict(self, data):
+        raise ValueError("The input is not valid.")
+
+
+# creating a gRPC context to test with
+class ServicerContextMock(object):
+
+    def __init__(self, time_remaining=None, metadata=()):
+        self._time_remaining = time_remaining
+        self._metadata = metadata
+
+    def time_remaining(self):
+        return self._time_remaining
+
+    def invocation_metadata(self):
+        return self._metadata
+
+
 # creating a mockup class to test with
 class SomeClass(object):
     pass
@@ -36,15 +136,15 @@ class MLModelgRPCEndpointTests(unittest.TestCase):
         model_manager = ModelManager()
         # loading the MLModel objects from configuration
         model_manager.load_models(configuration=[{
-            "module_name": "tests.model_manager_test",
-            "class_name": "MLModelMock"
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "SchemaIrisModelMock"
         }])
 
         # act
-        endpoint = MLModelgRPCEndpoint(model_qualified_name="qualified_name")
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
 
         # assert
-        self.assertTrue(str(type(endpoint._model)) == "<class 'tests.model_manager_test.MLModelMock'>")
+        self.assertTrue(str(type(endpoint._model)) == "<class 'tests.ml_model_grpc_endpoint_test.SchemaIrisModelMock'>")
 
     def test2(self):
         """testing the __init__() method with missing model"""
@@ -71,6 +171,640 @@ class MLModelgRPCEndpointTests(unittest.TestCase):
         self.assertTrue(exception_raised)
         self.assertTrue(exception_message == "'asdf' not found in ModelManager instance.")
 
+    def test3(self):
+        """testing the batch_predict() method with a model that implements predict_batch()"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "BatchIrisModelMock"
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_batch_input(inputs=[
+            iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0),
+            iris_model_input(sepal_length=6.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)])
+
+        # act
+        response = endpoint.batch_predict(request, None)
+
+        # assert
+        self.assertTrue([output.species for output in response.outputs] == ["setosa", "virginica"])
+        self.assertTrue(endpoint._model.predict_batch_calls == 1)
+        self.assertTrue(endpoint._model.predict_calls == 0)
+
+    def test4(self):
+        """testing the batch_predict() method with a model that can only make one prediction at a time"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock"
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_batch_input(inputs=[
+            iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0),
+            iris_model_input(sepal_length=6.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0),
+            iris_model_input(sepal_length=3.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)])
+
+        # act
+        response = endpoint.batch_predict(request, None)
+
+        # assert
+        self.assertTrue([output.species for output in response.outputs] == ["setosa", "virginica", "setosa"])
+        self.assertTrue(endpoint._model.predict_calls == 3)
+
+    def test5(self):
+        """testing the __call__() method with batching turned on in the model's configuration"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "BatchIrisModelMock",
+            "batching": {"max_batch_size": 4, "max_wait_time": 0.001}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+
+        # act
+        response = endpoint(iris_model_input(sepal_length=6.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0),
+                            None)
+
+        # assert
+        self.assertTrue(response.species == "virginica")
+        self.assertTrue(endpoint._model.predict_batch_calls == 1)
+        self.assertTrue(endpoint._model.predict_calls == 0)
+
+    def test6(self):
+        """testing the stream_predict() method"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "BatchIrisModelMock",
+            "streaming": {"max_batch_size": 10}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        requests = [iris_model_input(sepal_length=float(value), sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+                    for value in range(1, 26)]
+
+        # act
+        responses = list(endpoint.stream_predict(iter(requests), None))
+
+        # assert
+        self.assertTrue([response.species for response in responses] ==
+                        ["setosa" if value < 5 else "virginica" for value in range(1, 26)])
+        self.assertTrue(endpoint._model.predict_batch_calls >= 3)
+        self.assertTrue(endpoint._model.predict_calls == 0)
+
+    def test7(self):
+        """testing that the __call__() method passes fields that hold default values to the model"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock"
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+
+        # act
+        response = endpoint(iris_model_input(sepal_length=0.0, sepal_width=0.0, petal_length=0.0, petal_width=0.0),
+                            None)
+
+        # assert
+        self.assertTrue(response.species == "setosa")
+
+    def test8(self):
+        """testing the __init__() method with a model that has no generated protocol buffers"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.model_manager_test",
+            "class_name": "MLModelMock"
+        }])
+
+        # act
+        exception_raised = False
+        exception_message = None
+        try:
+            endpoint = MLModelgRPCEndpoint(model_qualified_name="qualified_name")
+        except Exception as e:
+            exception_message = str(e)
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(exception_message == "Protocol buffer 'qualified_name_input' not found in model_service_pb2.")
+
+    def test9(self):
+        """testing the __init__() method with a model schema that does not match the protocol buffers"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "MismatchedIrisModelMock"
+        }])
+
+        # act
+        exception_raised = False
+        exception_message = None
+        try:
+            endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        except Exception as e:
+            exception_message = str(e)
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(exception_message == "Protocol buffer 'iris_model_input' is missing the fields: color.")
+
+    def test10(self):
+        """testing that repeated requests are answered from the cache"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "DeterministicIrisModelMock",
+            "cache": {"enabled": True, "max_size": 10}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        first_request = iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+        second_request = iris_model_input(sepal_length=6.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+
+        # act
+        first_response = endpoint(first_request, None)
+        second_response = endpoint(first_request, None)
+        batch_response = endpoint.batch_predict(iris_model_batch_input(inputs=[first_request, second_request]), None)
+
+        # assert
+        self.assertTrue(first_response.species == "setosa" and second_response.species == "setosa")
+        self.assertTrue([output.species for output in batch_response.outputs] == ["setosa", "virginica"])
+        self.assertTrue(endpoint._model.predict_calls == 2)
+        self.assertTrue(endpoint.cache.stats() == {"size": 2, "hits": 2, "misses": 2, "evictions": 0})
+
+    def test11(self):
+        """testing that caching cannot be turned on for a model that is not deterministic"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock",
+            "cache": {"enabled": True}
+        }])
+
+        # act
+        exception_raised = False
+        exception_message = None
+        try:
+            endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        except Exception as e:
+            exception_message = str(e)
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(exception_message ==
+                        "Model 'iris_model' must declare that it is deterministic to cache its predictions.")
+
+    def test12(self):
+        """testing that the endpoint uses the new model after the models are reloaded"""
+        # arrange
+        model_manager = ModelManager()
+        configuration = [{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "DeterministicIrisModelMock",
+            "cache": {"enabled": True}
+        }]
+        model_manager.load_models(configuration=configuration)
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+        endpoint(request, None)
+        old_model = endpoint._model
+
+        # act
+        model_manager.reload_models(configuration=configuration)
+        endpoint.clear_cache()
+        response = endpoint(request, None)
+
+        # assert
+        self.assertTrue(response.species == "setosa")
+        self.assertTrue(endpoint._model is not old_model)
+        self.assertTrue(old_model.predict_calls == 1)
+        self.assertTrue(endpoint._model.predict_calls == 1)
+
+    def test13(self):
+        """testing that the endpoint records the metrics of its requests"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock"
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request_metrics = endpoint.request_metrics["predict"]
+        requests_before = request_metrics._requests.value
+        latency_count_before = request_metrics._latency.count
+        predict_count_before = endpoint._predict_latency.count
+
+        # act
+        endpoint(iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0), None)
+
+        # assert
+        self.assertTrue(request_metrics._requests.value == requests_before + 1)
+        self.assertTrue(request_metrics._latency.count == latency_count_before + 1)
+        self.assertTrue(request_metrics._in_flight.value == 0)
+        self.assertTrue(endpoint._predict_latency.count == predict_count_before + 1)
+        self.assertTrue('model_requests_total{model="iris_model",rpc="predict"}' in metrics.registry.render())
+
+    def test14(self):
+        """testing that the endpoint times the stages of the sampled predictions when profiling is turned on"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "SchemaIrisModelMock",
+            "profiling": {"enabled": True, "sample_rate": 1.0, "profile_slowest": 1}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        latency_count_before = endpoint._predict_latency.count
+
+        # act
+        response = endpoint(iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0),
+                            None)
+        stats = endpoint.profiler.stats()
+
+        # assert
+        self.assertTrue(response.species == "setosa")
+        self.assertTrue(list(stats.keys()) == ["deserialize", "to_dict", "validate", "predict", "from_dict",
+                                               "serialize", "total"])
+        self.assertTrue(all(stage["count"] == 1 for stage in stats.values()))
+        self.assertTrue(len(endpoint.profiler.slowest_profiles()) == 1)
+        # the sampled prediction is recorded in the predict latency histogram as well
+        self.assertTrue(endpoint._predict_latency.count == latency_count_before + 1)
+
+    def test15(self):
+        """testing that tensor_predict() makes a prediction for each row of the tensor input"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock"
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        rows = np.array([[4.0, 1.0, 1.0, 1.0], [6.0, 1.0, 1.0, 1.0], [0.0, 0.0, 0.0, 0.0]], dtype="<f4")
+
+        # act
+        response = endpoint.tensor_predict(iris_model_tensor_input(values=rows.tobytes(), shape=rows.shape), None)
+
+        # assert
+        self.assertTrue(endpoint.tensor_input_enabled)
+        self.assertTrue([output.species for output in response.outputs] == ["setosa", "virginica", "setosa"])
+
+    def test16(self):
+        """testing that tensor_predict() passes the array to the predict_array() method of the model"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "ArrayIrisModelMock"
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        rows = np.array([[4.0, 1.0, 1.0, 1.0], [6.0, 1.0, 1.0, 1.0]], dtype="<f4")
+
+        # act
+        response = endpoint.tensor_predict(iris_model_tensor_input(values=rows.tobytes(), shape=rows.shape), None)
+
+        # assert
+        self.assertTrue([output.species for output in response.outputs] == ["setosa", "virginica"])
+        self.assertTrue(len(endpoint._model.arrays) == 1)
+        self.assertTrue(np.array_equal(endpoint._model.arrays[0], rows))
+        self.assertTrue(endpoint._model.predict_calls == 0)
+
+    def test17(self):
+        """testing that tensor_predict() raises an exception when the shape does not match the values"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock"
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        rows = np.zeros((2, 4), dtype="<f4")
+
+        # act
+        exceptions_raised = 0
+        for shape in ([2, 3], [3, 4], [8]):
+            try:
+                endpoint.tensor_predict(iris_model_tensor_input(values=rows.tobytes(), shape=shape), None)
+            except ValueError:
+                exceptions_raised += 1
+
+        # assert
+        self.assertTrue(exceptions_raised == 3)
+
+    def test18(self):
+        """testing that the endpoint rejects requests whose deadline has passed without making predictions"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock",
+            "admission": {"max_concurrency": 1, "max_queue_size": 1, "priorities": {"high": 0, "low": 1}}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+
+        # act
+        exception = None
+        try:
+            endpoint(request, ServicerContextMock(time_remaining=0.0))
+        except AdmissionRejected as e:
+            exception = e
+        response = endpoint(request, ServicerContextMock(time_remaining=10.0, metadata=(("priority", "high"),)))
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertTrue(response.species == "setosa")
+        self.assertTrue(endpoint._model.predict_calls == 1)
+        self.assertTrue(endpoint.admission_controller.stats()["running"] == 0)
+
+    def test19(self):
+        """testing that the endpoint makes its predictions in the execution pool of the model"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "BatchIrisModelMock",
+            "executor": {"type": "thread", "max_workers": 2}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+
+        # act
+        response = endpoint(request, None)
+        batch_response = endpoint.batch_predict(iris_model_batch_input(inputs=[request, request]), None)
+        stats = endpoint.pool.stats()
+        endpoint.pool.shutdown()
+
+        # assert
+        self.assertTrue(response.species == "setosa")
+        self.assertTrue([output.species for output in batch_response.outputs] == ["setosa", "setosa"])
+        self.assertTrue(endpoint._model.predict_calls == 1 and endpoint._model.predict_batch_calls == 1)
+        self.assertTrue(stats["completed"] == 2)
+
+    def test20(self):
+        """testing that the endpoint makes its predictions in the processes of a process pool"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "IrisModelMock",
+            "executor": {"type": "process", "max_workers": 1}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_input(sepal_length=6.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+
+        # act
+        response = endpoint(request, None)
+        endpoint.pool.shutdown()
+
+        # assert
+        self.assertTrue(endpoint.pool.kind == "process")
+        self.assertTrue(response.species == "virginica")
+        # the prediction was made by the model object of the worker process
+        self.assertTrue(endpoint._model.predict_calls == 0)
+
+    def test21(self):
+        """testing that warm_up() makes predictions with synthetic inputs and leaves the cache empty"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "DeterministicIrisModelMock",
+            "cache": {"enabled": True},
+            "warm_up": {"synthetic_inputs": 4}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+
+        # act
+        input_count = endpoint.warm_up()
+
+        # assert
+        self.assertTrue(input_count == 4)
+        # each input was predicted on its own, in a batch and in a tensor
+        self.assertTrue(endpoint._model.predict_calls == 12)
+        self.assertTrue(len(endpoint.cache) == 0)
+
+    def test22(self):
+        """testing that concurrent identical requests to an endpoint with coalescing cause one prediction"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "GatedIrisModelMock",
+            "coalescing": {"enabled": True}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        responses = []
+
+        def predict():
+            # the requests are created in different orders, their serialized bytes are the same
+            responses.append(endpoint(iris_model_input(petal_width=1.0, sepal_length=4.0), None).species)
+
+        # act
+        threads = [threading.Thread(target=predict) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        while endpoint.single_flight.calls < 4:
+            time.sleep(0.01)
+        endpoint._model.gate.set()
+        for thread in threads:
+            thread.join()
+
+        # assert
+        self.assertTrue(responses == ["setosa"] * 4)
+        self.assertTrue(endpoint._model.predict_calls == 1)
+        self.assertTrue(endpoint.single_flight.stats()["shared"] == 3)
+
+    def test23(self):
+        """testing that a coalesced prediction made by a model that was replaced by a reload is not cached"""
+        # arrange
+        model_manager = ModelManager()
+        configuration = [{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "GatedIrisModelMock",
+            "cache": {"enabled": True},
+            "coalescing": {"enabled": True}
+        }]
+        model_manager.load_models(configuration=configuration)
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        old_model = endpoint._model
+        request = iris_model_input(sepal_length=4.0)
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(endpoint(request, None).species))
+                   for _ in range(2)]
+
+        # act
+        for thread in threads:
+            thread.start()
+        while endpoint.single_flight.calls < 2:
+            time.sleep(0.01)
+        model_manager.reload_models(configuration=configuration)
+        old_model.gate.set()
+        for thread in threads:
+            thread.join()
+        cache_size = len(endpoint.cache)
+        endpoint._model.gate.set()
+        response = endpoint(request, None)
+
+        # assert
+        self.assertTrue(responses == ["setosa"] * 2 and response.species == "setosa")
+        self.assertTrue(cache_size == 0 and len(endpoint.cache) == 1)
+        self.assertTrue(old_model.predict_calls == 1 and endpoint._model.predict_calls == 1)
+
+    def test24(self):
+        """testing that the queue of an execution pool holds max_workers predictions when its size is not configured"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "GatedIrisModelMock",
+            "executor": {"type": "thread", "max_workers": 1}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_input(sepal_length=4.0)
+        threads = [threading.Thread(target=endpoint, args=(request, None)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while endpoint.pool.stats()["queued"] < 1:
+            time.sleep(0.01)
+
+        # act
+        exception = None
+        try:
+            endpoint(request, None)
+        except AdmissionRejected as e:
+            exception = e
+        endpoint._model.gate.set()
+        for thread in threads:
+            thread.join()
+        endpoint.pool.shutdown()
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.RESOURCE_EXHAUSTED)
+        self.assertTrue(endpoint._model.predict_calls == 2)
+
+    def test25(self):
+        """testing that the requests without a deadline are queued by the admission controller of the endpoint"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "GatedIrisModelMock",
+            "admission": {"max_concurrency": 1, "max_queue_size": 1}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        request = iris_model_input(sepal_length=4.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0)
+        responses = []
+
+        def predict():
+            # the sync server gives the calls without a deadline this time remaining
+            responses.append(endpoint(request, ServicerContextMock(time_remaining=9.2e18)))
+
+        # act
+        threads = [threading.Thread(target=predict) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while endpoint.admission_controller.stats()["queued"] < 1:
+            time.sleep(0.001)
+        endpoint._model.gate.set()
+        for thread in threads:
+            thread.join(10.0)
+
+        # assert
+        self.assertTrue(len(responses) == 2 and all(response.species == "setosa" for response in responses))
+        self.assertTrue(endpoint.admission_controller.stats()["running"] == 0)
+
+    def test26(self):
+        """testing that warm_up() logs the failures of generated inputs and raises the failures of configured inputs"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "FailingIrisModelMock",
+            "warm_up": {"synthetic_inputs": 2}
+        }])
+        synthetic_endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "FailingIrisModelMock",
+            "warm_up": {"inputs": [{"sepal_length": 4.0}]}
+        }])
+        configured_endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+
+        # act
+        input_count = synthetic_endpoint.warm_up()
+        exception_raised = False
+        try:
+            configured_endpoint.warm_up()
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(input_count == 0 and exception_raised)
+
+    def test27(self):
+        """testing that warm_up() is not counted in the metrics and is not sampled by the profiler of the endpoint"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "DeterministicIrisModelMock",
+            "profiling": {"enabled": True, "sample_rate": 1.0},
+            "admission": {"max_concurrency": 1, "max_queue_size": 1},
+            "warm_up": {"synthetic_inputs": 2}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+        requests_before = {rpc: request_metrics._requests.value
+                           for rpc, request_metrics in endpoint.request_metrics.items()}
+        latency_count_before = endpoint._predict_latency.count
+
+        # act
+        input_count = endpoint.warm_up()
+
+        # assert
+        self.assertTrue(input_count == 2)
+        self.assertTrue(endpoint._model.predict_calls == 6)
+        self.assertTrue(all(request_metrics._requests.value == requests_before[rpc]
+                            for rpc, request_metrics in endpoint.request_metrics.items()))
+        self.assertTrue(endpoint._predict_latency.count == latency_count_before)
+        self.assertTrue(endpoint.profiler.stats() == {})
+        self.assertTrue(endpoint.admission_controller.stats()["admitted"] == 0)
+
+    def test28(self):
+        """testing that a prediction in a process pool fails with DEADLINE_EXCEEDED when the model does not return"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{
+            "module_name": "tests.ml_model_grpc_endpoint_test",
+            "class_name": "GatedIrisModelMock",
+            "executor": {"type": "process", "max_workers": 1}
+        }])
+        endpoint = MLModelgRPCEndpoint(model_qualified_name="iris_model")
+
+        # act
+        # the gate of the model in the worker process is never opened, so the prediction waits for 10 seconds
+        exception = None
+        start_time = time.monotonic()
+        try:
+            endpoint(iris_model_input(sepal_length=4.0), ServicerContextMock(time_remaining=0.2))
+        except AdmissionRejected as e:
+            exception = e
+        elapsed_time = time.monotonic() - start_time
+        endpoint.pool.shutdown(wait=False)
+
+        # assert
+        self.assertTrue(exception is not None and exception.code == grpc.StatusCode.DEADLINE_EXCEEDED)
+        self.assertTrue(elapsed_time < 5.0)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
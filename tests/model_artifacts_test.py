@@ -0,0 +1,152 @@
+import os
+import stat
+import pickle
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from ml_model_abc import MLModel
+
+from model_grpc_service.model_artifacts import load_artifact
+from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.execution_pool import ExecutionPool, predict
+from model_grpc_service.process_memory import memory_usage, update_memory_metrics
+from model_grpc_service import metrics
+
+
+# creating an MLModel class that receives its weights as an artifact
+class ArtifactModelMock(MLModel):
+    display_name = "display name"
+    qualified_name = "artifact_model"
+    description = "description"
+    major_version = 1
+    minor_version = 1
+    input_schema = None
+    output_schema = None
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, data):
+        return {"memory_mapped": isinstance(self.weights, np.memmap), "total": float(self.weights.sum())}
+
+
+class ModelArtifactsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test1(self):
+        """testing that the arrays in an artifact are loaded memory-mapped and read-only"""
+        # arrange
+        path = os.path.join(self.directory, "model.pickle")
+        with open(path, "wb") as f:
+            pickle.dump({"weights": np.arange(1000, dtype=np.float64), "name": "model"}, f)
+        cache_directory = os.path.join(self.directory, "cache")
+
+        # act
+        artifact = load_artifact(path, cache_directory=cache_directory)
+
+        # assert
+        self.assertTrue(artifact["name"] == "model")
+        self.assertTrue(isinstance(artifact["weights"], np.memmap))
+        self.assertTrue(not artifact["weights"].flags.writeable)
+        self.assertTrue(np.array_equal(artifact["weights"], np.arange(1000, dtype=np.float64)))
+
+    def test2(self):
+        """testing that the copy of an artifact is reused, and created again when the artifact changes"""
+        # arrange
+        path = os.path.join(self.directory, "model.pickle")
+        with open(path, "wb") as f:
+            pickle.dump(np.zeros(10), f)
+        cache_directory = os.path.join(self.directory, "cache")
+        load_artifact(path, cache_directory=cache_directory)
+        first_copies = os.listdir(cache_directory)
+
+        # act
+        load_artifact(path, cache_directory=cache_directory)
+        second_copies = os.listdir(cache_directory)
+        with open(path, "wb") as f:
+            pickle.dump(np.ones(20), f)
+        os.utime(path, ns=(0, 0))
+        artifact = load_artifact(path, cache_directory=cache_directory)
+
+        # assert
+        self.assertTrue(len(first_copies) == 1 and second_copies == first_copies)
+        self.assertTrue(len(os.listdir(cache_directory)) == 2)
+        self.assertTrue(np.array_equal(artifact, np.ones(20)))
+
+    def test3(self):
+        """testing that the memory used by the process is reported in the metrics"""
+        # arrange, act
+        usage = memory_usage()
+        update_memory_metrics()
+        text = metrics.registry.render()
+
+        # assert
+        if usage is not None:
+            self.assertTrue(usage["rss"] > 0 and usage["rss"] == usage["shared"] + usage["private"])
+            self.assertTrue('process_memory_bytes{type="pss"}' in text)
+
+    def test4(self):
+        """testing that the default cache is private and in the user's cache, and shared directories are refused"""
+        # arrange
+        path = os.path.join(self.directory, "model.pickle")
+        with open(path, "wb") as f:
+            pickle.dump(np.zeros(10), f)
+        shared_directory = os.path.join(self.directory, "shared")
+        os.mkdir(shared_directory)
+        os.chmod(shared_directory, 0o777)
+        cache_home = os.environ.get("XDG_CACHE_HOME")
+        os.environ["XDG_CACHE_HOME"] = os.path.join(self.directory, "cache_home")
+
+        # act
+        try:
+            artifact = load_artifact(path)
+        finally:
+            if cache_home is None:
+                del os.environ["XDG_CACHE_HOME"]
+            else:
+                os.environ["XDG_CACHE_HOME"] = cache_home
+        default_directory = os.path.join(self.directory, "cache_home", "model_grpc_service", "artifacts")
+        default_directory_mode = stat.S_IMODE(os.stat(default_directory).st_mode)
+        exception_raised = False
+        try:
+            load_artifact(path, cache_directory=shared_directory)
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(np.array_equal(artifact, np.zeros(10)) and len(os.listdir(default_directory)) == 1)
+        self.assertTrue(default_directory_mode & 0o077 == 0)
+        self.assertTrue(exception_raised and os.listdir(shared_directory) == [])
+
+    def test5(self):
+        """testing that the artifacts of a model's configuration are memory-mapped, also in a process pool"""
+        # arrange
+        path = os.path.join(self.directory, "weights.pickle")
+        with open(path, "wb") as f:
+            pickle.dump(np.arange(10, dtype=np.float64), f)
+        configuration = {"module_name": "tests.model_artifacts_test", "class_name": "ArtifactModelMock",
+                         "artifacts": {"files": {"weights": path},
+                                       "cache_directory": os.path.join(self.directory, "cache")}}
+
+        # act
+        ModelManager().load_models(configuration=[configuration])
+        prediction = ModelManager.get_model("artifact_model").predict(data={})
+        pool = ExecutionPool("artifact_model", configuration, kind="process", max_workers=1)
+        try:
+            pool_prediction = pool.call(predict, None, {})
+        finally:
+            pool.shutdown()
+
+        # assert
+        self.assertTrue(prediction == {"memory_mapped": True, "total": 45.0})
+        self.assertTrue(pool_prediction == prediction)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,6 +22,39 @@ class MLModelMock(MLModel):
         pass
 
 
+# creating a second major version of the MLModel class to test with
+class MLModelMockV2(MLModelMock):
+    major_version = 2
+
+
+# creating an MLModel class that counts the number of times it is instantiated
+class CountingMLModelMock(MLModelMock):
+    qualified_name = "counting_qualified_name"
+    instances = 0
+
+    def __init__(self):
+        CountingMLModelMock.instances += 1
+
+
+# creating an MLModel class that records the inputs it makes predictions with
+class RecordingMLModelMock(MLModelMock):
+    qualified_name = "recording_qualified_name"
+
+    def __init__(self):
+        self.inputs = []
+
+    def predict(self, data):
+        self.inputs.append(data)
+        return {"prediction": 1}
+
+
+# creating an MLModel class that fails to make predictions
+class FailingMLModelMock(MLModelMock):
+
+    def predict(self, data):
+        raise ValueError("Prediction failed.")
+
+
 # creating a mockup class to test with
 class SomeClass(object):
     pass
@@ -127,6 +160,239 @@ class ModelManagerTests(unittest.TestCase):
         self.assertFalse(exception_raised)
         self.assertTrue(model is None)
 
+    def test5(self):
+        """testing that several major versions of a model can be loaded side by side"""
+        # arrange
+        model_manager = ModelManager()
+
+        # act
+        model_manager.load_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "MLModelMockV2"
+            },
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "MLModelMock"
+            }
+        ])
+
+        # assert
+        self.assertTrue(type(model_manager.get_model(qualified_name="qualified_name")) is MLModelMockV2)
+        self.assertTrue(type(model_manager.get_model(qualified_name="qualified_name", major_version=1)) is MLModelMock)
+        self.assertTrue(type(model_manager.get_model(qualified_name="qualified_name", major_version=2))
+                        is MLModelMockV2)
+        self.assertTrue(model_manager.get_model(qualified_name="qualified_name", major_version=3) is None)
+        self.assertTrue([model["major_version"] for model in model_manager.get_models()] == [2, 1])
+        self.assertTrue(model_manager.get_model_metadata(qualified_name="qualified_name")["major_version"] == 2)
+
+    def test6(self):
+        """testing that the ModelManager raises an exception when the same version of a model is loaded twice"""
+        # arrange
+        model_manager = ModelManager()
+
+        # act
+        exception_raised = False
+        exception_message = ""
+        try:
+            model_manager.load_models(configuration=[
+                {
+                    "module_name": "tests.model_manager_test",
+                    "class_name": "MLModelMock"
+                },
+                {
+                    "module_name": "tests.model_manager_test",
+                    "class_name": "MLModelMock"
+                }
+            ])
+        except Exception as e:
+            exception_raised = True
+            exception_message = str(e)
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(exception_message == "Version 1 of model 'qualified_name' is already loaded.")
+
+    def test7(self):
+        """testing that the model metadata is computed once and cannot be modified"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "MLModelMock"
+            }
+        ])
+
+        # act
+        first_metadata = model_manager.get_model_metadata(qualified_name="qualified_name")
+        second_metadata = model_manager.get_model_metadata(qualified_name="qualified_name")
+        exception_raised = False
+        try:
+            first_metadata["display_name"] = "asdf"
+        except TypeError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(first_metadata is second_metadata)
+        self.assertTrue(model_manager.get_models() is model_manager.get_models())
+        self.assertTrue(exception_raised)
+
+    def test8(self):
+        """testing that the models are loaded in the parallel loading mode"""
+        # arrange
+        model_manager = ModelManager()
+
+        # act
+        model_manager.load_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "MLModelMock"
+            },
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "MLModelMockV2"
+            }
+        ], loading_mode="parallel", max_workers=2)
+
+        # assert
+        self.assertTrue(type(model_manager.get_model(qualified_name="qualified_name", major_version=1)) is MLModelMock)
+        self.assertTrue(type(model_manager.get_model(qualified_name="qualified_name", major_version=2))
+                        is MLModelMockV2)
+
+    def test9(self):
+        """testing that a model is created when it is first used in the lazy loading mode"""
+        # arrange
+        model_manager = ModelManager()
+        CountingMLModelMock.instances = 0
+
+        # act
+        model_manager.load_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "CountingMLModelMock"
+            }
+        ], loading_mode="lazy")
+        instances_after_loading = CountingMLModelMock.instances
+        metadata = model_manager.get_model_metadata(qualified_name="counting_qualified_name")
+        first_model = model_manager.get_model(qualified_name="counting_qualified_name")
+        second_model = model_manager.get_model(qualified_name="counting_qualified_name")
+
+        # assert
+        self.assertTrue(instances_after_loading == 0)
+        self.assertTrue(metadata["qualified_name"] == "counting_qualified_name")
+        self.assertTrue(first_model is second_model)
+        self.assertTrue(CountingMLModelMock.instances == 1)
+
+    def test10(self):
+        """testing that load_pending_models() creates the models that were loaded lazily"""
+        # arrange
+        model_manager = ModelManager()
+        CountingMLModelMock.instances = 0
+        model_manager.load_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "CountingMLModelMock"
+            }
+        ], loading_mode="lazy")
+
+        # act
+        model_manager.load_pending_models()
+        model_manager.get_model(qualified_name="counting_qualified_name")
+
+        # assert
+        self.assertTrue(CountingMLModelMock.instances == 1)
+
+    def test11(self):
+        """testing that reload_models() warms up the new models and replaces the old ones"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "RecordingMLModelMock"
+            }
+        ])
+        old_model = model_manager.get_model(qualified_name="recording_qualified_name")
+
+        # act
+        model_manager.reload_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "RecordingMLModelMock",
+                "warm_up": {"inputs": [{"value": 1}, {"value": 2}]}
+            }
+        ])
+        new_model = model_manager.get_model(qualified_name="recording_qualified_name")
+
+        # assert
+        self.assertTrue(new_model is not old_model)
+        self.assertTrue(new_model.inputs == [{"value": 1}, {"value": 2}])
+        self.assertTrue(old_model.inputs == [])
+
+    def test12(self):
+        """testing that the old models are kept when the new models fail to warm up"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[
+            {
+                "module_name": "tests.model_manager_test",
+                "class_name": "MLModelMock"
+            }
+        ])
+        old_model = model_manager.get_model(qualified_name="qualified_name")
+
+        # act
+        exception_raised = False
+        try:
+            model_manager.reload_models(configuration=[
+                {
+                    "module_name": "tests.model_manager_test",
+                    "class_name": "FailingMLModelMock",
+                    "warm_up": {"inputs": [{"value": 1}]}
+                }
+            ])
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(model_manager.get_model(qualified_name="qualified_name") is old_model)
+
+    def test13(self):
+        """testing that reload_models() warms up the new models with synthetic inputs when there are no inputs"""
+        # arrange
+        model_manager = ModelManager()
+        configuration = [
+            {
+                "module_name": "tests.ml_model_grpc_endpoint_test",
+                "class_name": "IrisModelMock",
+                "warm_up": {"synthetic_inputs": 3}
+            }
+        ]
+        model_manager.load_models(configuration=configuration)
+
+        # act
+        model_manager.reload_models(configuration=configuration)
+
+        # assert
+        self.assertTrue(model_manager.get_model(qualified_name="iris_model").predict_calls == 3)
+
+    def test14(self):
+        """testing that reload_models() replaces a model whose generated warm up inputs fail"""
+        # arrange
+        model_manager = ModelManager()
+        model_manager.load_models(configuration=[{"module_name": "tests.ml_model_grpc_endpoint_test",
+                                                  "class_name": "IrisModelMock"}])
+
+        # act
+        model_manager.reload_models(configuration=[{"module_name": "tests.ml_model_grpc_endpoint_test",
+                                                    "class_name": "FailingIrisModelMock",
+                                                    "warm_up": {"synthetic_inputs": 3}}])
+
+        # assert
+        self.assertTrue(type(model_manager.get_model(qualified_name="iris_model")).__name__ == "FailingIrisModelMock")
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
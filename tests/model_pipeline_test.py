@@ -0,0 +1,322 @@
+import time
+import unittest
+import threading
+import grpc
+from schema import Schema
+from ml_model_abc import MLModel
+
+from model_service_pb2 import iris_model_input
+from model_grpc_service.model_manager import ModelManager
+from model_grpc_service.service import ModelgRPCServiceServicer
+from model_grpc_service.model_pipeline import EnsembleEndpoint, create_endpoint
+from model_grpc_service.admission_control import AdmissionRejected
+from tests.ml_model_grpc_endpoint_test import ServicerContextMock
+
+
+# creating an MLModel class that scales the inputs of the iris model
+class IrisScalerMock(MLModel):
+    display_name = "display name"
+    qualified_name = "iris_scaler"
+    description = "description"
+    major_version = 1
+    minor_version = 1
+    input_schema = None
+    output_schema = None
+
+    def __init__(self):
+        pass
+
+    def predict(self, data):
+        return dict(data, sepal_length=data["sepal_length"] * 2.0)
+
+
+# creating an MLModel class with schemas that scales the inputs of the iris model
+class SchemaIrisScalerMock(IrisScalerMock):
+    input_schema = Schema({"sepal_length": float, "sepal_width": float, "petal_length": float, "petal_width": float})
+    output_schema = Schema({"sepal_length": float, "sepal_width": float, "petal_length": float, "petal_width": float})
+
+
+# creating an MLModel class that adds a field to the inputs of the iris model, which its schema doesn't allow
+class ExtraFieldIrisScalerMock(SchemaIrisScalerMock):
+    output_schema = Schema({"sepal_length": float, "sepal_width": float, "petal_length": float, "petal_width": float,
+                            "scale": float})
+
+    def predict(self, data):
+        return dict(super().predict(data), scale=2.0)
+
+
+# creating an MLModel class that validates its inputs against its schema
+class StrictIrisModelMock(IrisScalerMock):
+    qualified_name = "iris_model"
+    input_schema = Schema({"sepal_length": float, "sepal_width": float, "petal_length": float, "petal_width": float})
+    output_schema = Schema({"species": str})
+
+    def predict(self, data):
+        data = self.input_schema.validate(data)
+        return {"species": "setosa" if data["sepal_length"] < 5.0 else "virginica"}
+
+
+# creating MLModel classes with an integer output field, the last one returns a float that is a whole number, the
+# first one uses the protocol buffers of the iris model
+class PetalCountModelMock(IrisScalerMock):
+    qualified_name = "iris_model"
+    input_schema = Schema({"sepal_length": float})
+    output_schema = Schema({"petal_count": int})
+    petal_count = 1
+
+    def predict(self, data):
+        return {"petal_count": self.petal_count}
+
+
+class PetalCountModelMockB(PetalCountModelMock):
+    qualified_name = "petal_count_model_b"
+    petal_count = 2
+
+
+class PetalCountModelMockC(PetalCountModelMock):
+    qualified_name = "petal_count_model_c"
+    petal_count = 4.0
+
+
+# creating MLModel classes that make their predictions slowly, with a threshold on the sepal length
+class SlowIrisModelMock(IrisScalerMock):
+    qualified_name = "iris_model"
+    threshold = 5.0
+    delay = 0.3
+
+    def predict(self, data):
+        time.sleep(self.delay)
+        return {"species": "setosa" if data["sepal_length"] < self.threshold else "virginica",
+                "score": data["sepal_length"] / self.threshold}
+
+
+class SlowIrisModelMockB(SlowIrisModelMock):
+    qualified_name = "slow_iris_model_b"
+    threshold = 4.0
+
+
+class SlowIrisModelMockC(SlowIrisModelMock):
+    qualified_name = "slow_iris_model_c"
+    threshold = 3.0
+
+
+# creating a configuration with a pipeline of one model, the service needs protocol buffers for all of its models
+class ConfigMock(object):
+    model_loading = "sequential"
+    model_loading_workers = None
+    models = [{"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "IrisModelMock"}]
+    pipelines = [{"qualified_name": "iris_pipeline", "type": "pipeline", "steps": ["iris_model"]}]
+
+
+def load_models(*class_names):
+    ModelManager().load_models(configuration=[{"module_name": "tests.model_pipeline_test", "class_name": class_name}
+                                              for class_name in class_names])
+
+
+class ModelPipelineTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the servicer serves a pipeline through an operation of its own"""
+        # arrange
+        servicer = ModelgRPCServiceServicer(configuration=ConfigMock)
+
+        # act
+        response = servicer.iris_pipeline_predict(iris_model_input(sepal_length=4.0), None)
+
+        # assert
+        self.assertTrue(servicer.pipeline_names == ["iris_pipeline"] and response.species == "setosa")
+        self.assertTrue(ModelManager.get_model("iris_model").predict_calls == 1)
+
+    def test2(self):
+        """testing that a pipeline passes the output of each model to the next one"""
+        # arrange
+        ModelManager().load_models(configuration=[
+            {"module_name": "tests.model_pipeline_test", "class_name": "IrisScalerMock"},
+            {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "IrisModelMock"}])
+        endpoint = create_endpoint({"qualified_name": "scaled_iris_model", "steps": ["iris_scaler", "iris_model"]})
+
+        # act
+        responses = [endpoint(iris_model_input(sepal_length=value, sepal_width=1.0), None) for value in (2.0, 3.0)]
+
+        # assert
+        self.assertTrue([response.species for response in responses] == ["setosa", "virginica"])
+
+    def test3(self):
+        """testing that the members of an ensemble make their predictions in parallel and their outputs are voted on"""
+        # arrange
+        load_models("SlowIrisModelMock", "SlowIrisModelMockB", "SlowIrisModelMockC")
+        endpoint = EnsembleEndpoint({"qualified_name": "iris_ensemble",
+                                     "members": ["iris_model", "slow_iris_model_b", "slow_iris_model_c"]})
+        tie_endpoint = EnsembleEndpoint({"qualified_name": "iris_ensemble",
+                                         "members": ["iris_model", "slow_iris_model_b"]})
+
+        # act
+        start_time = time.monotonic()
+        prediction = endpoint.predict({"sepal_length": 4.5})
+        elapsed_time = time.monotonic() - start_time
+        tie_prediction = tie_endpoint.predict({"sepal_length": 4.5})
+        endpoint.shutdown()
+        tie_endpoint.shutdown()
+
+        # assert
+        self.assertTrue(prediction["species"] == "virginica")
+        self.assertTrue(elapsed_time < 0.6)
+        # a tie goes to the first member
+        self.assertTrue(tie_prediction["species"] == "setosa")
+
+    def test4(self):
+        """testing that an ensemble averages the numbers in the outputs of its members"""
+        # arrange
+        load_models("SlowIrisModelMock", "SlowIrisModelMockB")
+        endpoint = EnsembleEndpoint({"qualified_name": "iris_ensemble", "combine": "mean",
+                                     "members": ["iris_model", "slow_iris_model_b"]})
+
+        # act
+        prediction = endpoint.predict({"sepal_length": 4.0})
+        endpoint.shutdown()
+
+        # assert
+        self.assertTrue(abs(prediction["score"] - 0.9) < 1e-9 and prediction["species"] == "setosa")
+
+    def test5(self):
+        """testing that a pipeline with a model that is not loaded or a type that is not valid is rejected"""
+        # arrange
+        load_models("IrisScalerMock")
+
+        # act
+        errors = []
+        for configuration in ({"qualified_name": "p", "type": "pipeline", "steps": ["iris_scaler", "unknown_model"]},
+                              {"qualified_name": "p", "type": "cascade", "steps": ["iris_scaler"]},
+                              {"qualified_name": "p", "type": "ensemble", "members": ["iris_scaler"],
+                               "combine": "median"}):
+            try:
+                create_endpoint(configuration)
+            except ValueError as e:
+                errors.append(str(e))
+
+        # assert
+        self.assertTrue(errors == ["'unknown_model' not found in ModelManager instance.",
+                                   "'cascade' is not a valid pipeline type.",
+                                   "'median' is not a valid way to combine the outputs of an ensemble."])
+
+    def test6(self):
+        """testing that a pipeline whose steps don't have matching fields is rejected"""
+        # arrange
+        ModelManager().load_models(configuration=[
+            {"module_name": "tests.model_pipeline_test", "class_name": "SchemaIrisScalerMock"},
+            {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "SchemaIrisModelMock"}])
+        endpoint = create_endpoint({"qualified_name": "p", "steps": ["iris_scaler", "iris_model"]})
+        ModelManager().load_models(configuration=[
+            {"module_name": "tests.model_pipeline_test", "class_name": "SchemaIrisScalerMock"},
+            {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "MismatchedIrisModelMock"}])
+
+        # act
+        error = None
+        try:
+            create_endpoint({"qualified_name": "p", "steps": ["iris_scaler", "iris_model"]})
+        except ValueError as e:
+            error = str(e)
+
+        # assert
+        self.assertTrue(endpoint.model_names == ["iris_scaler", "iris_model"])
+        self.assertTrue(error == "Input field 'color' of model 'iris_model' is not an output field of model "
+                                 "'iris_scaler' in pipeline 'p'.")
+
+    def test7(self):
+        """testing that a pipeline or ensemble rejects a request whose deadline has passed without calling its models"""
+        # arrange
+        ModelManager().load_models(configuration=[
+            {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "IrisModelMock"}])
+        endpoints = [create_endpoint({"qualified_name": "p", "steps": ["iris_model"]}),
+                     create_endpoint({"qualified_name": "e", "type": "ensemble", "members": ["iris_model"]})]
+
+        # act
+        codes = []
+        for endpoint in endpoints:
+            try:
+                endpoint(iris_model_input(sepal_length=4.0), ServicerContextMock(time_remaining=0.0))
+            except AdmissionRejected as e:
+                codes.append(e.code)
+        response = endpoints[0](iris_model_input(sepal_length=4.0), ServicerContextMock(time_remaining=1.0))
+
+        # assert
+        self.assertTrue(codes == [grpc.StatusCode.DEADLINE_EXCEEDED] * 2 and response.species == "setosa")
+        self.assertTrue(ModelManager.get_model("iris_model").predict_calls == 1)
+
+    def test8(self):
+        """testing that the members of an ensemble make the predictions of concurrent requests in parallel"""
+        # arrange
+        load_models("SlowIrisModelMock", "SlowIrisModelMockB")
+        endpoint = create_endpoint({"qualified_name": "iris_ensemble", "type": "ensemble",
+                                    "members": ["iris_model", "slow_iris_model_b"]}, concurrent_requests=4)
+        predictions = []
+
+        # act
+        threads = [threading.Thread(target=lambda: predictions.append(endpoint.predict({"sepal_length": 4.5})))
+                   for _ in range(4)]
+        start_time = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed_time = time.monotonic() - start_time
+        endpoint.shutdown()
+
+        # assert
+        self.assertTrue(len(predictions) == 4)
+        # the second member takes 1.2 seconds when it makes the four predictions one after the other
+        self.assertTrue(elapsed_time < 0.9)
+
+    def test9(self):
+        """testing that the mean of an integer output field of an ensemble is an integer"""
+        # arrange
+        load_models("PetalCountModelMock", "PetalCountModelMockB", "PetalCountModelMockC")
+        endpoint = EnsembleEndpoint({"qualified_name": "e", "combine": "mean",
+                                     "members": ["iris_model", "petal_count_model_b"]})
+        float_endpoint = EnsembleEndpoint({"qualified_name": "e", "combine": "mean",
+                                           "members": ["iris_model", "petal_count_model_c"]})
+
+        # act
+        prediction = endpoint.predict({"sepal_length": 4.0})
+        float_prediction = float_endpoint.predict({"sepal_length": 4.0})
+        endpoint.shutdown()
+        float_endpoint.shutdown()
+
+        # assert
+        self.assertTrue(prediction == {"petal_count": 2} and type(prediction["petal_count"]) is int)
+        self.assertTrue(float_prediction == {"petal_count": 2} and type(float_prediction["petal_count"]) is int)
+
+    def test10(self):
+        """testing that a pipeline passes only the input fields of the next step to it"""
+        # arrange
+        load_models("ExtraFieldIrisScalerMock", "StrictIrisModelMock")
+        endpoint = create_endpoint({"qualified_name": "p", "steps": ["iris_scaler", "iris_model"]})
+
+        # act
+        response = endpoint(iris_model_input(sepal_length=3.0, sepal_width=1.0, petal_length=1.0, petal_width=1.0),
+                            None)
+
+        # assert
+        self.assertTrue(response.species == "virginica")
+
+    def test11(self):
+        """testing that an ensemble whose members don't have the same fields is rejected"""
+        # arrange
+        ModelManager().load_models(configuration=[
+            {"module_name": "tests.model_pipeline_test", "class_name": "SchemaIrisScalerMock"},
+            {"module_name": "tests.ml_model_grpc_endpoint_test", "class_name": "SchemaIrisModelMock"}])
+
+        # act
+        error = None
+        try:
+            create_endpoint({"qualified_name": "e", "type": "ensemble", "members": ["iris_model", "iris_scaler"]})
+        except ValueError as e:
+            error = str(e)
+
+        # assert
+        self.assertTrue(error == "Model 'iris_scaler' must have the same output schema as model 'iris_model' to be in "
+                                 "ensemble 'e'.")
+
+
+if __name__ == '__main__':
+    unittest.main()
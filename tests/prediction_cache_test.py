@@ -0,0 +1,57 @@
+import time
+import unittest
+from model_grpc_service.prediction_cache import PredictionCache
+
+
+class PredictionCacheTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the cache returns the predictions put into it and counts hits and misses"""
+        # arrange
+        cache = PredictionCache(max_size=2)
+
+        # act
+        first_result = cache.get(b"a")
+        cache.put(b"a", "prediction")
+        second_result = cache.get(b"a")
+
+        # assert
+        self.assertTrue(first_result is None)
+        self.assertTrue(second_result == "prediction")
+        self.assertTrue(cache.stats() == {"size": 1, "hits": 1, "misses": 1, "evictions": 0})
+
+    def test2(self):
+        """testing that the least recently used prediction is evicted when the cache is full"""
+        # arrange
+        cache = PredictionCache(max_size=2)
+        cache.put(b"a", 1)
+        cache.put(b"b", 2)
+
+        # act
+        cache.get(b"a")
+        cache.put(b"c", 3)
+
+        # assert
+        self.assertTrue(cache.get(b"a") == 1)
+        self.assertTrue(cache.get(b"b") is None)
+        self.assertTrue(cache.get(b"c") == 3)
+        self.assertTrue(cache.evictions == 1)
+
+    def test3(self):
+        """testing that predictions expire after the time to live"""
+        # arrange
+        cache = PredictionCache(max_size=2, ttl=0.01)
+        cache.put(b"a", 1)
+
+        # act
+        time.sleep(0.02)
+        result = cache.get(b"a")
+
+        # assert
+        self.assertTrue(result is None)
+        self.assertTrue(len(cache) == 0)
+        self.assertTrue(cache.evictions == 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
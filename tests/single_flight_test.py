@@ -0,0 +1,68 @@
+import time
+import unittest
+import threading
+from model_grpc_service.single_flight import SingleFlight
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that concurrent calls with the same key share the result of one call"""
+        # arrange
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def function(value):
+            calls.append(value)
+            started.set()
+            release.wait(5.0)
+            return value * 2
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight.do(b"key", function, 21)))
+        followers = [threading.Thread(target=lambda: results.append(single_flight.do(b"key", function, 21)))
+                     for _ in range(3)]
+
+        # act
+        leader.start()
+        started.wait(5.0)
+        for follower in followers:
+            follower.start()
+        timeout = time.monotonic() + 5.0
+        while single_flight.shared < 3 and time.monotonic() < timeout:
+            time.sleep(0.001)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        # assert
+        self.assertTrue(calls == [21])
+        self.assertTrue(results == [42, 42, 42, 42])
+        self.assertTrue(single_flight.stats() == {"in_flight": 0, "calls": 4, "shared": 3})
+
+    def test2(self):
+        """testing that an exception is raised in every call that shares it and that nothing is kept afterwards"""
+        # arrange
+        single_flight = SingleFlight()
+
+        def function():
+            raise ValueError("Prediction failed.")
+
+        # act
+        exception_message = None
+        try:
+            single_flight.do(b"key", function)
+        except ValueError as e:
+            exception_message = str(e)
+        result = single_flight.do(b"key", lambda: 1)
+
+        # assert
+        self.assertTrue(exception_message == "Prediction failed.")
+        self.assertTrue(result == 1)
+        self.assertTrue(single_flight.shared == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
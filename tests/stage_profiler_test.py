@@ -0,0 +1,63 @@
+import os
+import pstats
+import tempfile
+import unittest
+from model_grpc_service.stage_profiler import StageProfiler
+
+
+class StageProfilerTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the profiler aggregates the timings of the stages"""
+        # arrange
+        profiler = StageProfiler(sample_rate=1.0)
+
+        # act
+        profiler.record({"to_dict": 0.001, "predict": 0.010, "total": 0.011})
+        profiler.record({"to_dict": 0.003, "predict": 0.030, "total": 0.033})
+        stats = profiler.stats()
+
+        # assert
+        self.assertTrue(list(stats.keys()) == ["to_dict", "predict", "total"])
+        self.assertTrue(stats["predict"]["count"] == 2)
+        self.assertTrue(abs(stats["predict"]["mean"] - 0.020) < 1e-9)
+        self.assertTrue(stats["predict"]["max"] == 0.030)
+        self.assertTrue(stats["predict"]["p50"] == 0.010)
+        self.assertTrue(profiler.should_sample())
+
+    def test2(self):
+        """testing that the profiler keeps the profiles of the slowest predictions"""
+        # arrange
+        profiler = StageProfiler(sample_rate=1.0, profile_slowest=2)
+        directory = tempfile.mkdtemp()
+
+        # act
+        for total in (0.1, 0.3, 0.2):
+            profile = profiler.create_profile()
+            profile.enable()
+            sum(range(100))
+            profile.disable()
+            profiler.record({"total": total}, profile)
+        paths = profiler.dump_slowest_profiles(directory)
+
+        # assert
+        self.assertTrue([total for total, _ in profiler.slowest_profiles()] == [0.3, 0.2])
+        self.assertTrue(len(paths) == 2)
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        pstats.Stats(paths[0])
+
+    def test3(self):
+        """testing that the sample rate must be between 0.0 and 1.0"""
+        # arrange, act
+        exception_raised = False
+        try:
+            StageProfiler(sample_rate=1.5)
+        except ValueError:
+            exception_raised = True
+
+        # assert
+        self.assertTrue(exception_raised)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import time
+import unittest
+import tempfile
+import threading
+from model_grpc_service.supervisor import Supervisor
+
+
+class SupervisorTests(unittest.TestCase):
+
+    def test1(self):
+        """testing that the supervisor starts the workers, restarts the ones that exit, and stops them"""
+        # arrange
+        directory = tempfile.mkdtemp()
+
+        def worker(index):
+            # recording that the worker started and then exiting with an error
+            open(os.path.join(directory, str(os.getpid())), "w").close()
+            raise RuntimeError("Worker crashed.")
+
+        supervisor = Supervisor(worker=worker, worker_count=2, restart_delay=0.01, max_restart_delay=0.01,
+                                max_fast_failures=None)
+        thread = threading.Thread(target=supervisor.run)
+
+        # act
+        thread.start()
+        timeout = time.monotonic() + 10.0
+        while len(os.listdir(directory)) < 4 and time.monotonic() < timeout:
+            time.sleep(0.01)
+        supervisor.stop()
+        thread.join(10.0)
+
+        # assert
+        self.assertTrue(len(os.listdir(directory)) >= 4)
+        self.assertFalse(thread.is_alive())
+
+    def test2(self):
+        """testing that the supervisor stops workers that are running"""
+        # arrange
+        def worker(index):
+            while True:
+                time.sleep(1.0)
+
+        supervisor = Supervisor(worker=worker, worker_count=2, restart_delay=0.01)
+        thread = threading.Thread(target=supervisor.run)
+
+        # act
+        thread.start()
+        timeout = time.monotonic() + 10.0
+        while len(supervisor.worker_pids) < 2 and time.monotonic() < timeout:
+            time.sleep(0.01)
+        worker_pids = supervisor.worker_pids
+        supervisor.stop()
+        thread.join(10.0)
+
+        # assert
+        self.assertTrue(len(worker_pids) == 2)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(supervisor.worker_pids == [])
+
+    def test3(self):
+        """testing that the supervisor gives up on a worker that keeps failing right after it starts"""
+        # arrange
+        directory = tempfile.mkdtemp()
+
+        def worker(index):
+            open(os.path.join(directory, str(os.getpid())), "w").close()
+            raise RuntimeError("Worker crashed.")
+
+        supervisor = Supervisor(worker=worker, worker_count=1, restart_delay=0.01, max_fast_failures=3)
+
+        # act
+        start_time = time.monotonic()
+        exception_raised = False
+        try:
+            supervisor.run()
+        except RuntimeError:
+            exception_raised = True
+        elapsed_time = time.monotonic() - start_time
+
+        # assert
+        self.assertTrue(exception_raised)
+        self.assertTrue(len(os.listdir(directory)) == 3)
+        # the delays before the restarts doubled, 0.01 and then 0.02 seconds
+        self.assertTrue(elapsed_time >= 0.03)
+        self.assertTrue(supervisor.worker_pids == [])
+
+
+if __name__ == '__main__':
+    unittest.main()